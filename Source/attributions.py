@@ -0,0 +1,122 @@
+"""
+attributions.py - Per-prediction feature contributions of the compiled model
+
+_plot_feature_importance only shows global importances. explain() says why
+one feature row got its probability: every feature gets a contribution,
+and base_value + sum(contributions) == the model's probability for the row.
+
+    XGBoost:       the booster's exact tree SHAP values (pred_contribs),
+                   computed in log-odds and scaled linearly onto the
+                   probability so they add up to it
+    RandomForest:  path contributions: each split on a row's path credits
+                   the change in the node's win fraction to the split's
+                   feature, averaged over the trees (walked for all rows and
+                   trees at once on the ForestModel node arrays)
+    MLP:           permutation-sampled Shapley values against the training
+                   mean row; the samples come in antithetic pairs (a feature
+                   order and its reverse) and each row's permutations are
+                   scored in one batched forward pass
+
+All three work on the NativeModel of native_inference.py (the scaler is
+already folded in) and take many rows per call. Contributions are in the
+units of the model output of a team row, before predict_matches normalizes
+the two teams' probabilities.
+"""
+import numpy as np
+
+from native_inference import ForestModel, MLPModel, XGBoostModel
+
+# Permutations per row for the sampled MLP Shapley values (even: antithetic pairs)
+DEFAULT_PERMUTATIONS = 32
+# Rows scored per forward pass while sampling
+MAX_SAMPLED_ROWS = 200_000
+
+
+def _xgboost_contributions(native: XGBoostModel, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    import xgboost as xgb
+
+    matrix = xgb.DMatrix(native._scaled(X), missing=native.missing)
+    contributions = native.booster.predict(matrix, pred_contribs=True,
+                                           iteration_range=native.iteration_range).astype(np.float64)
+    contributions, bias = contributions[:, :-1], contributions[:, -1]
+    margin = bias + contributions.sum(axis=1)
+    probability, base = 1 / (1 + np.exp(-margin)), 1 / (1 + np.exp(-bias))
+    # Share the probability change in proportion to the log-odds contributions
+    # (the sigmoid's slope where the margins coincide)
+    moved = np.abs(margin - bias) > 1e-12
+    scale = np.where(moved, (probability - base) / np.where(moved, margin - bias, 1.0), base * (1 - base))
+    return contributions * scale[:, np.newaxis], base
+
+
+def _forest_contributions(native: ForestModel, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    X = native._scaled(X)
+    n_rows, n_features = X.shape
+    n_trees = len(native.roots)
+    rows = np.arange(n_rows)[:, np.newaxis]
+    node = np.broadcast_to(native.roots, (n_rows, n_trees))
+    contributions = np.zeros(n_rows * n_features)
+    for _ in range(native.max_depth):
+        feature = native.feature[node]
+        child = np.where(X[rows, feature] <= native.threshold[node], native.left[node], native.right[node])
+        # Leaves point to themselves, so their change is zero
+        change = native.positive[child] - native.positive[node]
+        contributions += np.bincount((rows * n_features + feature).ravel(), weights=change.ravel(),
+                                     minlength=n_rows * n_features)
+        node = child
+    base = np.full(n_rows, native.positive[native.roots].mean())
+    return contributions.reshape(n_rows, n_features) / n_trees, base
+
+
+def _mlp_contributions(native: MLPModel, X: np.ndarray, n_permutations: int,
+                       seed: int) -> tuple[np.ndarray, np.ndarray]:
+    X = native._check(X)
+    n_rows, n_features = X.shape
+    background = native.mean
+    rng = np.random.default_rng(seed)
+    orders = [rng.permutation(n_features) for _ in range((n_permutations + 1) // 2)]
+    orders = np.array([o for order in orders for o in (order, order[::-1])])
+    # rank[p, j]: step at which permutation p switches feature j from the background to the row
+    rank = np.argsort(orders, axis=1)
+    steps = np.arange(n_features + 1)
+    switched = steps[np.newaxis, :, np.newaxis] > rank[:, np.newaxis, :]   # (perm, step, feature)
+
+    per_batch = max(1, MAX_SAMPLED_ROWS // switched[:, :, 0].size)
+    contributions = np.empty((n_rows, n_features))
+    for start in range(0, n_rows, per_batch):
+        x = X[start:start + per_batch]
+        samples = np.where(switched[np.newaxis], x[:, np.newaxis, np.newaxis, :], background)
+        output = native.positive_proba(samples.reshape(-1, n_features)).reshape(len(x), len(orders), -1)
+        # Marginal change of the feature switched at each step, moved back to feature order
+        marginal = np.diff(output, axis=2)
+        contributions[start:start + per_batch] = np.take_along_axis(
+            marginal, np.broadcast_to(rank, marginal.shape), axis=2).mean(axis=1)
+    base = np.full(n_rows, float(native.positive_proba(background[np.newaxis])[0]))
+    return contributions, base
+
+
+def explain(native, X, n_permutations: int = DEFAULT_PERMUTATIONS, seed: int = 0) -> dict:
+    """
+    Feature contributions of every row
+
+    Args:
+        native: NativeModel from native_inference.compile_pipeline
+        X: Feature rows (n_rows, n_features)
+        n_permutations: Sampled permutations per row (MLP only)
+        seed: Seed of the permutations (MLP only)
+
+    Returns:
+        {'contributions': (n_rows, n_features), 'base_values': (n_rows,),
+         'method': 'tree_shap', 'path' or 'sampled_shapley'}
+    """
+    if isinstance(native, XGBoostModel):
+        contributions, base = _xgboost_contributions(native, X)
+        method = 'tree_shap'
+    elif isinstance(native, ForestModel):
+        contributions, base = _forest_contributions(native, X)
+        method = 'path'
+    elif isinstance(native, MLPModel):
+        contributions, base = _mlp_contributions(native, X, n_permutations, seed)
+        method = 'sampled_shapley'
+    else:
+        raise ValueError(f"No attribution method for {type(native).__name__}")
+    return {'contributions': contributions, 'base_values': base, 'method': method}
@@ -0,0 +1,491 @@
+"""
+backtester.py - Walk-forward backtest of the draft predictor over the match dates
+
+train_model scores one random stratified split, which mixes every week of
+the season into both sides. WalkForwardBacktester replays the season in
+order instead: for every period k (a week by default) the model is trained
+on all matches before period k and predicts the games of period k, then the
+window moves on. Each window reports accuracy, log-loss and Brier score of
+its games and how long it took.
+
+What the model sees in a window matches what it would have seen on the day:
+    - test rows use each team's form over its previous n_matches matches
+      (TeamFormStore), never the game's own stats
+    - winrate_pickN/count_pickN are recomputed from the training matches
+      only (team_champion_stats), for training and test rows alike
+    - training rows keep their own match stats as in train_model
+      (train_features='match'), or use the pre-match form too ('pre_match')
+Games are scored like predict_matches: the two team probabilities of a game
+are normalized against each other and the first row's team is team 1.
+
+Refits are cheap: windows come in chains of `refit_every`. The first window
+of a chain fits the model from scratch, the next ones continue it on the
+grown training set (XGBoost appends boosting rounds to the booster,
+RandomForest adds trees with warm_start). Chains are independent and run
+in a joblib process pool; the feature matrices reach the workers as shared
+memory-mapped files (shared_features.py).
+
+Window results are cached in SQLite. A window's key covers the data up to
+its period, the model configuration and the start of its chain, so a rerun
+only fits the windows whose data changed (e.g. the newest week) and the
+results do not depend on the number of workers.
+
+Usage (from the Source folder):
+    python backtester.py --model XGBoost --refit-every 4
+    python backtester.py --data ../Data/processed_for_prediction.csv --freq M --output ../Data/backtest.json
+    python backtester.py --check-keys     # dropping the last period keeps the other windows' cache keys
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.ensemble import RandomForestClassifier
+import sklearn
+import xgboost as xgb
+
+from shared_features import SharedFeatureStore
+from team_champion_stats import PICK_COLUMNS, add_team_champion_features, calculate_team_champion_stats
+
+DATA_PATH = "../Data/processed_for_prediction.csv"
+DEFAULT_CACHE = '../Models/backtest_cache.sqlite'
+
+CHAMPION_FEATURES = [f'{stat}_{col}' for col in PICK_COLUMNS for stat in ('winrate', 'count')]
+TRAIN_FEATURES = ('match', 'pre_match')
+
+# Same starting points as the base models of train_model
+MODEL_PARAMS = {
+    'XGBoost': {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1, 'random_state': 42},
+    'RandomForest': {'n_estimators': 200, 'max_depth': 6, 'random_state': 42},
+}
+# Boosting rounds / trees added by each warm-started refit
+WARM_START_ROUNDS = {'XGBoost': 20, 'RandomForest': 20}
+# Clipping of the probabilities in the log-loss
+EPSILON = 1e-15
+
+
+def _fit_window(family: str, params: dict, warm_rounds: int, model, X: np.ndarray, y: np.ndarray):
+    """Fit from scratch when model is None, otherwise continue model on (X, y)"""
+    if family == 'XGBoost':
+        if model is None:
+            model = xgb.XGBClassifier(**params)
+            model.fit(X, y)
+        else:
+            booster = model.get_booster()
+            model = xgb.XGBClassifier(**{**params, 'n_estimators': warm_rounds})
+            model.fit(X, y, xgb_model=booster)
+        return model
+    if model is None:
+        model = RandomForestClassifier(**params, warm_start=True)
+    else:
+        model.set_params(n_estimators=model.n_estimators + warm_rounds)
+    model.fit(X, y)
+    return model
+
+
+def _n_trees(model) -> int:
+    if isinstance(model, xgb.XGBClassifier):
+        return model.get_booster().num_boosted_rounds()
+    return len(model.estimators_)
+
+
+def _with_champion_stats(X: np.ndarray, draft: pd.DataFrame, stats: pd.DataFrame,
+                         columns: list[int]) -> np.ndarray:
+    """Copy of X with the winrate_pickN/count_pickN columns computed from `stats`"""
+    X = np.array(X, dtype=np.float32)
+    X[:, columns] = add_team_champion_features(draft, stats=stats)[CHAMPION_FEATURES].to_numpy()
+    return X
+
+
+def score_games(probabilities: np.ndarray, y: np.ndarray, first: np.ndarray, second: np.ndarray) -> dict:
+    """
+    Accuracy, log-loss and Brier score of games scored like predict_matches
+
+    Args:
+        probabilities: Model probability of every team row
+        y: Result of every team row
+        first, second: Row positions of the two teams of each game
+    """
+    p = probabilities[first] / (probabilities[first] + probabilities[second])
+    won = y[first].astype(np.float64)
+    clipped = np.clip(p, EPSILON, 1 - EPSILON)
+    return {
+        'n_games': len(p),
+        'accuracy': float(np.mean((p > 0.5) == (won == 1))),
+        'log_loss': float(-np.mean(won * np.log(clipped) + (1 - won) * np.log(1 - clipped))),
+        'brier': float(np.mean((p - won) ** 2)),
+    }
+
+
+def run_chain(X_train: np.ndarray, X_test: np.ndarray, y: np.ndarray, draft: pd.DataFrame,
+              features: list[str], family: str, params: dict, warm_rounds: int,
+              windows: list[dict], skip: list[bool]) -> tuple[list[dict], float]:
+    """
+    Fit and score one chain of consecutive windows (one worker task)
+
+    The first window fits from scratch, the others warm-start from the
+    previous window's model. Windows flagged in `skip` (already cached)
+    are still fitted when a later window of the chain needs their model,
+    but not scored; the chain stops after its last window to score.
+
+    Args:
+        X_train, X_test: Date-sorted feature rows used for training / testing
+        y: Date-sorted results
+        draft: Date-sorted 'teamname', 'result' and pick columns
+        windows: Dicts with 'period', 'test_start', 'test_stop', 'first', 'second'
+        skip: Per window, True to leave it out of the results
+
+    Returns:
+        (one result dict per window that was not skipped, seconds spent on
+        the chain including the refits of skipped windows)
+    """
+    chain_start = time.perf_counter()
+    remaining = [i for i, s in enumerate(skip) if not s]
+    if not remaining:
+        return [], 0.0
+    columns = [features.index(name) for name in CHAMPION_FEATURES]
+    model = None
+    results = []
+    for i, window in enumerate(windows[:remaining[-1] + 1]):
+        start, stop = window['test_start'], window['test_stop']
+        began = time.perf_counter()
+        stats = calculate_team_champion_stats(draft.iloc[:start])
+        train = _with_champion_stats(X_train[:start], draft.iloc[:start], stats, columns)
+        test = _with_champion_stats(X_test[start:stop], draft.iloc[start:stop], stats, columns)
+        features_done = time.perf_counter()
+        model = _fit_window(family, params, warm_rounds, model, train, y[:start])
+        fitted = time.perf_counter()
+        probabilities = model.predict_proba(test)[:, 1]
+        scored = time.perf_counter()
+        if skip[i]:
+            continue
+        results.append({
+            'period': window['period'],
+            'n_train': start,
+            **score_games(probabilities, y[start:stop], window['first'] - start, window['second'] - start),
+            'warm_start': i > 0,
+            'n_trees': _n_trees(model),
+            'feature_seconds': features_done - began,
+            'fit_seconds': fitted - features_done,
+            'predict_seconds': scored - fitted,
+        })
+    return results, time.perf_counter() - chain_start
+
+
+class BacktestCache:
+    """
+    SQLite-backed store of window results (same layout idea as cv_cache.py)
+
+    Args:
+        path: Database file, created if missing
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS window_results (key TEXT PRIMARY KEY, result TEXT, created REAL)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Stored result dict for a key, or None"""
+        row = self._conn.execute("SELECT result FROM window_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict):
+        self._conn.execute("INSERT OR REPLACE INTO window_results VALUES (?, ?, ?)",
+                           (key, json.dumps(result), time.time()))
+        self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stored': self._conn.execute("SELECT COUNT(*) FROM window_results").fetchone()[0],
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+class WalkForwardBacktester:
+    """
+    Walk-forward evaluation of one model family on a predictor's match data
+
+    Args:
+        predictor: DraftBasedPredictor built from a match CSV (needs its df/X)
+        model: 'XGBoost' or 'RandomForest'
+        freq: pandas period alias of a window ('W' weeks, 'M' months, ...)
+        min_train_periods: Periods used only for training before the first window
+        refit_every: Windows per chain; 1 refits every window from scratch
+        train_features: 'match' (own match stats, as train_model) or 'pre_match'
+        n_matches: Matches in the pre-match form of a team
+        params: Model parameters (default MODEL_PARAMS[model])
+        warm_rounds: Rounds/trees added per warm start (default WARM_START_ROUNDS[model])
+    """
+
+    def __init__(self, predictor, model: str = 'XGBoost', freq: str = 'W', min_train_periods: int = 8,
+                 refit_every: int = 4, train_features: str = 'match', n_matches: int = 10,
+                 params: dict = None, warm_rounds: int = None):
+        if model not in MODEL_PARAMS:
+            raise ValueError(f"Unknown model '{model}', expected one of {sorted(MODEL_PARAMS)}")
+        if train_features not in TRAIN_FEATURES:
+            raise ValueError(f"Unknown train_features '{train_features}', expected one of {TRAIN_FEATURES}")
+        if refit_every < 1:
+            raise ValueError("refit_every must be at least 1")
+        self.model = model
+        self.freq = freq
+        self.refit_every = refit_every
+        self.train_features = train_features
+        self.n_matches = n_matches
+        self.params = dict(MODEL_PARAMS[model] if params is None else params)
+        self.warm_rounds = WARM_START_ROUNDS[model] if warm_rounds is None else warm_rounds
+        self.features = list(predictor.features)
+
+        df = predictor.df.reset_index(drop=True)
+        order = np.argsort(df['date'].to_numpy(), kind='stable')
+        pre_match = predictor.pre_match_features(n_matches).to_numpy(dtype=np.float32)[order]
+        self.X_test = pre_match
+        self.X_train = (pre_match if train_features == 'pre_match'
+                        else predictor.X.to_numpy(dtype=np.float32)[order])
+        self.y = df['result'].to_numpy()[order]
+        self.draft = df[['teamname', 'result'] + PICK_COLUMNS].iloc[order].reset_index(drop=True)
+        # The predictor's LabelEncoders number champions in sorted order over
+        # the whole file, so a champion first picked in a later week shifts
+        # earlier codes; number them by first appearance instead
+        matrices = [self.X_test] if self.X_train is self.X_test else [self.X_train, self.X_test]
+        for col in PICK_COLUMNS:
+            codes = pd.factorize(self.draft[col].astype(object))[0]
+            for X in matrices:
+                X[:, self.features.index(f'{col}_encoded')] = codes
+
+        # Rows are date-sorted, so each period is one contiguous block
+        codes, labels = pd.factorize(df['date'].iloc[order].dt.to_period(freq))
+        bounds = np.searchsorted(codes, np.arange(len(labels))).tolist() + [len(df)]
+
+        # Games with exactly two rows, in date order; the first row is team 1
+        games = pd.Series(np.arange(len(df))).groupby(df['gameid'].iloc[order].to_numpy(), sort=False)
+        pairs = np.array([rows for rows in games.agg(list) if len(rows) == 2], dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+
+        self._digests = self._period_digests(bounds)
+        self.windows = []
+        for k in range(min_train_periods, len(labels)):
+            start, stop = bounds[k], bounds[k + 1]
+            in_window = (pairs[:, 0] >= start) & (pairs[:, 1] < stop)
+            if not in_window.any():
+                continue
+            self.windows.append({
+                'period': str(labels[k]),
+                'test_start': start,
+                'test_stop': stop,
+                'first': pairs[in_window, 0],
+                'second': pairs[in_window, 1],
+                'digest': self._digests[k],
+            })
+
+    def _period_digests(self, bounds: list[int]) -> list[str]:
+        """
+        Chained SHA-1 of the data up to the end of each period
+
+        The winrate_pickN/count_pickN columns are left out: run_chain rebuilds
+        them from the (hashed) draft of the training rows, while the file's
+        own values are recomputed over every row whenever matches are added.
+        """
+        hashed = [i for i, name in enumerate(self.features) if name not in CHAMPION_FEATURES]
+        digest = hashlib.sha1(json.dumps(self.features).encode())
+        digests = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            for array in (self.X_train[start:stop, hashed], self.X_test[start:stop, hashed], self.y[start:stop]):
+                digest.update(np.ascontiguousarray(array).tobytes())
+            digest.update(pd.util.hash_pandas_object(self.draft.iloc[start:stop], index=False).to_numpy().tobytes())
+            digests.append(digest.hexdigest())
+            digest = hashlib.sha1(digests[-1].encode())
+        return digests
+
+    def _window_key(self, window: dict, chain_start: str) -> str:
+        payload = json.dumps({
+            'data': window['digest'],
+            'period': window['period'],
+            'chain_start': chain_start,
+            'model': self.model,
+            'params': self.params,
+            'warm_rounds': self.warm_rounds,
+            'train_features': self.train_features,
+            'n_matches': self.n_matches,
+            'freq': self.freq,
+            'versions': [sklearn.__version__, xgb.__version__],
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _chains(self) -> list[list[dict]]:
+        return [self.windows[i:i + self.refit_every] for i in range(0, len(self.windows), self.refit_every)]
+
+    def cache_keys(self) -> dict:
+        """Period -> cache key of every window"""
+        return {window['period']: self._window_key(window, chain[0]['period'])
+                for chain in self._chains() for window in chain}
+
+    def run(self, n_jobs: int = -1, cache: str = DEFAULT_CACHE) -> dict:
+        """
+        Backtest every window
+
+        Args:
+            n_jobs: Worker processes (joblib), one chain per task
+            cache: SQLite file of window results (None disables it)
+
+        Returns:
+            {'windows': DataFrame (one row per window), 'n_games', 'accuracy',
+             'log_loss', 'brier' (over all games), 'compute_seconds' (time the
+             workers spent on the chains computed in this run),
+             'seconds' (wall time), 'n_cached', 'n_jobs', 'cache' (stats or None)}
+        """
+        started = time.perf_counter()
+        store = BacktestCache(cache) if cache else None
+        chains = self._chains()
+        keys = [[self._window_key(window, chain[0]['period']) for window in chain] for chain in chains]
+        cached = [[store.get(key) if store is not None else None for key in chain_keys] for chain_keys in keys]
+        todo = [c for c, chain_cached in enumerate(cached) if any(result is None for result in chain_cached)]
+
+        with SharedFeatureStore() as features:
+            X_train = features.put('X_train', self.X_train)
+            X_test = X_train if self.X_test is self.X_train else features.put('X_test', self.X_test)
+            computed = Parallel(n_jobs=n_jobs)(
+                delayed(run_chain)(X_train, X_test, self.y, self.draft, self.features, self.model,
+                                   self.params, self.warm_rounds, chains[c],
+                                   [result is not None for result in cached[c]])
+                for c in todo
+            )
+
+        for c, (results, _) in zip(todo, computed):
+            new = iter(results)
+            for w, result in enumerate(cached[c]):
+                if result is None:
+                    result = next(new)
+                    if store is not None:
+                        store.put(keys[c][w], result)
+                    cached[c][w] = {**result, 'cached': False}
+        rows = [result if 'cached' in result else {**result, 'cached': True}
+                for chain in cached for result in chain]
+        cache_stats = store.stats() if store is not None else None
+        if store is not None:
+            store.close()
+
+        windows = pd.DataFrame(rows)
+        games = windows['n_games']
+        return {
+            'windows': windows,
+            'n_games': int(games.sum()),
+            'accuracy': float(np.average(windows['accuracy'], weights=games)),
+            'log_loss': float(np.average(windows['log_loss'], weights=games)),
+            'brier': float(np.average(windows['brier'], weights=games)),
+            'compute_seconds': sum(seconds for _, seconds in computed),
+            'seconds': time.perf_counter() - started,
+            'n_cached': int(windows['cached'].sum()),
+            'n_jobs': effective_n_jobs(n_jobs),
+            'cache': cache_stats,
+        }
+
+
+def check_truncated_keys(data_path: str = DATA_PATH, **backtester_args) -> dict:
+    """
+    Check that dropping the last period of a match CSV keeps the cache keys of
+    the earlier windows
+
+    The truncated copy gets its winrate_pickN/count_pickN recomputed with
+    team_champion_stats, as when the file is rebuilt after new matches.
+
+    Args:
+        data_path: Match CSV with champion features
+        backtester_args: WalkForwardBacktester arguments (model, freq, ...)
+
+    Returns:
+        {'windows': windows present in both runs, 'kept': windows with the same key,
+         'changed': periods whose key differs}
+    """
+    import contextlib
+    import io
+    import os
+    import tempfile
+
+    from predictor_new import DraftBasedPredictor
+
+    freq = backtester_args.get('freq', 'W')
+    df = pd.read_csv(data_path)
+    periods = pd.to_datetime(df['date']).dt.to_period(freq)
+    truncated = add_team_champion_features(df[periods < periods.max()])
+
+    keys = []
+    with tempfile.TemporaryDirectory() as folder:
+        truncated_path = os.path.join(folder, 'truncated.csv')
+        truncated.to_csv(truncated_path, index=False)
+        for path in (data_path, truncated_path):
+            with contextlib.redirect_stdout(io.StringIO()):
+                predictor = DraftBasedPredictor(path, cache=False)
+            keys.append(WalkForwardBacktester(predictor, **backtester_args).cache_keys())
+    full, short = keys
+    changed = [period for period, key in short.items() if full.get(period) != key]
+    return {'windows': len(short), 'kept': len(short) - len(changed), 'changed': changed}
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import sys
+
+    from predictor_new import DraftBasedPredictor
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the draft predictor")
+    parser.add_argument('--data', default=DATA_PATH, help="Match CSV")
+    parser.add_argument('--model', choices=sorted(MODEL_PARAMS), default='XGBoost')
+    parser.add_argument('--freq', default='W', help="Window length as a pandas period alias (W, M, ...)")
+    parser.add_argument('--min-train-periods', type=int, default=8)
+    parser.add_argument('--refit-every', type=int, default=4,
+                        help="Windows per chain (cold fit, then warm starts); 1 refits every window")
+    parser.add_argument('--train-features', choices=TRAIN_FEATURES, default='match')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="SQLite cache of window results ('' disables it)")
+    parser.add_argument('--output', default=None, help="Also write the windows and totals as JSON")
+    parser.add_argument('--check-keys', action='store_true',
+                        help="Only check that dropping the last period keeps the earlier windows' cache keys")
+    args = parser.parse_args()
+
+    if args.check_keys:
+        check = check_truncated_keys(args.data, model=args.model, freq=args.freq,
+                                     min_train_periods=args.min_train_periods, refit_every=args.refit_every,
+                                     train_features=args.train_features)
+        print(f"{check['kept']}/{check['windows']} window keys kept after dropping the last period")
+        if check['changed']:
+            print("Changed: " + ", ".join(check['changed']))
+        sys.exit(1 if check['changed'] else 0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DraftBasedPredictor(args.data)
+    backtester = WalkForwardBacktester(predictor, args.model, args.freq, args.min_train_periods,
+                                       args.refit_every, args.train_features)
+    report = backtester.run(args.n_jobs, args.cache or None)
+    columns = ['period', 'n_train', 'n_games', 'accuracy', 'log_loss', 'n_trees', 'warm_start', 'cached', 'fit_seconds']
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200,
+                           'display.max_rows', None):
+        print(report['windows'][columns].to_string(index=False))
+    print(f"{len(report['windows'])} windows, {report['n_games']} games: accuracy {report['accuracy']:.3f}, "
+          f"log-loss {report['log_loss']:.3f}, Brier {report['brier']:.3f}")
+    print(f"Compute {report['compute_seconds']:.2f}s, wall {report['seconds']:.2f}s "
+          f"({report['n_cached']} windows from cache, {report['n_jobs']} workers)")
+    if args.output:
+        summary = {k: v for k, v in report.items() if k != 'windows'}
+        summary['windows'] = report['windows'].to_dict(orient='records')
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
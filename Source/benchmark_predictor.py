@@ -0,0 +1,571 @@
+"""
+benchmark_predictor.py - Latency benchmarks for DraftBasedPredictor
+
+Usage (from the Source folder):
+    python benchmark_predictor.py
+    python benchmark_predictor.py --suite --scales 1 10 100 --output ../Data/benchmark_results.json
+    python benchmark_predictor.py --dataset
+    python benchmark_predictor.py --training-memory --rows 200000
+    python benchmark_predictor.py --native
+
+The suite runs every stage of the predictor on synthetic data (see
+synthetic_data.py) and writes the timings as JSON, so runs on different
+commits or machines can be compared.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+import xgboost as xgb
+
+import build_dataset
+from data_loader import load_match_data
+from model_search import search_models
+from native_inference import compile_pipeline
+from predictor_new import DraftBasedPredictor, PICK_COLUMNS, DATA_COLUMNS, FEATURES
+from prediction_cache import PredictionCache
+from shared_features import SharedFeatureStore
+from synthetic_data import generate_raw_season, write_match_csv
+
+DATA_PATH = "../Data/processed_for_prediction.csv"
+SCALES = [1, 10, 100]
+BATCH_SIZES = [1, 100, 10_000]
+# Rows per call of the native inference comparison
+NATIVE_BATCH_SIZES = [1, 1000]
+# Worker counts of the training memory benchmark (-1 = all cores)
+TRAINING_N_JOBS = [1, 4, -1]
+# The reduced train_model run is skipped above these scales (it dominates the suite)
+TRAIN_SCALES = [1, 10]
+SUITE_OUTPUT = "../Data/benchmark_results.json"
+
+
+def _scan_champion_stats(df: pd.DataFrame, team_name: str, picks: list[str]) -> list[dict]:
+    """Full-scan implementation of get_champion_stats, kept as the baseline"""
+    stats = []
+    for i, pick in enumerate(picks, 1):
+        team_pick_stats = df[(df['teamname'] == team_name) & (df[f'pick{i}'] == pick)]
+        overall_stats = df[df[f'pick{i}'] == pick]
+        any_pick = (df[PICK_COLUMNS] == pick).any(axis=1)
+        team_all_pick_stats = df[(df['teamname'] == team_name) & any_pick]
+        overall_all_pick_stats = df[any_pick]
+        stats.append({
+            'team_games': len(team_pick_stats),
+            'team_winrate': team_pick_stats['result'].mean() if not team_pick_stats.empty else 0,
+            'overall_games': len(overall_stats),
+            'overall_winrate': overall_stats['result'].mean() if not overall_stats.empty else 0,
+            'team_all_pick_games': len(team_all_pick_stats),
+            'team_all_pick_winrate': team_all_pick_stats['result'].mean() if not team_all_pick_stats.empty else 0,
+            'overall_all_pick_games': len(overall_all_pick_stats),
+            'overall_all_pick_winrate': overall_all_pick_stats['result'].mean() if not overall_all_pick_stats.empty else 0,
+        })
+    return stats
+
+
+def _load_scaled_predictor(df: pd.DataFrame, scale: int) -> tuple[DraftBasedPredictor, float]:
+    """Build a predictor on the data repeated `scale` times, returning it with its build time"""
+    scaled = pd.concat([df] * scale, ignore_index=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scaled.csv")
+        scaled.to_csv(path, index=False)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor = DraftBasedPredictor(path)
+        build_time = time.perf_counter() - start
+    return predictor, build_time
+
+
+def _fit_benchmark_model(predictor: DraftBasedPredictor, n_estimators: int = 200):
+    """Attach an XGBoost pipeline with the default train_model settings"""
+    predictor.model = Pipeline([
+        ('scaler', StandardScaler()),
+        ('classifier', xgb.XGBClassifier(n_estimators=n_estimators, max_depth=6, learning_rate=0.1, random_state=42))
+    ])
+    # Fitted on arrays like the tuned models, which is also what prediction passes in
+    predictor.model.fit(np.asarray(predictor.X), np.asarray(predictor.y))
+
+
+def _random_matchups(predictor: DraftBasedPredictor, n: int, seed: int = 42) -> list[tuple]:
+    """Sample matchups from teams and per-slot champions seen in the data"""
+    rng = np.random.default_rng(seed)
+    teams = predictor.df['teamname'].unique()
+    classes = [predictor.champion_encoders[col].classes_ for col in PICK_COLUMNS]
+    matchups = []
+    for _ in range(n):
+        team1, team2 = rng.choice(teams, 2, replace=False)
+        matchups.append((
+            team1, [str(rng.choice(c)) for c in classes],
+            team2, [str(rng.choice(c)) for c in classes]
+        ))
+    return matchups
+
+
+def _time_per_call(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def _timings(func, repeat: int, setup=None) -> dict:
+    """Per-call wall times of `func` (stdout silenced), summarised for the JSON report"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min_s': min(times),
+        'median_s': float(np.median(times)),
+        'mean_s': float(np.mean(times)),
+    }
+
+
+def _environment() -> dict:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': {
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'xgboost': xgb.__version__,
+        },
+    }
+
+
+def benchmark_scale(csv_path: str, repeat: int = 20, train: bool = True) -> dict:
+    """
+    Time every predictor stage on one dataset
+
+    Args:
+        csv_path: Match CSV (real or synthetic)
+        repeat: Calls timed for the per-request stages (construction uses fewer)
+        train: Also time a reduced headless train_model run
+
+    Returns:
+        Stage name -> timing summary (see _timings)
+    """
+    results = {}
+    heavy_repeat = max(1, repeat // 10)
+    results['init'] = _timings(lambda: DraftBasedPredictor(csv_path, cache=False), heavy_repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DraftBasedPredictor(csv_path, cache=False)
+    results['prepare_data'] = _timings(predictor._prepare_data, heavy_repeat)
+
+    matchups = _random_matchups(predictor, repeat)
+    teams = [m[0] for m in matchups]
+    calls = iter(range(10 ** 9))
+    # Cold: the per-team cache is emptied before every call
+    results['team_recent_stats_cold'] = _timings(
+        lambda: predictor._get_team_recent_stats(teams[next(calls) % repeat]), repeat,
+        setup=predictor._invalidate_caches)
+    for team in set(teams):
+        predictor._get_team_recent_stats(team)
+    results['team_recent_stats_warm'] = _timings(
+        lambda: predictor._get_team_recent_stats(teams[next(calls) % repeat]), repeat)
+    results['champion_stats'] = _timings(
+        lambda: predictor.get_champion_stats(*matchups[next(calls) % repeat][:2]), repeat)
+    results['process_team_draft'] = _timings(
+        lambda: predictor._process_team_draft(*matchups[next(calls) % repeat][:2]), repeat)
+
+    _fit_benchmark_model(predictor, n_estimators=50)
+    # Scoring without the prediction cache; cached lookups are timed on their own
+    predictor.prediction_cache = None
+    results['predict_match'] = _timings(lambda: predictor.predict_match(*matchups[next(calls) % repeat]), repeat)
+    results['predict_matches_batch'] = _timings(lambda: predictor.predict_matches(matchups), heavy_repeat)
+    results['predict_matches_batch']['batch_size'] = len(matchups)
+    predictor.prediction_cache = PredictionCache()
+    for matchup in matchups:
+        predictor.predict_match(*matchup)
+    results['predict_match_cached'] = _timings(
+        lambda: predictor.predict_match(*matchups[next(calls) % repeat]), repeat)
+
+    if train:
+        results['train_model_reduced'] = _timings(
+            lambda: predictor.train_model(search='random', max_fits=15, n_jobs=1, profile='headless'), 1)
+    return results
+
+
+def benchmark_suite(scales: list[float] = SCALES, output: str = SUITE_OUTPUT, repeat: int = 20,
+                    train_scales: list[float] = TRAIN_SCALES, seed: int = 42) -> dict:
+    """
+    Run benchmark_scale on synthetic datasets of several sizes and save the results as JSON
+
+    Args:
+        scales: Dataset sizes as multiples of the real 1,940 rows
+        output: JSON file to write (None to skip writing)
+        repeat: Calls timed per stage
+        train_scales: Scales at which the reduced train_model is also timed
+        seed: Seed of the synthetic data
+
+    Returns:
+        The report written to `output`
+    """
+    report = {**_environment(), 'seed': seed, 'scales': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            path = os.path.join(tmp, f"synthetic_{scale}x.csv")
+            start = time.perf_counter()
+            info = write_match_csv(path, scale, seed)
+            generate_time = time.perf_counter() - start
+            print(f"Scale {scale}x: {info['rows']} rows, {info['n_teams']} teams, "
+                  f"{info['n_champions']} champions (generated in {generate_time:.1f}s)")
+            stages = benchmark_scale(path, repeat, train=scale in train_scales)
+            for name, timing in stages.items():
+                print(f"  {name:<26} median {timing['median_s'] * 1e3:>10.3f} ms")
+            report['scales'].append({'scale': scale, **info, 'generate_s': generate_time, 'stages': stages})
+
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    return report
+
+
+def _legacy_build_dataset(csv_paths: list[str], fixes_path: str) -> pd.DataFrame:
+    """Building_Dataset.ipynb steps as they were written, kept as the baseline"""
+    df = pd.concat([pd.read_csv(path, low_memory=False) for path in csv_paths], ignore_index=True)
+    df = df[df["league"].isin(build_dataset.LEAGUES)]
+    df = df[df["position"] == "team"]
+
+    missing_percentage = (df.isnull().sum() / len(df)) * 100
+    df = df.drop(columns=missing_percentage[missing_percentage == 100].index.tolist())
+    df = df.drop(build_dataset.MOSTLY_MISSING_COLUMNS, axis=1)
+    df['split'] = df['split'].fillna('None')
+
+    def fill_time_based_stats(row, column):
+        for time_marker in [10, 15, 20, 25]:
+            if f"at{time_marker}" in column:
+                break
+        else:
+            return row[column]
+        if pd.isna(row[column]) and row['gamelength'] < time_marker * 60 and row['datacompleteness'] == 'complete':
+            return 0
+        return row[column]
+
+    time_stats_columns = [col for col in df.columns if any(marker in col for marker in ['at10', 'at15', 'at20', 'at25'])]
+    for col in time_stats_columns:
+        df[col] = df.apply(lambda row: fill_time_based_stats(row, col), axis=1)
+
+    ban_pick_columns = [col for col in df.columns if col.startswith(('ban', 'pick'))]
+    filled_df = pd.read_csv(fixes_path)
+    for index, row in filled_df.iterrows():
+        mask = (df['gameid'] == row['gameid']) & (df['teamname'] == row['teamname'])
+        for col in ban_pick_columns:
+            df.loc[mask, col] = row[col]
+
+    return df.drop(['teamkills', 'teamdeaths'], axis=1)
+
+
+def benchmark_dataset_build(season_counts: list[int] = [1, 3], games_per_season: int = 10_000,
+                            legacy: bool = True):
+    """
+    Compare build_dataset with the notebook loops on synthetic raw seasons
+
+    Checks that both produce the same CSV, then reports time and peak traced
+    memory (tracemalloc, measured in a separate run since it slows pandas down).
+
+    Args:
+        season_counts: Number of seasons built together
+        games_per_season: Games per synthetic season (12 raw rows each)
+        legacy: Also run the notebook baseline (slow: one apply per time column)
+    """
+    print(f"{'seasons':>8} {'raw rows':>10} {'pipeline':<10} {'time (s)':>9} {'peak (MB)':>10} {'identical':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for season in range(max(season_counts)):
+            path = os.path.join(tmp, f"season_{season}.csv")
+            generate_raw_season(games_per_season, 2024 - season, seed=season).to_csv(path, index=False)
+            paths.append(path)
+
+        for n_seasons in season_counts:
+            season_paths = paths[:n_seasons]
+            # Hand fixes: the rows with missing bans/picks, picks filled in
+            team_rows, _ = build_dataset.read_team_rows(season_paths)
+            fixes = build_dataset.missing_ban_pick_rows(build_dataset.drop_empty_columns(team_rows))
+            fixes[PICK_COLUMNS] = fixes[PICK_COLUMNS].fillna("Champion 001")
+            fixes_path = os.path.join(tmp, "missing_bans_picks.csv")
+            fixes.to_csv(fixes_path, index=False)
+            raw_rows = sum(1 for path in season_paths for _ in open(path)) - len(season_paths)
+
+            start = time.perf_counter()
+            new, _ = build_dataset.build_dataset(season_paths, fixes_path, verbose=False)
+            new_time = time.perf_counter() - start
+            _, new_peak = build_dataset.measure_peak_memory(
+                build_dataset.build_dataset, season_paths, fixes_path, verbose=False)
+            print(f"{n_seasons:>8} {raw_rows:>10} {'chunked':<10} {new_time:>9.2f} {new_peak:>10.1f} {'':>10}")
+
+            if legacy:
+                start = time.perf_counter()
+                old = _legacy_build_dataset(season_paths, fixes_path)
+                old_time = time.perf_counter() - start
+                _, old_peak = build_dataset.measure_peak_memory(_legacy_build_dataset, season_paths, fixes_path)
+                identical = old.to_csv() == new.to_csv()
+                print(f"{n_seasons:>8} {raw_rows:>10} {'notebook':<10} {old_time:>9.2f} {old_peak:>10.1f} {str(identical):>10}")
+
+
+def benchmark_champion_stats(scales: list[int] = SCALES, repeat: int = 200):
+    """
+    Compare per-call latency of get_champion_stats against the full-scan baseline
+
+    Args:
+        scales: Multipliers applied to the number of rows in the dataset
+        repeat: Number of calls timed for the indexed lookup (the scan uses fewer)
+    """
+    df = pd.read_csv(DATA_PATH)
+    sample = df.iloc[0]
+    team_name = sample['teamname']
+    picks = [sample[col] for col in PICK_COLUMNS]
+
+    print(f"{'rows':>10} {'build (s)':>10} {'index (us)':>12} {'scan (ms)':>10} {'speedup':>9}")
+    for scale in scales:
+        predictor, build_time = _load_scaled_predictor(df, scale)
+        indexed = _time_per_call(lambda: predictor.get_champion_stats(team_name, picks), repeat)
+        scan = _time_per_call(lambda: _scan_champion_stats(predictor.df, team_name, picks), max(1, repeat // (10 * scale)))
+        print(f"{len(predictor.df):>10} {build_time:>10.2f} {indexed * 1e6:>12.1f} {scan * 1e3:>10.2f} {scan / indexed:>8.0f}x")
+
+
+def benchmark_batch_prediction(sizes: list[int] = BATCH_SIZES, max_looped: int = 200):
+    """
+    Compare predict_matches throughput against calling predict_match in a loop
+
+    Args:
+        sizes: Number of matchups scored per batch
+        max_looped: Cap on matchups timed through predict_match (the rate is extrapolated)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DraftBasedPredictor(DATA_PATH)
+    _fit_benchmark_model(predictor)
+    predictor.prediction_cache = None
+
+    print(f"{'matchups':>10} {'batch (s)':>10} {'batch/s':>10} {'looped/s':>10} {'speedup':>9}")
+    for size in sizes:
+        matchups = _random_matchups(predictor, size)
+        batch = _time_per_call(lambda: predictor.predict_matches(matchups), 1 if size > 100 else 20)
+        looped_matchups = matchups[:max_looped]
+        with contextlib.redirect_stdout(io.StringIO()):
+            looped = _time_per_call(lambda: [predictor.predict_match(*m) for m in looped_matchups], 1)
+        batch_rate = size / batch
+        looped_rate = len(looped_matchups) / looped
+        print(f"{size:>10} {batch:>10.4f} {batch_rate:>10.0f} {looped_rate:>10.0f} {batch_rate / looped_rate:>8.1f}x")
+
+
+def benchmark_native_inference(sizes: list[int] = NATIVE_BATCH_SIZES, repeat: int = 200,
+                               rounds: int = 5) -> list[dict]:
+    """
+    Pipeline.predict_proba against the compiled evaluators of native_inference.py
+
+    One pipeline per family of train_model (default settings, the MLP with
+    fewer iterations), fitted on the match data as arrays like the tuned
+    models; rows are scored as they come out of the feature matrix.
+
+    Args:
+        sizes: Rows per predict_proba call
+        repeat: Calls timed per round (divided by the size for large batches)
+        rounds: Timing rounds per size, the fastest one is reported
+
+    Returns:
+        One dict per (model, size) with both latencies and the largest probability difference
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DraftBasedPredictor(DATA_PATH)
+    X, y = np.asarray(predictor.X), np.asarray(predictor.y)
+    classifiers = {
+        'XGBoost': xgb.XGBClassifier(n_estimators=200, max_depth=6, learning_rate=0.1, random_state=42),
+        'RandomForest': RandomForestClassifier(n_estimators=200, max_depth=6, random_state=42),
+        'MLP': MLPClassifier(hidden_layer_sizes=(128, 64), max_iter=20, random_state=42),
+    }
+    rng = np.random.default_rng(42)
+    reports = []
+    print(f"{'model':<13} {'rows':>6} {'pipeline (ms)':>14} {'native (ms)':>12} {'speedup':>8} {'max diff':>9}")
+    for name, classifier in classifiers.items():
+        pipeline = Pipeline([('scaler', StandardScaler()), ('classifier', classifier)]).fit(X, y)
+        native = compile_pipeline(pipeline)
+        for size in sizes:
+            rows = X[rng.integers(0, len(X), size)]
+            calls = max(5, repeat // max(1, size // 10))
+            difference = float(np.abs(native.predict_proba(rows) - pipeline.predict_proba(rows)).max())
+            # Best of interleaved rounds, XGBoost keeps speeding up over the first calls
+            pipeline_time, native_time = np.inf, np.inf
+            for _ in range(rounds):
+                pipeline_time = min(pipeline_time, _time_per_call(lambda: pipeline.predict_proba(rows), calls))
+                native_time = min(native_time, _time_per_call(lambda: native.predict_proba(rows), calls))
+            reports.append({'model': name, 'rows': size, 'pipeline_ms': pipeline_time * 1e3,
+                            'native_ms': native_time * 1e3, 'max_difference': difference})
+            print(f"{name:<13} {size:>6} {pipeline_time * 1e3:>14.3f} {native_time * 1e3:>12.3f} "
+                  f"{pipeline_time / native_time:>7.1f}x {difference:>9.1e}")
+    return reports
+
+
+def benchmark_loading(repeat: int = 5):
+    """
+    Compare the plain read_csv load with the pruned/typed loader, cold and warm
+
+    Runs on a temporary copy of the CSV so the cache starts empty.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, os.path.basename(DATA_PATH))
+        shutil.copy(DATA_PATH, path)
+
+        full_time = _time_per_call(lambda: pd.read_csv(path), repeat)
+        full = pd.read_csv(path)
+        pruned_time = _time_per_call(lambda: load_match_data(path, DATA_COLUMNS, cache=False), repeat)
+        start = time.perf_counter()
+        load_match_data(path, DATA_COLUMNS)
+        cold_time = time.perf_counter() - start
+        warm_time = _time_per_call(lambda: load_match_data(path, DATA_COLUMNS), repeat)
+        pruned = load_match_data(path, DATA_COLUMNS)
+
+    print(f"{'loader':<28} {'time (ms)':>10} {'memory (MB)':>12} {'columns':>8}")
+    full_mb = full.memory_usage(deep=True).sum() / 1e6
+    pruned_mb = pruned.memory_usage(deep=True).sum() / 1e6
+    print(f"{'read_csv (all columns)':<28} {full_time * 1e3:>10.1f} {full_mb:>12.2f} {full.shape[1]:>8}")
+    print(f"{'pruned CSV, no cache':<28} {pruned_time * 1e3:>10.1f} {pruned_mb:>12.2f} {pruned.shape[1]:>8}")
+    print(f"{'pruned CSV + cache write':<28} {cold_time * 1e3:>10.1f} {pruned_mb:>12.2f} {pruned.shape[1]:>8}")
+    print(f"{'Parquet cache (warm)':<28} {warm_time * 1e3:>10.1f} {pruned_mb:>12.2f} {pruned.shape[1]:>8}")
+
+
+def _process_tree_memory(pid: int) -> tuple[int, int]:
+    """
+    (summed PSS, largest RSS) in bytes of a process and all its descendants (Linux /proc)
+
+    PSS splits shared pages between the processes mapping them, so the sum
+    counts a memory-mapped feature matrix once rather than once per worker.
+    """
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+            except OSError:
+                continue
+    tree, frontier = [], [pid]
+    while frontier:
+        tree.extend(frontier)
+        frontier = [child for child, parent in parents.items() if parent in frontier]
+    pss_total, max_rss = 0, 0
+    for member in tree:
+        try:
+            with open(f'/proc/{member}/smaps_rollup') as f:
+                fields = {line.split(':')[0]: int(line.split()[1]) * 1024 for line in f if line.split()[-1] == 'kB'}
+        except OSError:
+            continue
+        pss_total += fields.get('Pss', 0)
+        max_rss = max(max_rss, fields.get('Rss', 0))
+    return pss_total, max_rss
+
+
+def _training_memory_run(rows: int, n_jobs: int, shared: bool, queue):
+    """Child process body: a small budgeted search over a synthetic feature matrix"""
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(rng.normal(size=(rows, len(FEATURES))), columns=FEATURES)
+    y = pd.Series((X.iloc[:, :5].sum(axis=1) + rng.normal(size=rows) > 0).astype(int))
+    pipelines = {
+        'XGBoost': Pipeline([('scaler', StandardScaler()),
+                             ('classifier', xgb.XGBClassifier(n_estimators=20, max_depth=4))]),
+        'RandomForest': Pipeline([('scaler', StandardScaler()),
+                                  ('classifier', RandomForestClassifier(n_estimators=5, max_depth=6))]),
+    }
+    # One candidate per family: the fold copies and the data are what is measured
+    param_grids = {'XGBoost': {'classifier__learning_rate': [0.1]},
+                   'RandomForest': {'classifier__min_samples_leaf': [1]}}
+    store = SharedFeatureStore() if shared else None
+    if store is not None:
+        X, y = store.put('X', X), store.put('y', y, dtype=None)
+    start = time.perf_counter()
+    result = search_models(pipelines, param_grids, X, y, mode='grid', cv=5, n_jobs=n_jobs, verbose=False)
+    if store is not None:
+        store.close()
+    queue.put({'seconds': time.perf_counter() - start, 'n_fits': result['n_fits'],
+               'data_mb': np.asarray(X).nbytes / 1e6})
+
+
+def benchmark_training_memory(rows: int = 200_000, n_jobs_values: list[int] = TRAINING_N_JOBS,
+                              interval: float = 0.02) -> list[dict]:
+    """
+    Peak memory of the CV search with copied vs memory-mapped float32 features
+
+    Every configuration runs in a fresh process (so no joblib workers are
+    reused), sampled every `interval` seconds while the search runs.
+
+    Args:
+        rows: Rows of the synthetic feature matrix (len(FEATURES) float64 columns)
+        n_jobs_values: Worker counts to compare
+        interval: Sampling period in seconds
+
+    Returns:
+        One dict per (n_jobs, mode) with peak summed PSS and largest single-process RSS in MB
+    """
+    context = multiprocessing.get_context('spawn')
+    reports = []
+    print(f"{rows} rows x {len(FEATURES)} features, {os.cpu_count()} CPU cores")
+    print(f"{'n_jobs':>6} {'features':<9} {'data MB':>8} {'peak PSS MB':>12} {'max RSS MB':>11} {'time (s)':>9}")
+    for n_jobs in n_jobs_values:
+        for shared in (False, True):
+            queue = context.Queue()
+            process = context.Process(target=_training_memory_run, args=(rows, n_jobs, shared, queue))
+            process.start()
+            peak_pss, peak_rss = 0, 0
+            while process.is_alive() and queue.empty():
+                pss, rss = _process_tree_memory(process.pid)
+                peak_pss, peak_rss = max(peak_pss, pss), max(peak_rss, rss)
+                time.sleep(interval)
+            run = queue.get()
+            process.join()
+            report = {'n_jobs': n_jobs, 'features': 'memmap' if shared else 'copied', **run,
+                      'peak_pss_mb': peak_pss / 1e6, 'max_rss_mb': peak_rss / 1e6}
+            reports.append(report)
+            print(f"{n_jobs:>6} {report['features']:<9} {run['data_mb']:>8.1f} {report['peak_pss_mb']:>12.1f} "
+                  f"{report['max_rss_mb']:>11.1f} {run['seconds']:>9.1f}")
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DraftBasedPredictor benchmarks")
+    parser.add_argument('--suite', action='store_true', help="Run the stage suite on synthetic data")
+    parser.add_argument('--dataset', action='store_true', help="Benchmark the dataset build against the notebook")
+    parser.add_argument('--training-memory', action='store_true',
+                        help="Peak memory of the CV search with copied vs memory-mapped features")
+    parser.add_argument('--native', action='store_true',
+                        help="Pipeline.predict_proba vs the compiled native evaluators")
+    parser.add_argument('--rows', type=int, default=200_000, help="Rows used by --training-memory")
+    parser.add_argument('--scales', type=float, nargs='+', default=SCALES)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default=SUITE_OUTPUT)
+    args = parser.parse_args()
+
+    if args.suite:
+        benchmark_suite(args.scales, args.output, args.repeat)
+    elif args.dataset:
+        benchmark_dataset_build()
+    elif args.training_memory:
+        benchmark_training_memory(args.rows)
+    elif args.native:
+        benchmark_native_inference()
+    else:
+        benchmark_loading()
+        print()
+        benchmark_champion_stats()
+        print()
+        benchmark_batch_prediction()
@@ -0,0 +1,231 @@
+"""
+build_dataset.py - Builds the per-team match dataset from Oracle's Elixir season CSVs
+
+Same steps as Building_Dataset.ipynb, without row-wise loops:
+    1. stream the raw CSV(s) in chunks, keeping only team rows of the selected leagues
+    2. drop columns that are empty for team rows and the mostly-missing ones
+    3. fill 'split' with 'None' (international events have no split)
+    4. set the time-based stats (...at10/15/20/25) to 0 for complete games that
+       ended before that minute
+    5. apply the hand-filled ban/pick fixes (missing_bans_picks.csv) by key
+    6. drop the duplicated teamkills/teamdeaths columns
+
+The output is identical to the notebook's Team_stats_Tournamennts.csv.
+
+Usage (from the Source folder):
+    python build_dataset.py ../Data/2024_LoL_esports_match_data_from_OraclesElixir.csv \\
+        --fixes ../Data/missing_bans_picks.csv --output ../Data/Team_stats_Tournamennts.csv
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+LEAGUES = ["LCK", "LPL", "LEC", "LCS", "VCS", "PCS", "LLA", "CBLOL", "WLDs", "EWC", 'MSI']
+
+# Dropped after the fully-empty columns (over 70% missing)
+MOSTLY_MISSING_COLUMNS = ['url', 'dragons (type unknown)', 'monsterkillsenemyjungle', 'monsterkillsownjungle']
+# Same information as kills/deaths on team rows
+DUPLICATE_COLUMNS = ['teamkills', 'teamdeaths']
+TIME_MARKERS = [10, 15, 20, 25]
+FIX_KEYS = ['gameid', 'teamname']
+
+CHUNK_ROWS = 100_000
+
+
+def _merge_dtype(a, b):
+    """dtype pandas gives a column when frames with dtypes a and b are concatenated"""
+    if a is None:
+        return b
+    if a == b:
+        return a
+    numeric = (pd.api.types.is_numeric_dtype(a) and not pd.api.types.is_bool_dtype(a) and
+               pd.api.types.is_numeric_dtype(b) and not pd.api.types.is_bool_dtype(b))
+    return np.dtype('float64') if numeric else np.dtype('object')
+
+
+def read_team_rows(csv_paths: list[str], leagues: list[str] = LEAGUES,
+                   chunksize: int = CHUNK_ROWS) -> tuple[pd.DataFrame, int]:
+    """
+    Stream one or more season CSVs, keeping team rows of the given leagues
+
+    Column types are taken from the whole files, not only from the kept rows,
+    so the result matches reading each file at once (e.g. a stat that is
+    empty on player rows stays float, as in the full read). The index is the
+    raw row number across all files, like filtering the concatenated files.
+
+    Args:
+        csv_paths: Season CSVs (columns may differ between seasons)
+        leagues: Leagues to keep
+        chunksize: Rows parsed at a time
+
+    Returns:
+        (team rows, number of raw rows read)
+    """
+    frames = []
+    file_dtypes = []
+    rows_read = 0
+    for path in csv_paths:
+        dtypes = {}
+        offset = rows_read
+        for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+            chunk.index += offset
+            rows_read += len(chunk)
+            for col, dtype in chunk.dtypes.items():
+                dtypes[col] = _merge_dtype(dtypes.get(col), dtype)
+            frames.append(chunk[chunk["league"].isin(leagues) & (chunk["position"] == "team")])
+        file_dtypes.append(dtypes)
+
+    df = pd.concat(frames)
+    for col in df.columns:
+        # A column missing from a season is all-NaN (float) there after concatenation
+        per_file = [dtypes.get(col, np.dtype('float64')) for dtypes in file_dtypes]
+        target = None
+        for dtype in per_file:
+            target = _merge_dtype(target, dtype)
+        if df[col].dtype != target and target != np.dtype('object'):
+            df[col] = df[col].astype(target)
+        elif target == np.dtype('object') and not pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype(object)
+    return df, rows_read
+
+
+def drop_empty_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop columns with no value on team rows, then the mostly-missing ones"""
+    empty = df.columns[df.isna().all()].tolist()
+    df = df.drop(columns=empty)
+    return df.drop(columns=[c for c in MOSTLY_MISSING_COLUMNS if c in df.columns])
+
+
+def time_stat_columns(df: pd.DataFrame) -> list[str]:
+    """Columns holding a snapshot at minute 10/15/20/25 ('goldat15', 'opp_csat20', ...)"""
+    return [col for col in df.columns if any(f'at{t}' in col for t in TIME_MARKERS)]
+
+
+def fill_time_based_stats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fill missing snapshot stats with 0 for complete games that ended before the snapshot
+
+    Vectorized version of the notebook's row-wise fill_time_based_stats;
+    genuinely missing values (partial data) stay NaN.
+    """
+    complete = (df['datacompleteness'] == 'complete').to_numpy()
+    gamelength = df['gamelength'].to_numpy()
+    ended_before = {t: complete & (gamelength < t * 60) for t in TIME_MARKERS}
+    for col in time_stat_columns(df):
+        # First marker in the name wins, as in the notebook
+        minute = next(t for t in TIME_MARKERS if f'at{t}' in col)
+        fill = ended_before[minute] & df[col].isna().to_numpy()
+        if fill.any():
+            df[col] = df[col].mask(fill, 0)
+    return df
+
+
+def ban_pick_columns(df: pd.DataFrame) -> list[str]:
+    return [col for col in df.columns if col.startswith(('ban', 'pick'))]
+
+
+def missing_ban_pick_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Rows with an empty ban/pick, in the layout of missing_bans_picks.csv (filled by hand)"""
+    columns = ban_pick_columns(df)
+    return df[df[columns].isnull().any(axis=1)][
+        ['gameid', 'datacompleteness', 'league', 'date', 'teamname', 'side', 'result'] + columns
+    ]
+
+
+def apply_ban_pick_fixes(df: pd.DataFrame, fixes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Overwrite the ban/pick columns of every (gameid, teamname) found in `fixes`
+
+    Keyed replacement for the notebook's iterrows loop: every ban/pick column
+    of a matched row is replaced, and the last fix wins if a key repeats.
+    """
+    columns = ban_pick_columns(df)
+    fixes = fixes.drop_duplicates(FIX_KEYS, keep='last').set_index(FIX_KEYS)[columns]
+    keys = pd.MultiIndex.from_frame(df[FIX_KEYS])
+    matched = keys.isin(fixes.index)
+    if matched.any():
+        df.loc[matched, columns] = fixes.reindex(keys[matched]).to_numpy()
+    return df
+
+
+def build_dataset(csv_paths, fixes_path: str = None, output_path: str = None,
+                  leagues: list[str] = LEAGUES, chunksize: int = CHUNK_ROWS,
+                  verbose: bool = True) -> tuple[pd.DataFrame, dict]:
+    """
+    Run the whole build
+
+    Args:
+        csv_paths: Season CSV path or list of paths
+        fixes_path: Hand-filled ban/pick CSV (missing_bans_picks.csv), skipped if None
+        output_path: Where to write the result, not written if None
+        leagues: Leagues to keep
+        chunksize: Rows parsed at a time
+        verbose: Print the timing report
+
+    Returns:
+        (dataset, report) where report holds rows read/kept and seconds per stage
+    """
+    if isinstance(csv_paths, str):
+        csv_paths = [csv_paths]
+    timings = {}
+    start = time.perf_counter()
+
+    def lap(name):
+        nonlocal start
+        now = time.perf_counter()
+        timings[name] = now - start
+        start = now
+
+    df, rows_read = read_team_rows(csv_paths, leagues, chunksize)
+    lap('read')
+    df = drop_empty_columns(df)
+    df['split'] = df['split'].fillna('None')
+    lap('clean')
+    df = fill_time_based_stats(df)
+    lap('time_stats')
+    if fixes_path is not None:
+        df = apply_ban_pick_fixes(df, pd.read_csv(fixes_path))
+    lap('fixes')
+    df = df.drop(DUPLICATE_COLUMNS, axis=1)
+    if output_path is not None:
+        df.to_csv(output_path, index=False)
+    lap('write')
+
+    report = {'rows_read': rows_read, 'rows_kept': len(df), 'columns': df.shape[1],
+              'stage_seconds': timings, 'total_seconds': sum(timings.values())}
+    if verbose:
+        print(f"Read {rows_read} rows from {len(csv_paths)} file(s), kept {len(df)} team rows, {df.shape[1]} columns")
+        for name, seconds in timings.items():
+            print(f"  {name:<12} {seconds:>8.2f}s")
+        print(f"  {'total':<12} {report['total_seconds']:>8.2f}s")
+    return df, report
+
+
+def measure_peak_memory(func, *args, **kwargs) -> tuple[object, float]:
+    """Run func and return (result, peak traced memory in MB)"""
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak / 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the per-team match dataset")
+    parser.add_argument('csv_paths', nargs='+', help="Oracle's Elixir season CSV(s)")
+    parser.add_argument('--fixes', default=None, help="Hand-filled ban/pick CSV")
+    parser.add_argument('--output', default="../Data/Team_stats_Tournamennts.csv")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--memory', action='store_true', help="Also report peak memory (slower)")
+    args = parser.parse_args()
+    if args.memory:
+        _, peak_mb = measure_peak_memory(build_dataset, args.csv_paths, args.fixes, args.output,
+                                         chunksize=args.chunksize)
+        print(f"Peak memory: {peak_mb:.1f} MB")
+    else:
+        build_dataset(args.csv_paths, args.fixes, args.output, chunksize=args.chunksize)
@@ -0,0 +1,120 @@
+"""
+cv_cache.py - Persistent cache of cross-validation fold results
+
+Every fold fitted by model_search.search_models is stored in a small SQLite
+file, keyed by the dataset fingerprint, the feature list, the model family,
+the full set of pipeline hyperparameters and the fold/subsample. A rerun (or
+a search that crashed halfway) reuses every fold that was already scored
+and only fits the missing ones.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+
+import numpy as np
+import sklearn
+import xgboost as xgb
+
+
+def dataset_fingerprint(X, y) -> str:
+    """SHA-1 over the shape, dtype and bytes of the feature matrix and labels"""
+    X = np.ascontiguousarray(X)
+    y = np.ascontiguousarray(y)
+    digest = hashlib.sha1()
+    for array in (X, y):
+        digest.update(f"{array.shape}{array.dtype}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _plain(value):
+    """JSON-friendly version of a hyperparameter value (estimators become their repr)"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in sorted(value.items())}
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+class CVResultCache:
+    """
+    SQLite-backed store of (accuracy, fit seconds) per CV fold
+
+    Args:
+        path: Database file, created if missing
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fold_results ("
+            " key TEXT PRIMARY KEY, family TEXT, score REAL, fit_seconds REAL, created REAL)"
+        )
+        self._conn.commit()
+
+    def make_key(self, dataset: str, context: dict, family: str, pipeline, fold: int,
+                 n_folds: int, n_samples: int, random_state: int) -> str:
+        """
+        Key for one fold fit
+
+        Args:
+            dataset: dataset_fingerprint of the training data
+            context: Extra identifying data, e.g. {'features': [...]}
+            family: Model family name
+            pipeline: Pipeline with the candidate's parameters already set
+            fold: Fold index
+            n_folds: Number of CV folds
+            n_samples: Rows used from the training fold
+            random_state: Seed used for subsampling and early stopping
+        """
+        params = {name: _plain(value) for name, value in pipeline.get_params(deep=True).items()
+                  if name != 'steps' and '__' in name}
+        payload = json.dumps({
+            'dataset': dataset,
+            'context': _plain(context),
+            'family': family,
+            'params': params,
+            'fold': fold,
+            'n_folds': n_folds,
+            'n_samples': n_samples,
+            'random_state': random_state,
+            'versions': [sklearn.__version__, xgb.__version__],
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, key: str):
+        """(score, fit_seconds) for a key, or None if it was never stored"""
+        row = self._conn.execute(
+            "SELECT score, fit_seconds FROM fold_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return row
+
+    def put(self, key: str, family: str, score: float, fit_seconds: float):
+        # Committed right away so an interrupted search keeps every finished fold
+        self._conn.execute(
+            "INSERT OR REPLACE INTO fold_results VALUES (?, ?, ?, ?, ?)",
+            (key, family, float(score), float(fit_seconds), time.time()))
+        self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stored': self._conn.execute("SELECT COUNT(*) FROM fold_results").fetchone()[0],
+        }
+
+    def close(self):
+        self._conn.close()
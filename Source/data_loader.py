@@ -0,0 +1,132 @@
+"""
+data_loader.py - Column-pruned, typed and cached loading of the match CSVs
+
+The first read of a CSV parses it with pandas and stores a Parquet copy next
+to it; later reads load that copy as long as the CSV is unchanged (same
+mtime/size, or same content hash after a touch). Parquet needs pyarrow;
+without it every call simply reads the CSV.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+
+import pandas as pd
+
+# pyarrow is only used through pandas.read_parquet / to_parquet
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+# Columns stored as pandas categoricals (few distinct values, repeated often)
+CATEGORICAL_COLUMNS = ['teamname'] + [f'ban{i}' for i in range(1, 6)] + [f'pick{i}' for i in range(1, 6)]
+TEXT_COLUMNS = ['gameid']
+DATE_COLUMNS = ['date']
+INTEGER_COLUMNS = {'result': 'int8'}
+
+CACHE_FORMAT_VERSION = 1
+
+
+def _is_index_column(name: str) -> bool:
+    """Leftover index columns from repeated to_csv calls ('Unnamed: 0', 'Unnamed: 0.1', ...)"""
+    return name.startswith('Unnamed: ')
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(csv_path: str, columns: list[str] = None) -> tuple[str, str]:
+    """Parquet file and its metadata sidecar, one pair per column selection"""
+    selection = json.dumps(sorted(columns) if columns is not None else None)
+    key = hashlib.sha1(f"{CACHE_FORMAT_VERSION}:{selection}".encode()).hexdigest()[:10]
+    base = f"{os.path.splitext(csv_path)[0]}.{key}.cache"
+    return base + '.parquet', base + '.json'
+
+
+def _source_signature(csv_path: str) -> dict:
+    stat = os.stat(csv_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _cache_is_valid(csv_path: str, parquet_path: str, meta_path: str) -> bool:
+    if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    signature = _source_signature(csv_path)
+    if all(meta.get(k) == v for k, v in signature.items()):
+        return True
+    # mtime/size changed: the cache is still good if the content did not
+    if meta.get('sha1') == _file_hash(csv_path):
+        meta.update(signature)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        return True
+    return False
+
+
+def read_match_csv(csv_path: str, columns: list[str] = None) -> pd.DataFrame:
+    """
+    Read a match CSV keeping only the needed columns, with compact dtypes
+
+    Args:
+        csv_path: Path to the CSV file
+        columns: Columns to keep, defaults to every column except leftover 'Unnamed: ...' indexes
+
+    Returns:
+        DataFrame with categorical team/pick/ban columns, parsed dates,
+        int8 result and float32 numeric stats
+    """
+    if columns is None:
+        usecols = lambda name: not _is_index_column(name)
+    else:
+        usecols = columns
+    df = pd.read_csv(csv_path, usecols=usecols,
+                     dtype={col: 'category' for col in CATEGORICAL_COLUMNS})
+
+    if columns is not None:
+        # usecols keeps file order, callers expect their own order
+        df = df[columns]
+
+    for col in df.columns:
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col])
+        elif col in INTEGER_COLUMNS:
+            df[col] = df[col].astype(INTEGER_COLUMNS[col])
+        elif col not in CATEGORICAL_COLUMNS and col not in TEXT_COLUMNS and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype('float32')
+    return df
+
+
+def load_match_data(csv_path: str, columns: list[str] = None, cache: bool = True) -> pd.DataFrame:
+    """
+    Load a match CSV through the Parquet cache
+
+    Args:
+        csv_path: Path to the CSV file
+        columns: Columns to keep (see read_match_csv)
+        cache: Read/write the Parquet copy next to the CSV
+
+    Returns:
+        DataFrame as returned by read_match_csv
+    """
+    if not (cache and HAS_PYARROW):
+        return read_match_csv(csv_path, columns)
+
+    parquet_path, meta_path = _cache_paths(csv_path, columns)
+    if _cache_is_valid(csv_path, parquet_path, meta_path):
+        return pd.read_parquet(parquet_path)
+
+    df = read_match_csv(csv_path, columns)
+    try:
+        df.to_parquet(parquet_path, index=False)
+        with open(meta_path, 'w') as f:
+            json.dump({**_source_signature(csv_path), 'sha1': _file_hash(csv_path),
+                       'columns': list(df.columns)}, f)
+    except (OSError, ValueError) as e:
+        # Read-only data folders (e.g. Kaggle inputs) just skip the cache
+        print(f"Warning: could not write cache for {csv_path}: {e}")
+    return df
@@ -0,0 +1,390 @@
+"""
+draft_search.py - Recommended next pick or ban for a partial draft
+
+The predictor scores complete drafts. DraftSearch plays the rest of the
+pick/ban phase as a two-player game: blue maximizes its win probability,
+red minimizes it, and the recommended move is the one that holds up best
+against the opponent's replies.
+
+    Order:       tournament draft, 20 moves:
+                 bans  B R B R B R, picks B R R B B R,
+                 bans  R B R B,     picks R B B R
+                 Picks fill pick1..pick5 of their team in the order they are made.
+    Search:      alpha-beta with iterative deepening up to `max_depth` moves
+                 or `time_limit` seconds (the last completed depth is kept)
+    Candidates:  a pick tries the team's `candidates` best champions for that
+                 slot; a ban tries the champions the opponent would gain the
+                 most from in any of its open slots. Both rankings come from
+                 one batched scoring of every champion swapped into each slot
+                 of the team's reference draft.
+    Leaves:      a partial draft is completed greedily in draft order (each
+                 pick takes the best available champion of its ranking) and
+                 scored like predict_matches: p_blue / (p_blue + p_red)
+
+A team's model row only depends on its own picks, so row probabilities are
+memoized per (side, picks) across the whole search and across searches.
+Before a node `batch_depth` moves above the horizon is searched, all leaves
+below it are completed and their unseen rows scored in one score_drafts
+call. Positions reached through different move orders (bans are a set,
+picks a per-team sequence) share one transposition table entry.
+
+Usage (from the Source folder):
+    python draft_search.py --blue "T1" --red "Gen.G" --blue-bans Azir Ashe --red-bans Vi --depth 4
+    python draft_search.py --blue "T1" --red "Gen.G" --blue-bans A B C --red-bans D E F --blue-picks Rumble --time-limit 5
+"""
+import argparse
+import math
+import time
+
+ARTIFACT_PATH = '../Models/draft_predictor_inference.pkl.gz'
+DATA_PATH = "../Data/processed_for_prediction.csv"
+PICK_COLUMNS = [f'pick{i}' for i in range(1, 6)]
+SIDES = ('blue', 'red')
+
+DRAFT_ORDER = (
+    [('blue', 'ban'), ('red', 'ban')] * 3 +
+    [('blue', 'pick'), ('red', 'pick'), ('red', 'pick'), ('blue', 'pick'), ('blue', 'pick'), ('red', 'pick')] +
+    [('red', 'ban'), ('blue', 'ban')] * 2 +
+    [('red', 'pick'), ('blue', 'pick'), ('blue', 'pick'), ('red', 'pick')]
+)
+
+# Champions tried per move
+DEFAULT_CANDIDATES = 8
+DEFAULT_DEPTH = 4
+# Remaining depth at which all leaves below a node are scored in one batch
+DEFAULT_BATCH_DEPTH = 2
+
+# Transposition table bounds
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _other(side: str) -> str:
+    return 'red' if side == 'blue' else 'blue'
+
+
+class DraftSearch:
+    """
+    Adversarial pick/ban search for one blue vs red matchup
+
+    Args:
+        predictor: Trained (or artifact-loaded) DraftBasedPredictor
+        blue_team: Blue side team name
+        red_team: Red side team name
+        reference_drafts: Team name -> five picks used to rank the champions
+            of each slot (e.g. the team's latest draft, see recent_draft_pools)
+        candidates: Champions tried per move
+    """
+
+    def __init__(self, predictor, blue_team: str, red_team: str, reference_drafts: dict,
+                 candidates: int = DEFAULT_CANDIDATES):
+        self.predictor = predictor
+        self.teams = {'blue': blue_team, 'red': red_team}
+        self.candidates = candidates
+        # (side, picks) -> model probability of the team row
+        self._rows = {}
+        self.rows_scored = 0
+        self.batches = 0
+        # side -> per slot {champion: probability}, best first
+        self._slot_scores = {side: self._rank_champions(team, list(reference_drafts[team]))
+                             for side, team in self.teams.items()}
+        self._rankings = {side: [list(scores) for scores in slots] for side, slots in self._slot_scores.items()}
+        self._ban_orders = {}
+
+    def _rank_champions(self, team: str, reference: list[str]) -> list[dict]:
+        """Every champion of every slot swapped into the reference draft, scored in one batch"""
+        drafts, slots = [], []
+        for i, col in enumerate(PICK_COLUMNS):
+            others = set(reference[:i] + reference[i + 1:])
+            for champion in self.predictor.champion_encoders[col].classes_:
+                if isinstance(champion, str) and champion not in others:
+                    drafts.append(reference[:i] + [champion] + reference[i + 1:])
+                    slots.append((i, champion))
+        probabilities = self.predictor.score_drafts([team] * len(drafts), drafts)
+        scores = [{} for _ in PICK_COLUMNS]
+        for (i, champion), probability in zip(slots, probabilities):
+            scores[i][champion] = float(probability)
+        return [dict(sorted(slot.items(), key=lambda item: -item[1])) for slot in scores]
+
+    def _ban_order(self, opponent: str, first_open: int) -> list[str]:
+        """Champions by the most the opponent gets from them in any open slot"""
+        key = (opponent, first_open)
+        if key not in self._ban_orders:
+            best = {}
+            for slot in self._slot_scores[opponent][first_open:]:
+                for champion, probability in slot.items():
+                    best[champion] = max(best.get(champion, -1.0), probability)
+            self._ban_orders[key] = sorted(best, key=lambda champion: -best[champion])
+        return self._ban_orders[key]
+
+    def _moves(self, state: tuple) -> tuple[str, str, list[str]]:
+        """Side to move, its action and its candidate champions, best first"""
+        bans, blue, red = state
+        side, action = DRAFT_ORDER[len(bans) + len(blue) + len(red)]
+        picks = {'blue': blue, 'red': red}
+        if action == 'pick':
+            pool = self._rankings[side][len(picks[side])]
+        else:
+            opponent = _other(side)
+            pool = self._ban_order(opponent, len(picks[opponent]))
+        unavailable = bans.union(blue, red)
+        moves = []
+        for champion in pool:
+            if champion not in unavailable:
+                moves.append(champion)
+                if len(moves) == self.candidates:
+                    break
+        return side, action, moves
+
+    @staticmethod
+    def _apply(state: tuple, side: str, action: str, champion: str) -> tuple:
+        bans, blue, red = state
+        if action == 'ban':
+            return bans | {champion}, blue, red
+        if side == 'blue':
+            return bans, blue + (champion,), red
+        return bans, blue, red + (champion,)
+
+    def _complete(self, state: tuple) -> tuple[tuple, tuple]:
+        """Greedy completion: each remaining pick takes the best available champion for its slot"""
+        bans, blue, red = state
+        picks = {'blue': list(blue), 'red': list(red)}
+        unavailable = set(bans).union(blue, red)
+        for side, action in DRAFT_ORDER[len(bans) + len(blue) + len(red):]:
+            if action != 'pick':
+                continue
+            ranking = self._rankings[side][len(picks[side])]
+            champion = next((c for c in ranking if c not in unavailable), None)
+            if champion is None:
+                raise ValueError(f"No champion left for {side} pick{len(picks[side]) + 1}")
+            picks[side].append(champion)
+            unavailable.add(champion)
+        return tuple(picks['blue']), tuple(picks['red'])
+
+    def _score_rows(self, keys: list[tuple]):
+        """Score the (side, picks) rows not memoized yet in one batch"""
+        missing = [key for key in dict.fromkeys(keys) if key not in self._rows]
+        if not missing:
+            return
+        probabilities = self.predictor.score_drafts([self.teams[side] for side, _ in missing],
+                                                    [list(picks) for _, picks in missing])
+        self._rows.update(zip(missing, probabilities.tolist()))
+        self.rows_scored += len(missing)
+        self.batches += 1
+
+    def _leaf_value(self, state: tuple) -> float:
+        self.leaves += 1
+        blue, red = self._complete(state)
+        keys = [('blue', blue), ('red', red)]
+        self._score_rows(keys)
+        p_blue, p_red = (self._rows[key] for key in keys)
+        return p_blue / (p_blue + p_red)
+
+    def _prefetch(self, state: tuple, depth: int):
+        """Complete every leaf within `depth` moves and score their rows together"""
+        keys = []
+        frontier = [state]
+        for _ in range(depth):
+            children = []
+            for node in frontier:
+                bans, blue, red = node
+                if len(bans) + len(blue) + len(red) == len(DRAFT_ORDER):
+                    children.append(node)
+                    continue
+                side, action, moves = self._moves(node)
+                children.extend(self._apply(node, side, action, champion) for champion in moves)
+            frontier = children
+        for leaf in frontier:
+            blue, red = self._complete(leaf)
+            keys += [('blue', blue), ('red', red)]
+        self._score_rows(keys)
+
+    def _search(self, state: tuple, depth: int, alpha: float, beta: float) -> float:
+        """Alpha-beta value of a state (blue win probability), fail-soft"""
+        self.nodes += 1
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _Timeout
+        bans, blue, red = state
+        if depth == 0 or len(bans) + len(blue) + len(red) == len(DRAFT_ORDER):
+            return self._leaf_value(state)
+
+        entry = self._table.get(state)
+        best_move = None
+        if entry is not None:
+            entry_depth, value, bound, best_move = entry
+            if entry_depth >= depth:
+                self.table_hits += 1
+                if bound == EXACT:
+                    return value
+                if bound == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        if depth == self.batch_depth:
+            self._prefetch(state, depth)
+        side, action, moves = self._moves(state)
+        if not moves:
+            return self._leaf_value(state)
+        if best_move in moves:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        maximizing = side == 'blue'
+        original_alpha, original_beta = alpha, beta
+        best = -math.inf if maximizing else math.inf
+        for champion in moves:
+            value = self._search(self._apply(state, side, action, champion), depth - 1, alpha, beta)
+            if (value > best) if maximizing else (value < best):
+                best, best_move = value, champion
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        bound = UPPER if best <= original_alpha else LOWER if best >= original_beta else EXACT
+        self._table[state] = (depth, best, bound, best_move)
+        return best
+
+    def _principal_variation(self, state: tuple, depth: int) -> list[dict]:
+        """Best moves stored in the transposition table from `state`"""
+        line = []
+        for _ in range(depth):
+            entry = self._table.get(state)
+            if entry is None or entry[3] is None:
+                break
+            bans, blue, red = state
+            side, action = DRAFT_ORDER[len(bans) + len(blue) + len(red)]
+            line.append({'side': side, 'action': action, 'champion': entry[3]})
+            state = self._apply(state, side, action, entry[3])
+        return line
+
+    def _check_draft(self, blue_bans, red_bans, blue_picks, red_picks) -> tuple:
+        made = len(blue_bans) + len(red_bans) + len(blue_picks) + len(red_picks)
+        if made >= len(DRAFT_ORDER):
+            raise ValueError("The draft is already complete")
+        expected = {(side, action): 0 for side in SIDES for action in ('ban', 'pick')}
+        for move in DRAFT_ORDER[:made]:
+            expected[move] += 1
+        given = {('blue', 'ban'): len(blue_bans), ('red', 'ban'): len(red_bans),
+                 ('blue', 'pick'): len(blue_picks), ('red', 'pick'): len(red_picks)}
+        if given != expected:
+            raise ValueError(f"{made} moves do not follow the draft order: expected "
+                             f"{expected[('blue', 'ban')]}/{expected[('red', 'ban')]} bans and "
+                             f"{expected[('blue', 'pick')]}/{expected[('red', 'pick')]} picks (blue/red)")
+        champions = list(blue_bans) + list(red_bans) + list(blue_picks) + list(red_picks)
+        if len(set(champions)) != len(champions):
+            raise ValueError("A champion appears twice in the draft")
+        for side, picks in (('blue', blue_picks), ('red', red_picks)):
+            for i, champion in enumerate(picks):
+                if champion not in self._slot_scores[side][i]:
+                    raise ValueError(f"{champion} was never seen as pick{i + 1}")
+        return frozenset(list(blue_bans) + list(red_bans)), tuple(blue_picks), tuple(red_picks)
+
+    def search(self, blue_bans: list[str] = (), red_bans: list[str] = (), blue_picks: list[str] = (),
+               red_picks: list[str] = (), max_depth: int = DEFAULT_DEPTH, time_limit: float = None,
+               batch_depth: int = DEFAULT_BATCH_DEPTH) -> dict:
+        """
+        Best next move of a partial draft
+
+        Args:
+            blue_bans, red_bans: Bans made so far by each side
+            blue_picks, red_picks: Picks made so far, in pick order
+            max_depth: Moves searched ahead (at least 1, capped at the moves left)
+            time_limit: Seconds; deeper iterations stop when it runs out and the
+                last completed depth is returned (depth 1 always completes)
+            batch_depth: Remaining depth at which a node's leaves are prefetched in one batch
+
+        Returns:
+            {'side', 'action', 'champion' (recommended move), 'blue_win_probability',
+             'principal_variation' (expected moves from here), 'completed_draft'
+             (blue/red picks at the end of it), 'depth', 'nodes', 'nodes_per_s',
+             'leaves', 'rows_scored', 'batches', 'table_hits', 'seconds'}
+        """
+        if max_depth < 1:
+            raise ValueError(f"max_depth must be at least 1, got {max_depth}")
+        root = self._check_draft(blue_bans, red_bans, blue_picks, red_picks)
+        side, action, moves = self._moves(root)
+        if not moves:
+            raise ValueError(f"{side} has no legal {action} left in this draft")
+        max_depth = min(max_depth, len(DRAFT_ORDER) - sum(len(part) for part in root))
+        self.batch_depth = batch_depth
+        self.nodes = self.leaves = self.table_hits = 0
+        rows_scored, batches = self.rows_scored, self.batches
+        self._table = {}
+        started = time.perf_counter()
+
+        value, depth, line = None, 0, []
+        for d in range(1, max_depth + 1):
+            self._deadline = None if time_limit is None or d == 1 else started + time_limit
+            try:
+                value = self._search(root, d, -math.inf, math.inf)
+            except _Timeout:
+                break
+            depth, line = d, self._principal_variation(root, d)
+        self._deadline = None
+        seconds = time.perf_counter() - started
+
+        end = root
+        for move in line:
+            end = self._apply(end, move['side'], move['action'], move['champion'])
+        blue, red = self._complete(end)
+        return {
+            **line[0],
+            'blue_win_probability': value,
+            'principal_variation': line,
+            'completed_draft': {'blue': list(blue), 'red': list(red)},
+            'depth': depth,
+            'nodes': self.nodes,
+            'nodes_per_s': self.nodes / seconds if seconds > 0 else float('inf'),
+            'leaves': self.leaves,
+            'rows_scored': self.rows_scored - rows_scored,
+            'batches': self.batches - batches,
+            'table_hits': self.table_hits,
+            'seconds': seconds,
+        }
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    from predictor_new import DraftBasedPredictor
+    from tournament_simulator import recent_draft_pools
+
+    parser = argparse.ArgumentParser(description="Recommend the next pick or ban of a draft")
+    parser.add_argument('--blue', required=True, help="Blue side team")
+    parser.add_argument('--red', required=True, help="Red side team")
+    parser.add_argument('--blue-bans', nargs='*', default=[])
+    parser.add_argument('--red-bans', nargs='*', default=[])
+    parser.add_argument('--blue-picks', nargs='*', default=[], help="In pick order")
+    parser.add_argument('--red-picks', nargs='*', default=[], help="In pick order")
+    parser.add_argument('--artifact', default=ARTIFACT_PATH, help="Inference artifact (export_artifact)")
+    parser.add_argument('--data', default=DATA_PATH, help="Match CSV the reference drafts are taken from")
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help="Moves searched ahead")
+    parser.add_argument('--time-limit', type=float, default=10.0, help="Seconds (last completed depth is used)")
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CANDIDATES, help="Champions tried per move")
+    parser.add_argument('--batch-depth', type=int, default=DEFAULT_BATCH_DEPTH)
+    args = parser.parse_args()
+
+    predictor = DraftBasedPredictor.load_artifact(args.artifact)
+    matches = pd.read_csv(args.data, usecols=['teamname', 'date'] + PICK_COLUMNS)
+    references = {team: drafts[-1] for team, drafts in recent_draft_pools(matches, [args.blue, args.red], 1).items()}
+    searcher = DraftSearch(predictor, args.blue, args.red, references, args.candidates)
+    result = searcher.search(args.blue_bans, args.red_bans, args.blue_picks, args.red_picks,
+                             args.depth, args.time_limit, args.batch_depth)
+
+    print(f"Recommended: {result['side']} {result['action']}s {result['champion']} "
+          f"(blue win probability {result['blue_win_probability']:.1%} at depth {result['depth']})")
+    print("Expected line: " + ", ".join(f"{m['side']} {m['action']} {m['champion']}"
+                                        for m in result['principal_variation']))
+    print(f"Completed draft: blue {result['completed_draft']['blue']}, red {result['completed_draft']['red']}")
+    print(f"{result['nodes']} nodes in {result['seconds']:.2f}s ({result['nodes_per_s']:,.0f} nodes/s), "
+          f"{result['rows_scored']} rows scored in {result['batches']} batches, "
+          f"{result['table_hits']} transposition hits")
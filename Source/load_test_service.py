@@ -0,0 +1,195 @@
+"""
+load_test_service.py - Load test for prediction_service.py
+
+Sends POST /predict requests from `--concurrency` keep-alive connections
+(plain asyncio, no HTTP client dependency) and reports latency percentiles
+and requests/sec. Matchups are real drafts taken from the match CSV, so the
+teams and champions are known to a predictor trained on it.
+
+With --serve the service is started in a subprocess first (and stopped at
+the end) with its prediction cache off, since the sampled matchups repeat
+and would otherwise mostly be cache hits (--cache keeps it). E.g. to
+compare batching settings:
+    python load_test_service.py --serve --artifact ../Models/draft_predictor_inference.pkl.gz --max-batch 1
+    python load_test_service.py --serve --artifact ../Models/draft_predictor_inference.pkl.gz --max-batch 64
+
+Against a running service:
+    python load_test_service.py --url http://127.0.0.1:8000 --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = "../Data/processed_for_prediction.csv"
+PICK_COLUMNS = [f'pick{i}' for i in range(1, 6)]
+
+
+def sample_matchups(data_path: str = DATA_PATH, n: int = 500, seed: int = 42) -> list[dict]:
+    """Request bodies built from the two rows of randomly chosen games"""
+    df = pd.read_csv(data_path, usecols=['gameid', 'teamname'] + PICK_COLUMNS)
+    games = [g for g in df.groupby('gameid', sort=False) if len(g[1]) == 2]
+    rng = np.random.default_rng(seed)
+    matchups = []
+    for i in rng.integers(0, len(games), n):
+        blue, red = games[i][1].to_dict('records')
+        matchups.append({'team1': blue['teamname'], 'team1_picks': [blue[c] for c in PICK_COLUMNS],
+                         'team2': red['teamname'], 'team2_picks': [red[c] for c in PICK_COLUMNS]})
+    return matchups
+
+
+async def _post(reader, writer, host: str, path: str, body: bytes) -> tuple[int, bytes]:
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    length = next(int(line.split(':', 1)[1]) for line in lines[1:]
+                  if line.lower().startswith('content-length:'))
+    return status, await reader.readexactly(length)
+
+
+async def _worker(url, bodies, counter, n_requests, latencies, errors):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        while True:
+            i = counter[0]
+            if i >= n_requests:
+                return
+            counter[0] += 1
+            start = time.perf_counter()
+            status, _ = await _post(reader, writer, parts.netloc, '/predict', bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(url: str, matchups: list[dict], n_requests: int = 2000,
+                   concurrency: int = 16) -> dict:
+    """
+    Send n_requests single-match predictions from `concurrency` connections
+
+    Returns:
+        {'requests', 'errors', 'concurrency', 'seconds', 'requests_per_s',
+         'p50_ms', 'p90_ms', 'p99_ms', 'mean_ms', 'max_ms'}
+    """
+    bodies = [json.dumps(m).encode() for m in matchups]
+    latencies, errors, counter = [], [], [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker(url, bodies, counter, n_requests, latencies, errors)
+                           for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    ms = np.array(latencies) * 1e3
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'concurrency': concurrency,
+        'seconds': seconds,
+        'requests_per_s': len(latencies) / seconds,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+        'max_ms': float(ms.max()),
+    }
+
+
+def get_json(url: str) -> dict:
+    with urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def start_service(artifact: str, port: int, max_batch: int, max_wait_ms: float,
+                  cache: bool = False, timeout: float = 60) -> subprocess.Popen:
+    """Start prediction_service.py and wait until /health answers"""
+    command = [sys.executable, 'prediction_service.py', '--artifact', artifact, '--port', str(port),
+               '--max-batch', str(max_batch), '--max-wait-ms', str(max_wait_ms)]
+    if not cache:
+        command.append('--no-cache')
+    process = subprocess.Popen(command)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("prediction_service.py exited during startup")
+        try:
+            get_json(f"http://127.0.0.1:{port}/health")
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Service did not answer within {timeout}s")
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} requests, {report['errors']} errors, "
+          f"concurrency {report['concurrency']}, {report['seconds']:.2f}s")
+    print(f"  throughput  {report['requests_per_s']:>9.1f} req/s")
+    for key in ['p50_ms', 'p90_ms', 'p99_ms', 'mean_ms', 'max_ms']:
+        print(f"  {key[:-3]:<10}  {report[key]:>9.2f} ms")
+    if 'batches' in report:
+        print(f"  batches     {report['batches']:>9d} (mean {report['mean_batch_size']:.1f} matchups)")
+    if report.get('cache_hit_rate') is not None:
+        print(f"  cache hits  {report['cache_hit_rate']:>9.1%} (latencies include cached results)")
+    elif 'cache_hit_rate' in report:
+        print("  cache       off")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the prediction service")
+    parser.add_argument('--url', default=None, help="Running service, e.g. http://127.0.0.1:8000")
+    parser.add_argument('--serve', action='store_true', help="Start prediction_service.py first")
+    parser.add_argument('--artifact', default='../Models/draft_predictor_inference.pkl.gz')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--data', default=DATA_PATH, help="CSV the matchups are sampled from")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--output', default=None, help="Also write the report as JSON")
+    parser.add_argument('--cache', action='store_true',
+                        help="With --serve, keep the service's prediction cache on")
+    args = parser.parse_args()
+    if args.url is None and not args.serve:
+        parser.error("give --url of a running service or --serve")
+
+    process = None
+    url = args.url
+    if args.serve:
+        process = start_service(args.artifact, args.port, args.max_batch, args.max_wait_ms, args.cache)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        matchups = sample_matchups(args.data)
+        if args.warmup:
+            asyncio.run(run_load(url, matchups, args.warmup, min(args.concurrency, args.warmup)))
+        before = get_json(f"{url}/health")
+        report = asyncio.run(run_load(url, matchups, args.requests, args.concurrency))
+        after = get_json(f"{url}/health")
+        # Batching during the measured run only
+        report['batches'] = after['batches'] - before['batches']
+        report['mean_batch_size'] = ((after['matchups'] - before['matchups']) / report['batches']
+                                     if report['batches'] else 0.0)
+        report['cache_hit_rate'] = None
+        if after.get('prediction_cache') and before.get('prediction_cache'):
+            hits = after['prediction_cache']['hits'] - before['prediction_cache']['hits']
+            misses = after['prediction_cache']['misses'] - before['prediction_cache']['misses']
+            report['cache_hit_rate'] = hits / (hits + misses) if hits + misses else 0.0
+        print_report(report)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
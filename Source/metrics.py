@@ -0,0 +1,271 @@
+"""
+metrics.py - Stage timings and event counters for the prediction path
+
+DraftBasedPredictor wraps each stage of a prediction (draft features,
+recent stats, champion stats, predict_proba, ...) in `metrics.stage(name)`
+and counts events such as cache hits with `metrics.increment(name)`.
+Nothing is measured until a sink is attached; without sinks `stage()` hands
+back a shared no-op context manager, so the hooks cost a method call.
+
+Sinks:
+    HistogramSink:  in-memory latency histograms and counters, with summary()
+    PrometheusSink: HistogramSink that renders the Prometheus text format and
+                    can serve it over HTTP
+    JSONLogSink:    one JSON line per stage/event, to a file or stream
+
+Example:
+    sink = HistogramSink()
+    predictor.metrics.add_sink(sink)
+    predictor.predict_match(...)
+    print(sink.summary())
+"""
+import bisect
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency buckets, Prometheus style
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullStage:
+    """Context manager used while no sink is attached"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Times one stage and reports it to every sink; failures are counted as '<stage>_errors'"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        for sink in self.metrics.sinks:
+            sink.observe(self.name, seconds, error=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """
+    Hook point for stage timings and counters
+
+    Args:
+        sinks: Sinks receiving the measurements; none means disabled
+    """
+
+    def __init__(self, sinks: list = None):
+        self.sinks = list(sinks or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def stage(self, name: str):
+        """Context manager timing `name` (a shared no-op when disabled)"""
+        if not self.sinks:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def increment(self, name: str, value: int = 1):
+        """Add `value` to the counter `name`"""
+        for sink in self.sinks:
+            sink.increment(name, value)
+
+
+class HistogramSink:
+    """
+    In-memory latency histograms per stage plus counters
+
+    Args:
+        buckets: Bucket upper bounds in seconds (an overflow bucket is added)
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}   # stage -> {'counts', 'count', 'sum', 'max'}
+            self.counters = {}
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = {
+                    'counts': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+            hist['counts'][bisect.bisect_left(self.buckets, seconds)] += 1
+            hist['count'] += 1
+            hist['sum'] += seconds
+            hist['max'] = max(hist['max'], seconds)
+            if error:
+                self.counters[f'{stage}_errors'] = self.counters.get(f'{stage}_errors', 0) + 1
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def quantile(self, stage: str, q: float) -> float:
+        """Quantile estimated by linear interpolation inside the histogram buckets"""
+        hist = self.histograms[stage]
+        target = q * hist['count']
+        seen = 0
+        for i, count in enumerate(hist['counts']):
+            if count and seen + count >= target:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                # The largest observation bounds the estimate in its bucket
+                upper = min(self.buckets[i], hist['max']) if i < len(self.buckets) else hist['max']
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return hist['max']
+
+    def summary(self) -> dict:
+        """
+        Per-stage calls/latency and the counters
+
+        Returns:
+            {'stages': {stage: {calls, errors, total_s, mean_s, p50_s, p90_s, p99_s, max_s}},
+             'counters': {name: value}}
+        """
+        with self._lock:
+            stages = {}
+            for stage, hist in self.histograms.items():
+                stages[stage] = {
+                    'calls': hist['count'],
+                    'errors': self.counters.get(f'{stage}_errors', 0),
+                    'total_s': hist['sum'],
+                    'mean_s': hist['sum'] / hist['count'],
+                    'p50_s': self.quantile(stage, 0.5),
+                    'p90_s': self.quantile(stage, 0.9),
+                    'p99_s': self.quantile(stage, 0.99),
+                    'max_s': hist['max'],
+                }
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+
+class PrometheusSink(HistogramSink):
+    """
+    HistogramSink exposed in the Prometheus text exposition format
+
+    Args:
+        prefix: Metric name prefix
+        buckets: Bucket upper bounds in seconds
+    """
+
+    def __init__(self, prefix: str = 'draft_predictor', buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(buckets)
+        self.prefix = prefix
+        self._server = None
+
+    def render(self) -> str:
+        """Current histograms and counters as Prometheus text"""
+        name = f'{self.prefix}_stage_seconds'
+        lines = [f'# HELP {name} Time spent in each prediction stage',
+                 f'# TYPE {name} histogram']
+        with self._lock:
+            for stage, hist in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist['counts']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist["count"]}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {hist["sum"]}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {hist["count"]}')
+            counter = f'{self.prefix}_events_total'
+            lines += [f'# HELP {counter} Prediction events (cache hits, errors, ...)',
+                      f'# TYPE {counter} counter']
+            for event, value in sorted(self.counters.items()):
+                lines.append(f'{counter}{{event="{event}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int = 9100, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve render() at /metrics from a daemon thread"""
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = sink.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class JSONLogSink:
+    """
+    Writes one JSON object per stage or counter update
+
+    Args:
+        target: File path (appended to) or writable text stream, defaults to stderr
+    """
+
+    def __init__(self, target=None):
+        self._lock = threading.Lock()
+        if isinstance(target, str):
+            self._stream = open(target, 'a')
+            self._owns_stream = True
+        else:
+            self._stream = target if target is not None else sys.stderr
+            self._owns_stream = False
+
+    def _write(self, record: dict):
+        line = json.dumps(record)
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        self._write({'ts': time.time(), 'type': 'stage', 'stage': stage,
+                     'seconds': seconds, 'error': error})
+
+    def increment(self, name: str, value: int = 1):
+        self._write({'ts': time.time(), 'type': 'counter', 'name': name, 'value': value})
+
+    def close(self):
+        if self._owns_stream:
+            self._stream.close()
@@ -0,0 +1,335 @@
+"""
+model_registry.py - Per-league (and per-year) predictors served from one process
+
+Each league gets its own inference artifact (see
+DraftBasedPredictor.export_artifact) named
+    draft_predictor_<league>.pkl.gz          every year of the league
+    draft_predictor_<league>_<year>.pkl.gz   one season
+in the model folder. ModelRegistry finds them, loads one on its first
+request and keeps the loaded predictors in an LRU bounded by memory: when a
+load pushes the total over `max_bytes`, the least recently used predictors
+are dropped (pinned ones, e.g. preloaded hot leagues, are never dropped).
+Every load and eviction is timed, logged and reported by stats().
+
+The artifacts are built from the multi-league dataset of build_dataset.py:
+    python model_registry.py build ../Data/Team_stats_Tournamennts.csv --leagues LCK LPL LEC
+    python model_registry.py build ../Data/Team_stats_Tournamennts.csv --by-year
+    python model_registry.py list
+"""
+import argparse
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import pandas as pd
+
+from metrics import Metrics
+from predictor_new import DraftBasedPredictor, DATA_COLUMNS, FEATURES
+from team_champion_stats import add_team_champion_features
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = '../Models'
+LEAGUE_DATA_DIR = '../Data/leagues'
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+ARTIFACT_PATTERN = re.compile(r'^draft_predictor_(?P<league>[A-Za-z0-9]+?)(?:_(?P<year>\d{4}))?\.pkl\.gz$')
+# Single-model artifact of the site, not a league
+NON_LEAGUE_ARTIFACTS = {'inference'}
+# tracemalloc is process-wide: measured loads run one at a time, so no load
+# stops the tracer under another or counts another's allocations
+_MEASURE_LOCK = threading.Lock()
+
+
+def artifact_name(league: str, year: int = None) -> str:
+    return f"draft_predictor_{league}.pkl.gz" if year is None else f"draft_predictor_{league}_{year}.pkl.gz"
+
+
+def _load_measured(loader, path: str) -> tuple[object, int]:
+    """Run loader(path) and return (result, bytes it left allocated)"""
+    with _MEASURE_LOCK:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            predictor = loader(path)
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+    return predictor, max(after - before, 0)
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, memory-bounded LRU of per-league predictors
+
+    Args:
+        model_dir: Folder holding the draft_predictor_<league>[_<year>].pkl.gz artifacts
+        max_bytes: Memory budget for loaded predictors (measured with tracemalloc while
+            loading; measured loads run one at a time across the process)
+        preload: Keys loaded right away, as 'LCK' or ('LCK', 2024)
+        pin_preloaded: Never evict the preloaded predictors
+        loader: Function path -> predictor, defaults to DraftBasedPredictor.load_artifact
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 preload: list = None, pin_preloaded: bool = True, loader=None):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.loader = loader or DraftBasedPredictor.load_artifact
+        self.metrics = Metrics()
+        self._paths = {}
+        self._loaded = OrderedDict()    # key -> (predictor, bytes)
+        self._pinned = set()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.discover()
+        if preload:
+            self.preload(preload, pin=pin_preloaded)
+
+    @staticmethod
+    def _key(league, year=None) -> tuple:
+        if isinstance(league, tuple):
+            league, year = league
+        return (league, None if year is None else int(year))
+
+    def discover(self) -> list[tuple]:
+        """Register every artifact found in model_dir; returns the known keys"""
+        if os.path.isdir(self.model_dir):
+            for name in sorted(os.listdir(self.model_dir)):
+                match = ARTIFACT_PATTERN.match(name)
+                if match and match['league'] not in NON_LEAGUE_ARTIFACTS:
+                    key = self._key(match['league'], match['year'])
+                    self._paths.setdefault(key, os.path.join(self.model_dir, name))
+        return self.available()
+
+    def register(self, league: str, path: str, year: int = None):
+        """Serve `league` (and `year`) from an artifact outside the naming scheme"""
+        key = self._key(league, year)
+        with self._lock:
+            self._paths[key] = path
+            if key in self._loaded:
+                self._evict(key)
+
+    def available(self) -> list[tuple]:
+        return sorted(self._paths, key=lambda k: (k[0], k[1] or 0))
+
+    def leagues(self) -> list[str]:
+        return sorted({league for league, _ in self._paths})
+
+    def get(self, league: str, year: int = None) -> DraftBasedPredictor:
+        """
+        Predictor for a league (a season if `year` is given), loading it if needed
+
+        Raises:
+            KeyError: No artifact for that league/year
+        """
+        key = self._key(league, year)
+        with self._lock:
+            entry = self._loaded.get(key)
+            if entry is not None:
+                self._loaded.move_to_end(key)
+                self._stat(key)['hits'] += 1
+                self.metrics.increment('registry_hit')
+                return entry[0]
+            if key not in self._paths:
+                raise KeyError(f"No model for league {key[0]}" + (f" {key[1]}" if key[1] else ""))
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One load per key even if several requests miss at once; other keys stay available
+        with key_lock:
+            with self._lock:
+                entry = self._loaded.get(key)
+                if entry is not None:
+                    self._loaded.move_to_end(key)
+                    self._stat(key)['hits'] += 1
+                    return entry[0]
+            return self._load(key)
+
+    def preload(self, keys: list, pin: bool = True):
+        """Load the given leagues now; pinned ones are exempt from eviction"""
+        for key in keys:
+            key = self._key(key)
+            if pin:
+                with self._lock:
+                    self._pinned.add(key)
+            self.get(*key)
+
+    def unpin(self, league: str, year: int = None):
+        with self._lock:
+            self._pinned.discard(self._key(league, year))
+
+    def _stat(self, key) -> dict:
+        return self._stats.setdefault(key, {'loads': 0, 'hits': 0, 'evictions': 0, 'bytes': 0,
+                                            'load_seconds': 0.0, 'last_load_seconds': None,
+                                            'evict_seconds': 0.0})
+
+    def _load(self, key) -> DraftBasedPredictor:
+        path = self._paths[key]
+        self.metrics.increment('registry_miss')
+        start = time.perf_counter()
+        with self.metrics.stage('registry_load'):
+            predictor, nbytes = _load_measured(self.loader, path)
+        seconds = time.perf_counter() - start
+        logger.info("Loaded %s from %s in %.3fs (%.1f MB)", key, path, seconds, nbytes / 1e6)
+        with self._lock:
+            stat = self._stat(key)
+            stat['loads'] += 1
+            stat['load_seconds'] += seconds
+            stat['last_load_seconds'] = seconds
+            stat['bytes'] = nbytes
+            self._loaded[key] = (predictor, nbytes)
+            self._enforce_budget(keep=key)
+        return predictor
+
+    def _enforce_budget(self, keep):
+        """Evict least recently used, unpinned predictors until the budget holds"""
+        for key in list(self._loaded):
+            if self.resident_bytes() <= self.max_bytes:
+                return
+            if key != keep and key not in self._pinned:
+                self._evict(key)
+        if self.resident_bytes() > self.max_bytes:
+            logger.warning("Loaded models use %.1f MB, over the %.1f MB budget (pinned or single model)",
+                           self.resident_bytes() / 1e6, self.max_bytes / 1e6)
+
+    def _evict(self, key):
+        start = time.perf_counter()
+        with self.metrics.stage('registry_evict'):
+            predictor, nbytes = self._loaded.pop(key)
+            # Freed here unless a caller still holds it
+            del predictor
+        seconds = time.perf_counter() - start
+        stat = self._stat(key)
+        stat['evictions'] += 1
+        stat['evict_seconds'] += seconds
+        self.metrics.increment('registry_eviction')
+        logger.info("Evicted %s (%.1f MB) in %.4fs", key, nbytes / 1e6, seconds)
+
+    def evict(self, league: str, year: int = None):
+        """Drop a loaded predictor (it is reloaded on its next request)"""
+        with self._lock:
+            key = self._key(league, year)
+            if key in self._loaded:
+                self._evict(key)
+
+    def resident_bytes(self) -> int:
+        return sum(nbytes for _, nbytes in self._loaded.values())
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            {'resident_bytes', 'max_bytes', 'loaded': [keys, most recent last],
+             'models': {key: {loads, hits, evictions, bytes, load_seconds,
+                              last_load_seconds, evict_seconds, loaded, pinned}}}
+        """
+        with self._lock:
+            models = {}
+            for key in self.available():
+                stat = dict(self._stat(key))
+                stat['loaded'] = key in self._loaded
+                stat['pinned'] = key in self._pinned
+                models[key] = stat
+            return {'resident_bytes': self.resident_bytes(), 'max_bytes': self.max_bytes,
+                    'loaded': list(self._loaded), 'models': models}
+
+
+def prepare_league_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn build_dataset.py output for one league/season into the predictor's CSV layout
+
+    Adds winrate_pickN/count_pickN from that league's own games and fills
+    stats missing for partial-data leagues (e.g. LPL has no @15 snapshots)
+    with the league median, or 0 when a stat is missing entirely.
+    """
+    df = add_team_champion_features(df.reset_index(drop=True))
+    stats = [f for f in FEATURES if not f.endswith('_encoded') and f in df.columns]
+    df[stats] = df[stats].fillna(df[stats].median()).fillna(0)
+    return df[DATA_COLUMNS]
+
+
+def build_league_artifacts(dataset_path: str, leagues: list[str] = None, by_year: bool = False,
+                           model_dir: str = MODEL_DIR, data_dir: str = LEAGUE_DATA_DIR,
+                           search: str = 'random', max_fits: int = 30, min_games: int = 50) -> dict:
+    """
+    Train and export one predictor per league (or per league and year)
+
+    Args:
+        dataset_path: Multi-league CSV written by build_dataset.py
+        leagues: Leagues to build, defaults to every league in the file
+        by_year: One artifact per (league, year) instead of per league
+        model_dir: Where the artifacts go
+        data_dir: Where each league's prepared CSV goes (the predictor trains from a CSV)
+        search: train_model search strategy
+        max_fits: train_model fit budget per league
+        min_games: Skip leagues/seasons with fewer games
+
+    Returns:
+        {key: {'rows', 'test_accuracy', 'best_model', 'seconds', 'artifact'}}
+    """
+    df = pd.read_csv(dataset_path, low_memory=False)
+    if 'year' not in df.columns:
+        df['year'] = pd.to_datetime(df['date']).dt.year
+    if leagues is not None:
+        df = df[df['league'].isin(leagues)]
+    os.makedirs(model_dir, exist_ok=True)
+    os.makedirs(data_dir, exist_ok=True)
+
+    keys = ['league', 'year'] if by_year else ['league']
+    built = {}
+    for group, part in df.groupby(keys, sort=True):
+        league, year = (group if by_year else (group[0], None))
+        key = (league, None if year is None else int(year))
+        if part['gameid'].nunique() < min_games:
+            logger.warning("Skipping %s: only %d games", key, part['gameid'].nunique())
+            continue
+        start = time.perf_counter()
+        name = artifact_name(*key)
+        csv_path = os.path.join(data_dir, name.replace('draft_predictor_', '').replace('.pkl.gz', '.csv'))
+        prepare_league_data(part).to_csv(csv_path, index=False)
+        predictor = DraftBasedPredictor(csv_path)
+        report = predictor.train_model(search=search, max_fits=max_fits, profile='headless')
+        path = os.path.join(model_dir, name)
+        predictor.export_artifact(path)
+        built[key] = {'rows': len(part), 'test_accuracy': report['test_accuracy'],
+                      'best_model': report['best_model'], 'seconds': time.perf_counter() - start,
+                      'artifact': path}
+        print(f"{league:<8} {year or 'all':>5} {len(part):>7} rows  {report['best_model']:<14} "
+              f"acc {report['test_accuracy']:.3f}  {built[key]['seconds']:.1f}s")
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-league predictor registry")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Train one artifact per league")
+    build.add_argument('dataset', help="Multi-league CSV from build_dataset.py")
+    build.add_argument('--leagues', nargs='*', default=None)
+    build.add_argument('--by-year', action='store_true')
+    build.add_argument('--model-dir', default=MODEL_DIR)
+    build.add_argument('--search', default='random')
+    build.add_argument('--max-fits', type=int, default=30)
+    listing = commands.add_parser('list', help="Load every artifact once and report load times/sizes")
+    listing.add_argument('--model-dir', default=MODEL_DIR)
+    listing.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 ** 2)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_league_artifacts(args.dataset, args.leagues, args.by_year, args.model_dir,
+                               search=args.search, max_fits=args.max_fits)
+    else:
+        registry = ModelRegistry(args.model_dir, max_bytes=int(args.max_mb * 1024 ** 2))
+        for key in registry.available():
+            registry.get(*key)
+        stats = registry.stats()
+        print(f"{'league':<8} {'year':>5} {'load (s)':>9} {'MB':>7} {'evictions':>10} {'loaded':>7}")
+        for (league, year), stat in stats['models'].items():
+            print(f"{league:<8} {year or 'all':>5} {stat['last_load_seconds']:>9.3f} {stat['bytes'] / 1e6:>7.1f} "
+                  f"{stat['evictions']:>10} {str(stat['loaded']):>7}")
+        print(f"Resident: {stats['resident_bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,443 @@
+"""
+model_search.py - Budgeted hyperparameter search used by DraftBasedPredictor.train_model
+
+Search modes:
+    grid:    every combination of the grid (what GridSearchCV did before)
+    random:  randomly sampled combinations, each scored on the full CV folds
+    halving: successive halving - many sampled combinations are scored on a
+             small subsample of each training fold, the best 1/eta move on to
+             the next rung with eta times more rows
+
+All model families share one worker pool. Each round collects every pending
+(family, candidate, fold) fit and runs them together with single-threaded
+classifiers, so the families run concurrently without nested n_jobs
+oversubscription. A fit-count and/or wall-clock budget stops the search
+between batches; every scored candidate is kept in a trajectory so accuracy
+can be compared with the compute spent. With a CVResultCache, folds scored
+by an earlier (or interrupted) run are read back instead of refitted.
+"""
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
+import xgboost as xgb
+
+from cv_cache import CVResultCache, dataset_fingerprint
+
+SEARCH_MODES = ('grid', 'random', 'halving')
+
+# Default number of sampled candidates per family when no fit budget is given
+DEFAULT_RANDOM_CANDIDATES = 20
+DEFAULT_HALVING_CANDIDATES = 81
+
+# Early stopping used by the budgeted modes
+XGB_EARLY_STOPPING_ROUNDS = 20
+EARLY_STOPPING_FRACTION = 0.1
+
+# Smallest training subsample used by the first halving rung
+MIN_HALVING_SAMPLES = 100
+
+
+def _uses_early_stopping(pipeline) -> bool:
+    return isinstance(pipeline.named_steps['classifier'], xgb.XGBClassifier) and \
+        pipeline.named_steps['classifier'].get_params().get('early_stopping_rounds') is not None
+
+
+def fit_pipeline(pipeline, X: np.ndarray, y: np.ndarray, random_state: int = 42):
+    """
+    Fit a scaler/classifier pipeline, holding out part of X for XGBoost early stopping
+
+    Args:
+        pipeline: Pipeline with 'scaler' and 'classifier' steps
+        X: Training features
+        y: Training labels
+        random_state: Seed for the early-stopping split
+
+    Returns:
+        The fitted pipeline
+    """
+    if not _uses_early_stopping(pipeline):
+        return pipeline.fit(X, y)
+
+    n_val = max(2, int(round(len(y) * EARLY_STOPPING_FRACTION)))
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X, y, test_size=n_val, stratify=y, random_state=random_state)
+    scaler = clone(pipeline.named_steps['scaler']).fit(X_fit)
+    return pipeline.fit(X_fit, y_fit,
+                        classifier__eval_set=[(scaler.transform(X_val), y_val)],
+                        classifier__verbose=False)
+
+
+def _fit_and_score(pipeline, params: dict, X: np.ndarray, y: np.ndarray,
+                   train_idx: np.ndarray, test_idx: np.ndarray, random_state: int) -> tuple[float, float]:
+    """Fit one candidate on one (possibly subsampled) fold; returns (accuracy, fit seconds)"""
+    pipeline = clone(pipeline).set_params(**params)
+    start = time.perf_counter()
+    fit_pipeline(pipeline, X[train_idx], y[train_idx], random_state)
+    fit_seconds = time.perf_counter() - start
+    return accuracy_score(y[test_idx], pipeline.predict(X[test_idx])), fit_seconds
+
+
+def _search_space(pipeline, param_grid: dict, mode: str) -> tuple[dict, dict]:
+    """
+    Split a grid into the searched part and fixed parameters
+
+    The budgeted modes turn on early stopping: XGBoost trains up to the largest
+    n_estimators in the grid and stops on a held-out split, the MLP uses its
+    built-in early_stopping.
+    """
+    grid = dict(param_grid)
+    fixed = {}
+    if mode != 'grid':
+        classifier = pipeline.named_steps['classifier']
+        if isinstance(classifier, xgb.XGBClassifier):
+            fixed['classifier__n_estimators'] = max(grid.pop('classifier__n_estimators', [classifier.n_estimators]))
+            fixed['classifier__early_stopping_rounds'] = XGB_EARLY_STOPPING_ROUNDS
+        elif 'early_stopping' in classifier.get_params():
+            grid.pop('classifier__early_stopping', None)
+            fixed['classifier__early_stopping'] = True
+    # Every CV fit runs single-threaded, parallelism comes from the shared pool
+    if 'n_jobs' in pipeline.named_steps['classifier'].get_params():
+        fixed['classifier__n_jobs'] = 1
+    return grid, fixed
+
+
+def _halving_cost(n_candidates: int, n_rungs: int, eta: int, cv: int) -> int:
+    cost, n = 0, n_candidates
+    for _ in range(n_rungs):
+        cost += n * cv
+        n = max(1, math.ceil(n / eta))
+    return cost
+
+
+def _plan_family(pipeline, param_grid: dict, mode: str, fits: int, cv: int, eta: int,
+                 n_train: int, random_state: int) -> dict:
+    """Candidates and rung sizes for one model family"""
+    grid, fixed = _search_space(pipeline, param_grid, mode)
+    grid_size = len(ParameterGrid(grid))
+
+    if mode == 'grid':
+        candidates = list(ParameterGrid(grid))
+        rung_sizes = [n_train]
+    elif mode == 'random':
+        n_candidates = DEFAULT_RANDOM_CANDIDATES if fits is None else max(1, fits // cv)
+        candidates = list(ParameterSampler(grid, min(n_candidates, grid_size), random_state=random_state))
+        rung_sizes = [n_train]
+    else:
+        n_rungs = 1
+        while n_rungs < 10 and n_train // eta ** n_rungs >= MIN_HALVING_SAMPLES:
+            n_rungs += 1
+        if fits is None:
+            n_candidates = DEFAULT_HALVING_CANDIDATES
+        else:
+            n_candidates = 1
+            while _halving_cost(n_candidates + 1, n_rungs, eta, cv) <= fits and n_candidates < grid_size:
+                n_candidates += 1
+        n_candidates = min(n_candidates, grid_size)
+        # No point in more rungs than needed to get down to one candidate
+        if n_candidates > 1:
+            n_rungs = min(n_rungs, 1 + math.ceil(math.log(n_candidates, eta)))
+        else:
+            n_rungs = 1
+        candidates = list(ParameterSampler(grid, n_candidates, random_state=random_state))
+        rung_sizes = [n_train // eta ** (n_rungs - 1 - k) for k in range(n_rungs)]
+
+    return {
+        'candidates': [{**params, **fixed} for params in candidates],
+        'fixed': fixed,
+        'rung_sizes': rung_sizes,
+    }
+
+
+def search_models(pipelines: dict, param_grids: dict, X, y, mode: str = 'grid', cv: int = 5,
+                  max_fits: int = None, max_seconds: float = None, eta: int = 3,
+                  n_jobs: int = -1, random_state: int = 42, cache: CVResultCache = None,
+                  cache_context: dict = None, verbose: bool = True) -> dict:
+    """
+    Tune several model families under a shared budget
+
+    Args:
+        pipelines: Family name -> unfitted Pipeline ('scaler' + 'classifier')
+        param_grids: Family name -> parameter grid (lists of values)
+        X: Training features
+        y: Training labels
+        mode: 'grid', 'random' or 'halving'
+        cv: Number of stratified folds
+        max_fits: Total number of fold fits allowed across all families
+        max_seconds: Wall-clock limit; checked between batches of fits
+        eta: Halving rate (keep the best 1/eta candidates per rung)
+        n_jobs: Worker processes shared by all families
+        random_state: Seed for candidate sampling, subsampling and early stopping
+        cache: Persistent fold-result cache; folds found there are not refitted
+        cache_context: Extra data identifying the run in cache keys (e.g. the feature list)
+
+    Returns:
+        Dictionary with per-family 'results' (best_params, best_score,
+        best_pipeline refitted on all of X), the search 'trajectory',
+        totals 'n_fits' (fits actually run) and 'elapsed_seconds', and
+        'cache_stats' when a cache is used
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+
+    X = np.asarray(X)
+    y = np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    n_train = min(len(train_idx) for train_idx, _ in folds)
+
+    # Fixed per-fold row order used for halving subsamples
+    rng = np.random.default_rng(random_state)
+    shuffled_folds = [(rng.permutation(train_idx), test_idx) for train_idx, test_idx in folds]
+
+    family_fits = None if max_fits is None else max(cv, max_fits // len(pipelines))
+    plans = {
+        name: _plan_family(pipelines[name], param_grids[name], mode, family_fits, cv, eta, n_train, random_state)
+        for name in pipelines
+    }
+    for name, plan in plans.items():
+        plan['alive'] = list(range(len(plan['candidates'])))
+        plan['scores'] = {}   # (rung, candidate) -> mean accuracy
+        if verbose:
+            print(f"{name}: {len(plan['candidates'])} candidates, rungs {plan['rung_sizes']}")
+
+    trajectory = []
+    n_fits = 0
+    fit_seconds_total = 0.0
+    start = time.perf_counter()
+    parallel = Parallel(n_jobs=n_jobs, return_as='generator')
+    if cache is not None:
+        dataset = dataset_fingerprint(X, y)
+        cache_context = cache_context or {}
+    # Small enough batches for the time budget to be checked regularly
+    batch_size = 4 * effective_n_jobs(n_jobs) * cv
+    out_of_budget = False
+
+    def record(rung, fold_results, task, score, fit_seconds, cached):
+        """Store one fold result; once all folds are in, score the candidate"""
+        nonlocal n_fits, fit_seconds_total
+        name, cand, fold, sub_idx, _ = task
+        fold_results.setdefault((name, cand), []).append((score, fit_seconds, len(sub_idx), cached))
+        if not cached:
+            n_fits += 1
+            fit_seconds_total += fit_seconds
+        # Candidate finished all folds on this rung
+        if len(fold_results[(name, cand)]) == cv:
+            results = fold_results[(name, cand)]
+            scores = [r[0] for r in results]
+            plans[name]['scores'][(rung, cand)] = float(np.mean(scores))
+            trajectory.append({
+                'model': name,
+                'rung': rung,
+                'n_samples': int(np.mean([r[2] for r in results])),
+                'params': {k: v for k, v in plans[name]['candidates'][cand].items()
+                           if k not in plans[name]['fixed']},
+                'mean_score': float(np.mean(scores)),
+                'fold_scores': scores,
+                'fit_seconds': float(sum(r[1] for r in results)),
+                'cached_folds': sum(r[3] for r in results),
+                'cumulative_fit_seconds': fit_seconds_total,
+                'cumulative_fits': n_fits,
+                'elapsed_seconds': time.perf_counter() - start,
+            })
+
+    n_rounds = max(len(plan['rung_sizes']) for plan in plans.values())
+    for rung in range(n_rounds):
+        # Candidates of the different families are interleaved so that a
+        # budget cut still leaves every family with scored candidates
+        family_groups = []
+        for name, plan in plans.items():
+            if rung >= len(plan['rung_sizes']):
+                continue
+            n_samples = plan['rung_sizes'][rung]
+            groups = []
+            for cand in plan['alive']:
+                groups.append([
+                    (name, cand, fold, train_idx if n_samples >= n_train else np.sort(train_idx[:n_samples]), test_idx)
+                    for fold, (train_idx, test_idx) in enumerate(shuffled_folds)
+                ])
+            family_groups.append(groups)
+        tasks = [task
+                 for position in range(max((len(g) for g in family_groups), default=0))
+                 for groups in family_groups if position < len(groups)
+                 for task in groups[position]]
+
+        fold_results = {}
+
+        # Folds already scored in an earlier run cost nothing
+        task_keys = {}
+        pending = []
+        for task in tasks:
+            if cache is None:
+                pending.append(task)
+                continue
+            name, cand, fold, sub_idx, _ = task
+            candidate = clone(pipelines[name]).set_params(**plans[name]['candidates'][cand])
+            key = cache.make_key(dataset, cache_context, name, candidate, fold, cv, len(sub_idx), random_state)
+            cached = cache.get(key)
+            if cached is None:
+                task_keys[id(task)] = key
+                pending.append(task)
+            else:
+                record(rung, fold_results, task, cached[0], cached[1], cached=True)
+
+        for batch_start in range(0, len(pending), batch_size):
+            elapsed = time.perf_counter() - start
+            if max_seconds is not None and elapsed >= max_seconds:
+                out_of_budget = True
+            if max_fits is not None and n_fits >= max_fits:
+                out_of_budget = True
+            if out_of_budget:
+                break
+            batch = pending[batch_start:batch_start + batch_size]
+            if max_fits is not None:
+                batch = batch[:max_fits - n_fits]
+            outputs = parallel(
+                delayed(_fit_and_score)(pipelines[name], plans[name]['candidates'][cand],
+                                        X, y, sub_idx, test_idx, random_state)
+                for name, cand, fold, sub_idx, test_idx in batch
+            )
+            # Results arrive in order; each one is stored as soon as it is back
+            for i, (score, fit_seconds) in enumerate(outputs):
+                task = batch[i]
+                if cache is not None:
+                    cache.put(task_keys[id(task)], task[0], score, fit_seconds)
+                record(rung, fold_results, task, score, fit_seconds, cached=False)
+
+        # Promote the best 1/eta of every family to the next rung
+        for name, plan in plans.items():
+            if rung >= len(plan['rung_sizes']):
+                continue
+            scored = [c for c in plan['alive'] if (rung, c) in plan['scores']]
+            if not scored:
+                continue
+            plan['best_rung'] = rung
+            plan['best_candidates'] = scored
+            if rung + 1 < len(plan['rung_sizes']):
+                keep = max(1, math.ceil(len(scored) / eta))
+                # Stable sort keeps the earlier candidate on ties
+                plan['alive'] = sorted(scored, key=lambda c: -plan['scores'][(rung, c)])[:keep]
+        if out_of_budget:
+            if verbose:
+                print(f"Search budget reached after {n_fits} fits "
+                      f"({time.perf_counter() - start:.1f}s)")
+            break
+
+    # Refit the best candidate of every family on all of X
+    results = {}
+    for name, plan in plans.items():
+        if 'best_rung' not in plan:
+            if verbose:
+                print(f"{name}: no candidate finished within the budget, skipped")
+            continue
+        rung = plan['best_rung']
+        best = max(plan['best_candidates'], key=lambda c: (plan['scores'][(rung, c)], -c))
+        params = plan['candidates'][best]
+        # The final model may use every core again
+        refit_params = {k: v for k, v in params.items() if k != 'classifier__n_jobs'}
+        pipeline = clone(pipelines[name]).set_params(**refit_params)
+        fit_pipeline(pipeline, X, y, random_state)
+        results[name] = {
+            'best_params': {k: v for k, v in params.items() if k not in plan['fixed']},
+            'fixed_params': {k: v for k, v in plan['fixed'].items() if k != 'classifier__n_jobs'},
+            'best_score': plan['scores'][(rung, best)],
+            'best_rung': rung,
+            'best_pipeline': pipeline,
+        }
+
+    cache_stats = None
+    if cache is not None:
+        cache_stats = cache.stats()
+        if verbose:
+            print(f"CV cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                  f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['stored']} folds stored")
+
+    return {
+        'mode': mode,
+        'results': results,
+        'cache_stats': cache_stats,
+        'trajectory': trajectory,
+        'n_fits': n_fits,
+        'fit_seconds': fit_seconds_total,
+        'elapsed_seconds': time.perf_counter() - start,
+    }
+
+
+def _learning_curve_point(pipeline, X: np.ndarray, y: np.ndarray, train_idx: np.ndarray,
+                          test_idx: np.ndarray, random_state: int) -> tuple[float, float]:
+    """Fit on one subsample; returns (training accuracy, held-out accuracy)"""
+    pipeline = fit_pipeline(clone(pipeline), X[train_idx], y[train_idx], random_state)
+    return (accuracy_score(y[train_idx], pipeline.predict(X[train_idx])),
+            accuracy_score(y[test_idx], pipeline.predict(X[test_idx])))
+
+
+def learning_curve_scores(pipeline, X, y, train_sizes=np.linspace(0.1, 1.0, 10), cv: int = 5,
+                          n_jobs: int = -1, random_state: int = 42) -> dict:
+    """
+    Learning curve with the same folds, subsampling and early stopping as search_models
+
+    Unlike sklearn's learning_curve this also works for the early-stopping
+    XGBoost pipelines produced by the budgeted modes.
+
+    Args:
+        pipeline: Pipeline to evaluate (cloned for every fit)
+        X: Training features
+        y: Training labels
+        train_sizes: Fractions of each training fold to fit on
+        cv: Number of stratified folds
+        n_jobs: Worker processes
+        random_state: Seed for subsampling and early stopping
+
+    Returns:
+        Dictionary with 'train_sizes' (rows) and 'train_scores'/'test_scores'
+        arrays of shape (n_sizes, cv), as returned by sklearn's learning_curve
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    folds = [(rng.permutation(train_idx), test_idx)
+             for train_idx, test_idx in StratifiedKFold(n_splits=cv).split(X, y)]
+    n_train = min(len(train_idx) for train_idx, _ in folds)
+    sizes = [max(MIN_HALVING_SAMPLES // 10, int(fraction * n_train)) for fraction in train_sizes]
+
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_learning_curve_point)(pipeline, X, y, np.sort(train_idx[:size]), test_idx, random_state)
+        for size in sizes for train_idx, test_idx in folds
+    )
+    scores = np.asarray(scores).reshape(len(sizes), cv, 2)
+    return {
+        'train_sizes': np.asarray(sizes),
+        'train_scores': scores[:, :, 0],
+        'test_scores': scores[:, :, 1],
+    }
+
+
+def rung_learning_curve(search_result: dict, name: str):
+    """
+    Learning curve read from the halving rungs of a finished search
+
+    The winning candidate of a halving search was scored on every rung, i.e.
+    on growing subsamples of the same CV folds, so those scores already are
+    the held-out half of a learning curve and cost no extra fits.
+
+    Args:
+        search_result: Return value of search_models
+        name: Model family
+
+    Returns:
+        Dictionary with 'train_sizes' and 'test_scores' (n_rungs, cv), or None
+        when the winner was scored on fewer than two sizes (grid/random modes)
+    """
+    best_params = search_result['results'][name]['best_params']
+    points = sorted((entry for entry in search_result['trajectory']
+                     if entry['model'] == name and entry['params'] == best_params),
+                    key=lambda entry: entry['rung'])
+    if len(points) < 2:
+        return None
+    return {
+        'train_sizes': np.array([entry['n_samples'] for entry in points]),
+        'test_scores': np.array([entry['fold_scores'] for entry in points]),
+    }
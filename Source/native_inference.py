@@ -0,0 +1,225 @@
+"""
+native_inference.py - Scoring the fitted scaler + classifier without the sklearn Pipeline
+
+Pipeline.predict_proba validates its input once per step and goes through
+the sklearn wrappers of the classifier, which for the one or two rows of a
+single prediction costs more than the model itself. compile_pipeline turns
+a fitted ('scaler', 'classifier') pipeline into a small evaluator with the
+same predict_proba:
+
+    XGBoost:       (X - mean) / scale as one float32 array, then the booster's
+                   inplace_predict (keeping best_iteration from early stopping)
+    RandomForest:  every tree flattened into shared node arrays and walked
+                   for all rows and trees at once, one level per step
+    MLP:           the scaler folded into the first layer's weights and bias,
+                   then a plain NumPy forward pass
+
+The transform matches StandardScaler.transform and the trees see the same
+float32 inputs as in the pipeline, so the probabilities agree up to
+floating-point summation order. Other classifiers are not compiled
+(compile_pipeline returns None) and keep going through the pipeline.
+
+Only NumPy is imported up front. compile_pipeline picks the evaluator from
+the module the classifier's class comes from and imports only that library
+(already loaded by unpickling the pipeline), so compiling a RandomForest or
+MLP pipeline never loads xgboost and vice versa.
+
+Example:
+    native = compile_pipeline(predictor.model, X_check=features)
+    native.predict_proba(features)      # same as predictor.model.predict_proba(features)
+"""
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import StandardScaler
+    import xgboost as xgb
+
+logger = logging.getLogger(__name__)
+
+# Largest difference to Pipeline.predict_proba accepted by the X_check of compile_pipeline
+DEFAULT_TOLERANCE = 1e-6
+
+ACTIVATIONS = {
+    'identity': lambda z: z,
+    'relu': lambda z: np.maximum(z, 0, out=z),
+    'tanh': lambda z: np.tanh(z, out=z),
+    'logistic': lambda z: np.divide(1.0, 1.0 + np.exp(-z, out=z), out=z),
+}
+
+
+class NativeModel:
+    """
+    Base class: the fitted StandardScaler as one vectorized transform
+
+    Args:
+        scaler: Fitted StandardScaler (with or without centering/scaling)
+    """
+
+    def __init__(self, scaler: 'StandardScaler'):
+        self.n_features_in_ = scaler.n_features_in_
+        self.mean = np.zeros(self.n_features_in_) if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.ones(self.n_features_in_) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+
+    def _check(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        return X
+
+    def _scaled(self, X) -> np.ndarray:
+        """StandardScaler.transform as a contiguous float32 array (what the tree models read)"""
+        return np.ascontiguousarray((self._check(X) - self.mean) / self.scale, dtype=np.float32)
+
+    def positive_proba(self, X) -> np.ndarray:
+        """Probability of class 1 for every row"""
+        raise NotImplementedError
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Same layout (and dtype) as Pipeline.predict_proba: columns for class 0 and class 1"""
+        positive = self.positive_proba(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+class XGBoostModel(NativeModel):
+    """Binary XGBClassifier scored through Booster.inplace_predict"""
+
+    def __init__(self, scaler: 'StandardScaler', classifier: 'xgb.XGBClassifier'):
+        super().__init__(scaler)
+        self.booster = classifier.get_booster()
+        self.missing = classifier.missing
+        # Early-stopped models predict with their best iteration, as XGBClassifier does
+        try:
+            self.iteration_range = (0, classifier.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+
+    def positive_proba(self, X) -> np.ndarray:
+        return self.booster.inplace_predict(self._scaled(X), iteration_range=self.iteration_range,
+                                            missing=self.missing, validate_features=False)
+
+
+class ForestModel(NativeModel):
+    """
+    Binary RandomForestClassifier with all trees in flat node arrays
+
+    Leaves point to themselves, so walking max_depth levels from every root
+    ends on the leaf of each (row, tree) pair.
+    """
+
+    def __init__(self, scaler: 'StandardScaler', classifier: 'RandomForestClassifier'):
+        super().__init__(scaler)
+        trees = [estimator.tree_ for estimator in classifier.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        self.roots = offsets[:-1]
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        left, right, feature, threshold, positive = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            value = tree.value[:, 0, :]
+            positive.append(value[:, 1] / value.sum(axis=1))
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.positive = np.concatenate(positive)
+
+    def positive_proba(self, X) -> np.ndarray:
+        X = self._scaled(X)
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.positive[node].mean(axis=1)
+
+
+class MLPModel(NativeModel):
+    """Binary MLPClassifier with the scaler folded into the first layer"""
+
+    def __init__(self, scaler: 'StandardScaler', classifier: 'MLPClassifier'):
+        super().__init__(scaler)
+        weights = [np.asarray(w, dtype=np.float64) for w in classifier.coefs_]
+        biases = [np.asarray(b, dtype=np.float64) for b in classifier.intercepts_]
+        # ((x - mean) / scale) @ W + b == x @ (W / scale) + (b - (mean / scale) @ W)
+        biases[0] = biases[0] - (self.mean / self.scale) @ weights[0]
+        weights[0] = weights[0] / self.scale[:, np.newaxis]
+        self.weights = weights
+        self.biases = biases
+        self.activation = classifier.activation
+        self.out_activation = classifier.out_activation_
+
+    def positive_proba(self, X) -> np.ndarray:
+        activations = self._check(X)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            activations = activations @ weight
+            activations += bias
+            activations = ACTIVATIONS[self.out_activation if i == last else self.activation](activations)
+        return activations[:, 0]
+
+
+def _is_binary(classifier) -> bool:
+    classes = getattr(classifier, 'classes_', None)
+    return classes is not None and len(classes) == 2 and list(classes) == [0, 1]
+
+
+def compile_pipeline(pipeline, X_check=None, tolerance: float = DEFAULT_TOLERANCE):
+    """
+    Native evaluator for a fitted ('scaler', 'classifier') pipeline
+
+    Args:
+        pipeline: Fitted Pipeline with a StandardScaler and an XGBoost,
+            RandomForest or MLP binary classifier
+        X_check: Optional rows scored both ways; the evaluator is only
+            returned when it matches Pipeline.predict_proba on them
+        tolerance: Largest accepted absolute difference on X_check
+
+    Returns:
+        NativeModel, or None when the pipeline is not supported (or fails the check)
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    steps = getattr(pipeline, 'named_steps', {})
+    if set(steps) != {'scaler', 'classifier'} or not isinstance(steps['scaler'], StandardScaler):
+        return None
+    scaler, classifier = steps['scaler'], steps['classifier']
+    if not hasattr(scaler, 'n_features_in_') or not _is_binary(classifier):
+        return None
+
+    module = type(classifier).__module__
+    native = None
+    if module.startswith('xgboost.'):
+        import xgboost as xgb
+        if (isinstance(classifier, xgb.XGBClassifier) and classifier.objective == 'binary:logistic'
+                and classifier.booster != 'gblinear'):
+            native = XGBoostModel(scaler, classifier)
+    elif module.startswith('sklearn.ensemble.'):
+        from sklearn.ensemble import RandomForestClassifier
+        if isinstance(classifier, RandomForestClassifier):
+            native = ForestModel(scaler, classifier)
+    elif module.startswith('sklearn.neural_network.'):
+        from sklearn.neural_network import MLPClassifier
+        if isinstance(classifier, MLPClassifier):
+            native = MLPModel(scaler, classifier)
+    if native is None:
+        return None
+
+    if X_check is not None:
+        difference = float(np.max(np.abs(native.predict_proba(X_check) - pipeline.predict_proba(X_check)),
+                                  initial=0.0))
+        if difference > tolerance:
+            logger.warning("Native %s differs from the pipeline by %.3g, using the pipeline",
+                           type(classifier).__name__, difference)
+            return None
+    return native
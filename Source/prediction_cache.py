@@ -0,0 +1,93 @@
+"""
+prediction_cache.py - In-memory LRU/TTL cache of full prediction results
+
+DraftBasedPredictor.predict_matches looks every matchup up here before
+building features. Keys hold the teams, both drafts, whether details were
+requested and the predictor's data and model versions, so ingesting data or
+assigning a new model makes older entries unreachable (they age out of the
+LRU). One lock guards the cache, so a predictor shared between Streamlit
+sessions or service threads can share it as well.
+
+Cached results are deep-copied on the way in and out, so callers can modify
+what they get back.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 1024
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with optional time-to-live
+
+    Args:
+        maxsize: Most entries kept; the least recently used one is evicted first
+        ttl: Seconds an entry stays valid, None for no expiry
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __getstate__(self):
+        # Entries and the lock are process-local; pickling keeps the settings only
+        return {'maxsize': self.maxsize, 'ttl': self.ttl}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'], state['ttl'])
+
+    def clear(self):
+        """Drop every entry and reset the statistics"""
+        with self._lock:
+            self._entries = OrderedDict()   # key -> (stored at, result)
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached result for key (a copy), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        return copy.deepcopy(result)
+
+    def put(self, key, result):
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            {'size', 'maxsize', 'ttl', 'hits', 'misses', 'hit_rate', 'evictions', 'expirations'}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl,
+                    'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'expirations': self.expirations}
@@ -0,0 +1,366 @@
+"""
+prediction_service.py - HTTP prediction service (ASGI) with request micro-batching
+
+The predictor is loaded once per process and shared by every request.
+Matchups from concurrent requests are queued and scored together: a single
+background task takes whatever is waiting (up to `max_batch`, waiting at
+most `max_wait` seconds for more) and runs one predict_matches call, i.e.
+one predict_proba, in a worker thread. Under load the batches grow on
+their own while the previous batch is being scored.
+
+Endpoints:
+    POST /predict        {"team1": "T1", "team1_picks": [5 champions],
+                          "team2": "Gen.G", "team2_picks": [5 champions]}
+    POST /predict/batch  {"matchups": [{...}, ...]}
+    GET  /health         status, model and batching statistics
+    GET  /metrics        stage timings and counters in the Prometheus text format
+
+--no-cache turns off the predictor's prediction cache, so repeated matchups
+are scored by predict_proba again (what load_test_service.py measures).
+
+The app is a plain ASGI callable, any ASGI server works. Running this file
+uses uvicorn (pip install uvicorn).
+
+Usage (from the Source folder):
+    python prediction_service.py --artifact ../Models/draft_predictor_inference.pkl.gz --port 8000
+    uvicorn prediction_service:app --port 8000   (loads ARTIFACT_PATH)
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import PrometheusSink
+from predictor_new import DraftBasedPredictor
+
+ARTIFACT_PATH = '../Models/draft_predictor_inference.pkl.gz'
+MAX_BATCH = 64
+MAX_WAIT = 0.002          # seconds a batch waits for more matchups
+MAX_BODY_BYTES = 1 << 20
+MAX_MATCHUPS_PER_REQUEST = 1000
+
+
+class RequestError(Exception):
+    """Invalid request, answered with HTTP 400"""
+
+
+def _to_builtin(value):
+    """numpy scalars/arrays -> plain Python for json.dumps"""
+    if isinstance(value, dict):
+        return {k: _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def parse_matchup(item) -> tuple:
+    """Request JSON object -> (team1, team1_picks, team2, team2_picks)"""
+    if not isinstance(item, dict):
+        raise RequestError("A matchup must be a JSON object")
+    matchup = []
+    for team in ('team1', 'team2'):
+        name, picks = item.get(team), item.get(f'{team}_picks')
+        if not isinstance(name, str) or not name:
+            raise RequestError(f"'{team}' must be a team name")
+        if (not isinstance(picks, list) or len(picks) != 5
+                or not all(isinstance(p, str) for p in picks)):
+            raise RequestError(f"'{team}_picks' must be a list of 5 champion names")
+        matchup += [name, picks]
+    return tuple(matchup)
+
+
+def format_result(result: dict) -> dict:
+    return {team: {'name': result[team]['name'], 'picks': list(result[team]['picks']),
+                   'win_probability': float(result[team]['win_probability'])}
+            for team in ('team1', 'team2')}
+
+
+class MicroBatcher:
+    """
+    Coalesces matchups from concurrent requests into predict_matches calls
+
+    Args:
+        predictor: Trained DraftBasedPredictor (used from one worker thread only)
+        max_batch: Most matchups scored by one call
+        max_wait: Seconds to wait for more matchups once the first one arrived
+    """
+
+    def __init__(self, predictor: DraftBasedPredictor, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.matchups = 0
+        self._queue = None
+        self._task = None
+        # One thread: the predictor's caches are not meant for concurrent use
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def predict(self, matchups: list[tuple]) -> list:
+        """Queue matchups and wait for their results (exceptions for matchups that failed)"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for matchup in matchups:
+            future = loop.create_future()
+            self._queue.put_nowait((matchup, future))
+            futures.append(future)
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            matchups = [matchup for matchup, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._score, matchups)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _score(self, matchups: list[tuple]) -> list:
+        """One predict_matches call; on failure, score one by one so only bad matchups fail"""
+        metrics = self.predictor.metrics
+        self.batches += 1
+        self.matchups += len(matchups)
+        metrics.increment('service_batches')
+        metrics.increment('service_batch_matchups', len(matchups))
+        with metrics.stage('service_batch'):
+            try:
+                return [format_result(r) for r in self.predictor.predict_matches(matchups)]
+            except Exception:
+                if len(matchups) == 1:
+                    raise
+        results = []
+        for matchup in matchups:
+            try:
+                results.append(format_result(self.predictor.predict_matches([matchup])[0]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class PredictionService:
+    """
+    ASGI application serving a DraftBasedPredictor
+
+    Args:
+        predictor: Trained predictor; loaded from artifact_path at startup if None
+        artifact_path: Inference artifact written by export_artifact
+        max_batch: Most matchups per predict_proba call
+        max_wait: Seconds a batch waits for more matchups
+        cache: Keep the predictor's prediction cache; False sets it to None at startup
+    """
+
+    def __init__(self, predictor: DraftBasedPredictor = None, artifact_path: str = ARTIFACT_PATH,
+                 max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT, cache: bool = True):
+        self.predictor = predictor
+        self.artifact_path = artifact_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache = cache
+        self.batcher = None
+        self.sink = None
+        self.started = None
+
+    async def startup(self):
+        if self.batcher is not None:
+            return
+        if self.predictor is None:
+            self.predictor = DraftBasedPredictor.load_artifact(self.artifact_path)
+        if self.predictor.model is None:
+            raise ValueError("Model not trained. Call train_model() first.")
+        if not self.cache:
+            self.predictor.prediction_cache = None
+        self.sink = self.predictor.metrics.add_sink(PrometheusSink())
+        self.batcher = MicroBatcher(self.predictor, self.max_batch, self.max_wait)
+        self.batcher.start()
+        self.started = time.time()
+
+    async def shutdown(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+            self.batcher = None
+        if self.sink is not None:
+            self.predictor.metrics.remove_sink(self.sink)
+            self.sink = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        # Servers without lifespan support start the service on the first request
+        await self.startup()
+        method, path = scope['method'], scope['path'].rstrip('/') or '/'
+        if method == 'GET' and path == '/metrics':
+            await _send(send, 200, self.sink.render().encode(), 'text/plain; version=0.0.4')
+            return
+        metrics = self.predictor.metrics
+        with metrics.stage('service_request'):
+            try:
+                status, body = await self._route(method, path, receive)
+            except RequestError as e:
+                status, body = 400, {'error': str(e)}
+            except Exception as e:
+                status, body = 500, {'error': str(e)}
+            metrics.increment(f'service_http_{status}')
+            await _send(send, status, json.dumps(_to_builtin(body)).encode(), 'application/json')
+
+    async def _route(self, method: str, path: str, receive) -> tuple[int, dict]:
+        if method == 'GET' and path == '/health':
+            return 200, self.health()
+        if method == 'POST' and path == '/predict':
+            request = await _read_json(receive)
+            return await self._predict([parse_matchup(request)], single=True)
+        if method == 'POST' and path == '/predict/batch':
+            request = await _read_json(receive)
+            items = request.get('matchups') if isinstance(request, dict) else None
+            if not isinstance(items, list) or not items:
+                raise RequestError("'matchups' must be a non-empty list")
+            if len(items) > MAX_MATCHUPS_PER_REQUEST:
+                raise RequestError(f"At most {MAX_MATCHUPS_PER_REQUEST} matchups per request")
+            return await self._predict([parse_matchup(i) for i in items], single=False)
+        return 404, {'error': f"No route for {method} {path}"}
+
+    async def _predict(self, matchups: list[tuple], single: bool) -> tuple[int, dict]:
+        results = await self.batcher.predict(matchups)
+        if single:
+            result = results[0]
+            if isinstance(result, Exception):
+                return 400, {'error': str(result)}
+            return 200, result
+        return 200, {'results': [{'error': str(r)} if isinstance(r, Exception) else r for r in results]}
+
+    def health(self) -> dict:
+        model = self.predictor.model
+        classifier = model.named_steps.get('classifier', model) if hasattr(model, 'named_steps') else model
+        batcher = self.batcher
+        return {
+            'status': 'ok',
+            'model': type(classifier).__name__,
+            'teams': len(self.predictor._team_rows),
+            'uptime_s': time.time() - self.started,
+            'queue_depth': batcher.queue_depth,
+            'batches': batcher.batches,
+            'matchups': batcher.matchups,
+            'mean_batch_size': batcher.matchups / batcher.batches if batcher.batches else 0.0,
+            'prediction_cache': (self.predictor.prediction_cache.stats()
+                                 if getattr(self.predictor, 'prediction_cache', None) is not None else None),
+        }
+
+
+async def _read_json(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise RequestError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            break
+    try:
+        return json.loads(b''.join(chunks))
+    except ValueError:
+        raise RequestError("Request body is not valid JSON")
+
+
+async def _send(send, status: int, body: bytes, content_type: str):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type.encode()),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_app(predictor: DraftBasedPredictor = None, artifact_path: str = ARTIFACT_PATH,
+               max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT,
+               cache: bool = True) -> PredictionService:
+    return PredictionService(predictor, artifact_path, max_batch, max_wait, cache)
+
+
+# For `uvicorn prediction_service:app`; the artifact is loaded at startup, not on import
+app = create_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve draft predictions over HTTP")
+    parser.add_argument('--artifact', default=ARTIFACT_PATH, help="Inference artifact (export_artifact)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1e3)
+    parser.add_argument('--no-cache', action='store_true', help="Score every request, even repeated matchups")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    service = create_app(artifact_path=args.artifact, max_batch=args.max_batch,
+                         max_wait=args.max_wait_ms / 1e3, cache=not args.no_cache)
+    uvicorn.run(service, host=args.host, port=args.port, log_level='warning', access_log=False)
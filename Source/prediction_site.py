@@ -1,10 +1,13 @@
 """
 prediction_site.py - Streamlit application for LCK Match Prediction
 """
+import os
 import streamlit as st
 import pandas as pd
-import joblib
-from predictor_new import DraftBasedPredictor
+from predictor_new import DraftBasedPredictor, PICK_COLUMNS
+from data_loader import load_match_data
+from metrics import HistogramSink
+from model_registry import ModelRegistry
 import plotly.graph_objects as go
 import plotly.express as px
 
@@ -15,22 +18,55 @@ st.set_page_config(
     layout="wide"
 )
 
+ARTIFACT_PATH = '../Models/draft_predictor_inference.pkl.gz'
+LEGACY_MODEL_PATH = '../Models/draft_predictor_best_model.joblib'
+# Per-league artifacts (model_registry.py); hot leagues are loaded at startup
+MODEL_DIR = '../Models'
+PRELOAD_LEAGUES = os.environ.get('PRELOAD_LEAGUES', 'LCK').split(',')
+REGISTRY_MAX_MB = float(os.environ.get('REGISTRY_MAX_MB', 512))
+
 # Initialize predictor
 @st.cache_resource
 def load_predictor():
     """Load and initialize the predictor with model"""
     try:
-        model_data = joblib.load('../Models/draft_predictor_best_model.joblib')
-        return model_data
+        # Prefer the lean inference artifact, fall back to the full pickled predictor
+        if os.path.exists(ARTIFACT_PATH):
+            predictor = DraftBasedPredictor.load_artifact(ARTIFACT_PATH)
+        else:
+            import joblib
+            predictor = joblib.load(LEGACY_MODEL_PATH)
+        # Stage timings shown under each prediction
+        predictor.metrics.add_sink(HistogramSink())
+        return predictor
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
         return None
 
+@st.cache_resource
+def load_registry():
+    """Per-league predictors shared by every session, None if there are none"""
+    registry = ModelRegistry(MODEL_DIR, max_bytes=int(REGISTRY_MAX_MB * 1024 ** 2))
+    if not registry.available():
+        return None
+    registry.preload([league for league in PRELOAD_LEAGUES if league in registry.leagues()])
+    return registry
+
+def get_league_predictor(registry, league: str):
+    """Predictor of one league, with stage timings attached on first use"""
+    predictor = registry.get(league)
+    if not any(isinstance(s, HistogramSink) for s in predictor.metrics.sinks):
+        predictor.metrics.add_sink(HistogramSink())
+    return predictor
+
+def league_champion_list(predictor) -> list[str]:
+    return sorted(set().union(*(predictor.champion_encoders[col].classes_ for col in PICK_COLUMNS)))
+
 # Load champion list
 @st.cache_data
 def load_champion_list():
     """Load and cache the list of available champions"""
-    df = pd.read_csv("../Data/LCK_Tournament.csv")
+    df = load_match_data("../Data/LCK_Tournament.csv", columns=PICK_COLUMNS)
     champions = sorted(list(set(
         df['pick1'].unique().tolist() +
         df['pick2'].unique().tolist() +
@@ -209,13 +245,88 @@ def show_key_factors(result: dict):
             sum(stat['team_games'] for stat in result['team2']['champion_stats'])
         )
 
+def show_attributions(result: dict, top_n: int = 10):
+    """
+    Hiển thị các thông số đóng góp nhiều nhất vào xác suất thắng của từng đội
+    """
+    cols = st.columns(2)
+    for col, team in zip(cols, ['team1', 'team2']):
+        attributions = result[team].get('attributions')
+        if attributions is None:
+            continue
+        contributions = pd.Series(attributions['contributions'])
+        top = contributions.reindex(contributions.abs().sort_values(ascending=False).index[:top_n])[::-1]
+        fig = go.Figure(go.Bar(
+            x=top.values * 100,
+            y=[f"{feature} = {attributions['values'][feature]:.3g}" for feature in top.index],
+            orientation='h',
+            marker_color=['#2ca02c' if value > 0 else '#d62728' for value in top.values]
+        ))
+        fig.update_layout(
+            title=result[team]['name'],
+            xaxis_title="Đóng góp vào xác suất thắng (%)",
+            height=400,
+            margin=dict(t=40, b=30, l=30, r=30)
+        )
+        with col:
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"Mức cơ sở {attributions['base_value']:.1%} + tổng đóng góp = "
+                       f"{attributions['output']:.1%} (trước khi chuẩn hoá giữa hai đội)")
+
+def show_what_if_heatmap(predictor, team_name: str, team_picks: list[str],
+                         opponent_name: str, opponent_picks: list[str]):
+    """
+    Hiển thị heatmap thay đổi tỉ lệ thắng khi thay 1 tướng trong draft
+    """
+    grid = predictor.what_if_grid(team_name, team_picks, opponent_name, opponent_picks)
+    # Chỉ giữ các tướng có thể thay vào ít nhất 1 lượt
+    grid = grid.dropna(axis=1, how='all')
+
+    fig = px.imshow(
+        grid * 100,
+        labels=dict(x="Tướng thay vào", y="Lượt pick", color="Δ tỉ lệ thắng (%)"),
+        y=[f"{col} ({pick})" for col, pick in zip(grid.index, team_picks)],
+        color_continuous_scale='RdBu',
+        color_continuous_midpoint=0,
+        aspect='auto'
+    )
+    fig.update_layout(height=350, margin=dict(t=30, b=30, l=30, r=30))
+    st.plotly_chart(fig, use_container_width=True)
+
+def show_stage_timings(predictor):
+    """Latency of each prediction stage since the app started"""
+    sinks = [s for s in predictor.metrics.sinks if isinstance(s, HistogramSink)]
+    if not sinks:
+        return
+    summary = sinks[0].summary()
+    stages = pd.DataFrame(summary['stages']).T
+    for col in ['total_s', 'mean_s', 'p50_s', 'p90_s', 'p99_s', 'max_s']:
+        stages[col.replace('_s', ' (ms)')] = stages.pop(col).astype(float) * 1e3
+    with st.expander("Thời gian xử lý từng bước"):
+        st.dataframe(stages.round(3))
+        if summary['counters']:
+            st.write(summary['counters'])
+        # Bộ nhớ đệm dùng chung cho mọi phiên
+        if getattr(predictor, 'prediction_cache', None) is not None:
+            cache = predictor.prediction_cache.stats()
+            st.caption(f"Bộ nhớ đệm dự đoán: {cache['hits']}/{cache['hits'] + cache['misses']} "
+                       f"lần dùng lại ({cache['hit_rate']:.0%}), {cache['size']}/{cache['maxsize']} kết quả")
+
 def main():
     st.title("Dự đoán kết quả LCK 🎮")
     st.write("Dự đoán tỉ lệ thắng dựa trên đội tuyển và lượt pick tướng")
     
     # Load data
-    predictor = load_predictor()
-    champions = load_champion_list()
+    registry = load_registry()
+    if registry is not None:
+        leagues = registry.leagues()
+        league = st.selectbox("Giải đấu:", leagues,
+                              index=leagues.index('LCK') if 'LCK' in leagues else 0)
+        predictor = get_league_predictor(registry, league)
+        champions = league_champion_list(predictor)
+    else:
+        predictor = load_predictor()
+        champions = load_champion_list()
     
     # Create two columns for team inputs
     col1, col2 = st.columns(2)
@@ -254,7 +365,8 @@ def main():
                 team1_name=team1_name,
                 team1_picks=team1_picks,
                 team2_name=team2_name,
-                team2_picks=team2_picks
+                team2_picks=team2_picks,
+                explain=True
             )
             
             # Display results
@@ -275,6 +387,9 @@ def main():
                 )
                 
             show_key_factors(result)
+
+            st.subheader("Các thông số ảnh hưởng nhiều nhất đến dự đoán")
+            show_attributions(result)
             
             # Thêm phân tích chi tiết
             st.header("Phân tích chi tiết")
@@ -359,6 +474,14 @@ def main():
                     st.write(f"Winrate của tướng này khi pick ở lượt {stat['position']}: {stat['overall_winrate']:.1%} ({stat['overall_games']} games)")
                     st.write(f"Winrate tổng của tướng này: {stat['overall_all_pick_winrate']:.1%} ({stat['overall_all_pick_games']} games)")
             
+            # 4. Phân tích thay tướng (what-if)
+            st.subheader("Tỉ lệ thắng thay đổi thế nào khi thay 1 tướng")
+            st.write(f"### {team1_name}")
+            show_what_if_heatmap(predictor, team1_name, team1_picks, team2_name, team2_picks)
+            st.write(f"### {team2_name}")
+            show_what_if_heatmap(predictor, team2_name, team2_picks, team1_name, team1_picks)
+
+            show_stage_timings(predictor)
 
         except Exception as e:
             st.error(f"Lỗi khi dự đoán: {str(e)}")
@@ -1,41 +1,152 @@
 #Class chứa các hàm phục vụ cho mô hình dự đoán
 
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, learning_curve
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from sklearn.neural_network import MLPClassifier
-from sklearn.ensemble import StackingClassifier
-from sklearn.linear_model import LogisticRegression
-
-#Models
-import xgboost as xgb
-from sklearn.ensemble import RandomForestClassifier
-
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+# Only what predictions need is imported here. The training libraries (sklearn
+# model selection, xgboost, the model classes) and the plotting stack
+# (matplotlib, seaborn) are imported inside the methods that use them; a
+# loaded model brings in its own runtime dependency when it is unpickled.
+import gzip
+import logging
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import pandas as pd
+
+from data_loader import load_match_data
+from attributions import explain as explain_features
+from metrics import Metrics
+from native_inference import compile_pipeline
+from prediction_cache import PredictionCache
+from shared_features import SharedFeatureStore
+from team_form_store import TeamFormStore
+
+logger = logging.getLogger(__name__)
+
+PICK_COLUMNS = ['pick1', 'pick2', 'pick3', 'pick4', 'pick5']
+BAN_COLUMNS = ['ban1', 'ban2', 'ban3', 'ban4', 'ban5']
+
+FEATURES = [
+    # Encoded picks
+    'pick1_encoded', 'pick2_encoded', 'pick3_encoded', 
+    'pick4_encoded', 'pick5_encoded',
+    
+    # Historical performance
+    'winrate_pick1', 'winrate_pick2', 'winrate_pick3', 
+    'winrate_pick4', 'winrate_pick5',
+    
+    # Pick frequency
+    'count_pick1', 'count_pick2', 'count_pick3', 
+    'count_pick4', 'count_pick5',
+    
+    # New performance features
+    # Overall performance
+    'kills', 'deaths', 'assists', 'team kpm', 'ckpm','gspd','gpr','gamelength',
+    # Objectives
+    'firstblood', 'dragons', 'elementaldrakes',
+    'firstherald', 'heralds',  'barons','firsttothreetowers',
+    # Economy
+    'earned gpm','goldat15', 'goldat20', 'goldat25',
+    'golddiffat15', 'golddiffat20','golddiffat25', 'xpdiffat20', 'xpdiffat25',
+    # Vision
+    'wardsplaced', 'visionscore', 'wardskilled','controlwardsbought',
+    # Farm
+    'cspm', 'minionkills', 'monsterkills', 'csat15', 'csdiffat15',
+    'csat20', 'csdiffat20', 'csat25','csdiffat25',
+    #Combat
+    'damagetochampions', 'damagetakenperminute', 'damagemitigatedperminute'   
+    
+]
+
+# Columns read from the match CSV: identifiers, draft and the raw feature columns
+DATA_COLUMNS = (['gameid', 'date', 'teamname', 'result'] + BAN_COLUMNS + PICK_COLUMNS +
+                [f for f in FEATURES if not f.endswith('_encoded')])
+
+TRAINING_PROFILES = ('full', 'headless')
+DEFAULT_CV_CACHE = '../Models/cv_cache.sqlite'
+
+# Inference artifact written by DraftBasedPredictor.export_artifact
+ARTIFACT_FORMAT = 'draft-predictor-inference'
+ARTIFACT_VERSION = 1
+ARTIFACT_KEYS = {'format', 'version', 'features', 'pipeline', 'champion_classes',
+                 'champion_index', 'recent_matches', 'recent_stats'}
 
 class DraftBasedPredictor:
     """
     Predicts match outcomes based on completed team drafts and historical performance
     """
-    
-    def __init__(self, data_path: str):
+
+    # Score through the compiled scaler + model instead of Pipeline.predict_proba
+    native_inference = True
+
+    def __init__(self, data_path: str, cache: bool = True):
         """
         Initialize the predictor with historical match data
         
         Args:
             data_path: Path to the processed match data CSV
+            cache: Keep a Parquet copy of the needed columns next to the CSV
         """
-        self.df = pd.read_csv(data_path)
+        self.df = load_match_data(data_path, columns=DATA_COLUMNS, cache=cache)
         self.champion_encoders = {}
         self.model = None
+        # Stage timings/counters, off until a sink is attached (see metrics.py)
+        self.metrics = Metrics()
+        # Memoized predict_matches results, None disables (see prediction_cache.py)
+        self.prediction_cache = PredictionCache()
+        self._data_version = 0
         self._prepare_data()
 
+    @property
+    def model(self):
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Cached predictions are keyed by the model version
+        self._model = model
+        self._model_version = getattr(self, '_model_version', 0) + 1
+        # Compiled on the first prediction (the model may still be fitted in place)
+        self._native_model = None
+
+    @property
+    def X(self):
+        # Built from self.df on first access after ingest, which only invalidates it
+        if self._X is None and self.df is not None:
+            self._X = self.df[self.features]
+        return self._X
+
+    @X.setter
+    def X(self, X):
+        self._X = X
+
+    def __getstate__(self):
+        # Sinks hold locks/streams and only make sense in the running process
+        state = self.__dict__.copy()
+        state['metrics'] = Metrics()
+        # Ingest lookups, the form store, the feature matrix and the native model are rebuilt on demand
+        state['_row_keys'] = state['_pick_rows'] = state['_form_store'] = state['_X'] = None
+        state['_native_model'] = None
+        return state
+
+    def __setstate__(self, state):
+        # Predictors pickled before stage metrics / the prediction cache existed
+        state.setdefault('metrics', Metrics())
+        state.setdefault('prediction_cache', PredictionCache())
+        if 'model' in state:
+            state['_model'] = state.pop('model')
+        state.setdefault('_model_version', 1)
+        state.setdefault('_native_model', None)
+        state['_X'] = None
+        state.pop('X', None)
+        self.__dict__.update(state)
+
     def _prepare_data(self):
         """Prepare and encode the draft data"""
+        # Parse dates once so recent-form lookups never re-parse them
+        self.df['date'] = pd.to_datetime(self.df['date'])
+
+        from sklearn.preprocessing import LabelEncoder
+
         # Encode champions for each pick position
         for i in range(1, 6):
             pick_col = f'pick{i}'
@@ -43,47 +154,260 @@ class DraftBasedPredictor:
             self.df[f'{pick_col}_encoded'] = self.champion_encoders[pick_col].fit_transform(self.df[pick_col])
 
         # Create feature matrix
-        self.features = [
-            # Encoded picks
-            'pick1_encoded', 'pick2_encoded', 'pick3_encoded', 
-            'pick4_encoded', 'pick5_encoded',
-            
-            # Historical performance
-            'winrate_pick1', 'winrate_pick2', 'winrate_pick3', 
-            'winrate_pick4', 'winrate_pick5',
-            
-            # Pick frequency
-            'count_pick1', 'count_pick2', 'count_pick3', 
-            'count_pick4', 'count_pick5',
-            
-            # New performance features
-            # Overall performance
-            'kills', 'deaths', 'assists', 'team kpm', 'ckpm','gspd','gpr','gamelength',
-            # Objectives
-            'firstblood', 'dragons', 'elementaldrakes',
-            'firstherald', 'heralds',  'barons','firsttothreetowers',
-            # Economy
-            'earned gpm','goldat15', 'goldat20', 'goldat25',
-            'golddiffat15', 'golddiffat20','golddiffat25', 'xpdiffat20', 'xpdiffat25',
-            # Vision
-            'wardsplaced', 'visionscore', 'wardskilled','controlwardsbought',
-            # Farm
-            'cspm', 'minionkills', 'monsterkills', 'csat15', 'csdiffat15',
-            'csat20', 'csdiffat20', 'csat25','csdiffat25',
-            #Combat
-            'damagetochampions', 'damagetakenperminute', 'damagemitigatedperminute'   
-            
-        ]
+        self.features = list(FEATURES)
         
         # Kiểm tra số lượng đặc trưng
-        print(f"Total features: {len(self.features)}")
+        logger.debug("Total features: %d", len(self.features))
 
         self.X = self.df[self.features]
         self.y = self.df['result']
-        
+
+        self._build_champion_index()
+        self._build_team_match_index()
+        self._invalidate_caches()
+
+    def _invalidate_caches(self):
+        """Bump the data version and drop every cache derived from self.df"""
+        self._data_version += 1
+        self._recent_stats_cache = {}
+        self._row_keys = None
+        self._pick_rows = None
+        self._form_store = None
+
+    def _build_team_match_index(self):
+        """
+        Group row positions by team, newest match first
+
+        _get_team_recent_stats slices this index instead of filtering and
+        sorting the whole frame on every call.
+        """
+        by_date = (self.df['date'].reset_index(drop=True)
+                   .sort_values(ascending=False, kind='stable').index.to_numpy())
+        teams = pd.Series(self.df['teamname'].to_numpy()[by_date])
+        self._team_rows = {
+            team: by_date[positions]
+            for team, positions in teams.groupby(teams, sort=False).indices.items()
+        }
+        self._recent_stat_features = [f for f in self.features if not f.endswith('_encoded')]
+
+    def _build_champion_index(self):
+        """
+        Precompute games/wins aggregates for champion lookups
+
+        The index is built in one pass over the data so that get_champion_stats
+        and _process_team_draft become dictionary lookups instead of full
+        scans of self.df. Keys are:
+            team_slot: (team, champion, slot) -> (games, wins)
+            team:      (team, champion)       -> (games, wins), any pick slot
+            slot:      (champion, slot)       -> (games, wins)
+            overall:   champion               -> (games, wins), any pick slot
+            draft:     (team, champion, slot) -> (mean winrate_pickN, mean count_pickN)
+        """
+        # Long format: one row per (match row, pick slot)
+        long = pd.concat([
+            pd.DataFrame({
+                'row': np.arange(len(self.df)),
+                'teamname': self.df['teamname'].to_numpy(),
+                'champion': self.df[f'pick{i}'].to_numpy(),
+                'slot': i,
+                'result': self.df['result'].to_numpy(),
+                'winrate': self.df[f'winrate_pick{i}'].to_numpy(),
+                'count': self.df[f'count_pick{i}'].to_numpy(),
+            }) for i in range(1, 6)
+        ], ignore_index=True)
+        # A champion counts once per match for the "any pick slot" aggregates
+        any_slot = long.drop_duplicates(['row', 'champion'])
+
+        def games_wins(frame, keys):
+            grouped = frame.groupby(keys, sort=False)['result'].agg(['size', 'sum'])
+            return dict(zip(grouped.index, zip(grouped['size'].tolist(), grouped['sum'].tolist())))
+
+        draft = long.groupby(['teamname', 'champion', 'slot'], sort=False)[['winrate', 'count']].mean()
+
+        self._champion_index = {
+            'team_slot': games_wins(long, ['teamname', 'champion', 'slot']),
+            'team': games_wins(any_slot, ['teamname', 'champion']),
+            'slot': games_wins(long, ['champion', 'slot']),
+            'overall': games_wins(any_slot, 'champion'),
+            'draft': dict(zip(draft.index, zip(draft['winrate'].tolist(), draft['count'].tolist()))),
+        }
+
+    def ingest(self, new_rows: pd.DataFrame) -> dict:
+        """
+        Add new matches without rebuilding the predictor
+
+        Equivalent to regenerating processed_for_prediction.csv with the new
+        rows and constructing a new predictor, except that champion codes are
+        kept: new champions are appended to the encoders, so the trained model
+        still sees the same numbers for known champions. Aggregates are
+        updated with the new rows only; winrate_pickN/count_pickN and recent
+        form are recomputed for the teams that played, and self.X is rebuilt
+        on its next access. Appending to self.df is still a copy of the
+        stored rows (pd.concat), the one step that grows with the history.
+
+        Args:
+            new_rows: Matches in the LCK_Tournament2.csv layout (winrate_pickN/count_pickN
+                are computed here); rows whose (gameid, teamname) is already stored are skipped
+
+        Returns:
+            {'rows_added', 'rows_skipped', 'new_champions': {pick_col: [...]}, 'teams': [...]}
+        """
+        if self.df is None:
+            raise ValueError("This predictor was loaded from an inference artifact and holds no match data")
+        required = [c for c in DATA_COLUMNS if not c.startswith(('winrate_pick', 'count_pick'))]
+        missing = [c for c in required if c not in new_rows.columns]
+        if missing:
+            raise ValueError(f"New rows are missing columns: {missing}")
+
+        with self.metrics.stage('ingest'):
+            new = new_rows[required].reset_index(drop=True)
+            if getattr(self, '_row_keys', None) is None:
+                self._row_keys = set(zip(self.df['gameid'].tolist(), self.df['teamname'].tolist()))
+            keys = list(zip(new['gameid'].tolist(), new['teamname'].tolist()))
+            keep = np.array([key not in self._row_keys for key in keys], dtype=bool)
+            keep &= ~pd.Series(keys, dtype=object).duplicated().to_numpy()
+            n_skipped = int((~keep).sum())
+            new = new[keep].reset_index(drop=True)
+            if len(new) == 0:
+                return {'rows_added': 0, 'rows_skipped': n_skipped, 'new_champions': {}, 'teams': []}
+
+            new_champions = self._extend_champion_encoders(new)
+            new = self._conform_new_rows(new)
+            touched = self._update_champion_index(new)
+
+            start = len(self.df)
+            self.df = pd.concat([self.df, new], ignore_index=True)
+            self._row_keys.update(k for k, kept in zip(keys, keep) if kept)
+            teams = list(dict.fromkeys(new['teamname'].tolist()))
+            self._merge_team_rows(teams, np.arange(start, len(self.df)))
+            self._refresh_team_champion_features(touched, start)
+
+            self.X = None
+            self.y = self.df['result']
+            # Only the teams that played get new recent form
+            self._data_version += 1
+            self._form_store = None
+            for key in [k for k in self._recent_stats_cache if k[0] in set(teams)]:
+                del self._recent_stats_cache[key]
+
+        logger.info("Ingested %d rows (%d skipped), %d teams updated", len(new), n_skipped, len(teams))
+        return {'rows_added': len(new), 'rows_skipped': n_skipped,
+                'new_champions': new_champions, 'teams': teams}
+
+    def _extend_champion_encoders(self, new: pd.DataFrame) -> dict:
+        """Append unseen champions to each pick encoder, existing codes unchanged"""
+        added = {}
+        for col in PICK_COLUMNS:
+            encoder = self.champion_encoders[col]
+            known = set(encoder.classes_.tolist())
+            unseen = sorted(set(new[col].dropna().tolist()) - known)
+            if unseen:
+                # String labels are mapped through a lookup table, so classes_ need not stay sorted
+                encoder.classes_ = np.concatenate([encoder.classes_.astype(object),
+                                                   np.array(unseen, dtype=object)])
+                added[col] = unseen
+        return added
+
+    def _conform_new_rows(self, new: pd.DataFrame) -> pd.DataFrame:
+        """Give the new rows the stored dtypes and the encoded/placeholder feature columns"""
+        new = new.copy()
+        new['date'] = pd.to_datetime(new['date'])
+        for col in self.df.columns:
+            if col not in new.columns:
+                # winrate/count are filled by _refresh_team_champion_features
+                new[col] = 0.0
+            if isinstance(self.df[col].dtype, pd.CategoricalDtype):
+                unseen = pd.Index(new[col].dropna().unique()).difference(self.df[col].cat.categories)
+                if len(unseen):
+                    self.df[col] = self.df[col].cat.add_categories(unseen)
+            elif col.endswith('_encoded'):
+                new[col] = self.champion_encoders[col[:-len('_encoded')]].transform(new[col[:-len('_encoded')]])
+        return new[self.df.columns].astype(self.df.dtypes.to_dict())
+
+    def _update_champion_index(self, new: pd.DataFrame) -> set:
+        """Add the new rows' games/wins to the champion index and refresh the touched draft entries"""
+        index = self._champion_index
+        teams = new['teamname'].to_numpy(dtype=object)
+        results = new['result'].to_numpy()
+        seen = [set() for _ in range(len(new))]
+        touched = set()
+        for slot, col in enumerate(PICK_COLUMNS, 1):
+            for row, (team, champion, result) in enumerate(zip(teams, new[col].to_numpy(dtype=object), results)):
+                if pd.isna(champion):
+                    continue
+                win = int(result)
+                for table, key in (('team_slot', (team, champion, slot)), ('slot', (champion, slot))):
+                    games, wins = index[table].get(key, (0, 0))
+                    index[table][key] = (games + 1, wins + win)
+                # A champion counts once per match for the "any pick slot" aggregates
+                if champion not in seen[row]:
+                    seen[row].add(champion)
+                    for table, key in (('team', (team, champion)), ('overall', champion)):
+                        games, wins = index[table].get(key, (0, 0))
+                        index[table][key] = (games + 1, wins + win)
+                touched.add((team, champion))
+
+        # winrate_pickN/count_pickN of a (team, champion) are the same in every slot
+        for team, champion in touched:
+            games, wins = index['team'][(team, champion)]
+            value = (float(np.float32(wins / games)), float(games))
+            for slot in range(1, 6):
+                if (team, champion, slot) in index['team_slot']:
+                    index['draft'][(team, champion, slot)] = value
+        return touched
+
+    def _merge_team_rows(self, teams: list[str], new_positions: np.ndarray):
+        """Insert new row positions into each team's newest-first match index"""
+        dates = self.df['date'].to_numpy()
+        new_teams = self.df['teamname'].to_numpy(dtype=object)[new_positions]
+        for team in teams:
+            positions = np.concatenate([self._team_rows.get(team, np.empty(0, dtype=np.int64)),
+                                        new_positions[new_teams == team]])
+            # Newest first, ties in row order (same as the stable sort of the full build)
+            order = np.lexsort((positions, -dates[positions].astype(np.int64)))
+            self._team_rows[team] = positions[order]
+
+    def _build_pick_rows(self) -> dict:
+        """(team, champion) -> flat positions (row * 5 + slot index) of every pick of that champion"""
+        teams = np.repeat(self.df['teamname'].to_numpy(dtype=object), 5)
+        champions = self.df[PICK_COLUMNS].to_numpy(dtype=object).ravel()
+        groups = pd.DataFrame({'teamname': teams, 'champion': champions}).groupby(
+            ['teamname', 'champion'], sort=False).indices
+        return {key: positions.tolist() for key, positions in groups.items()}
+
+    def _refresh_team_champion_features(self, touched: set, start: int):
+        """Recompute winrate_pickN/count_pickN on every row holding a touched (team, champion)"""
+        if getattr(self, '_pick_rows', None) is None:
+            self._pick_rows = self._build_pick_rows()
+        else:
+            new = self.df.iloc[start:]
+            teams = np.repeat(new['teamname'].to_numpy(dtype=object), 5)
+            champions = new[PICK_COLUMNS].to_numpy(dtype=object).ravel()
+            for flat, key in enumerate(zip(teams, champions), start * 5):
+                self._pick_rows.setdefault(key, []).append(flat)
+
+        team_index = self._champion_index['team']
+        positions, games, wins = [], [], []
+        for key in touched:
+            flat = self._pick_rows.get(key, [])
+            key_games, key_wins = team_index[key]
+            positions.extend(flat)
+            games.extend([key_games] * len(flat))
+            wins.extend([key_wins] * len(flat))
+        positions = np.asarray(positions, dtype=np.int64)
+        games = np.asarray(games, dtype=float)
+        winrate = np.asarray(wins, dtype=float) / games
+        rows, slots = np.divmod(positions, 5)
+        for i, col in enumerate(PICK_COLUMNS):
+            in_slot = slots == i
+            self.df.loc[rows[in_slot], f'winrate_{col}'] = winrate[in_slot].astype(np.float32)
+            self.df.loc[rows[in_slot], f'count_{col}'] = games[in_slot].astype(np.float32)
+
     def _get_team_recent_stats(self, team_name: str, n_matches: int = 10) -> dict:
         """
         Get average stats from N most recent matches for a team based on date
+
+        Results are cached per (team, n_matches) until the underlying data changes.
         
         Args:
             team_name: Name of the team
@@ -92,38 +416,38 @@ class DraftBasedPredictor:
         Returns:
             Dictionary containing average stats from recent matches
         """
-        # Convert date column to datetime if it's not already
-        if not pd.api.types.is_datetime64_any_dtype(self.df['date']):
-            self.df['date'] = pd.to_datetime(self.df['date'])
-        
-        # Get team matches and sort by date
-        team_matches = self.df[self.df['teamname'] == team_name]
-        
+        key = (team_name, n_matches)
+        stats = self._recent_stats_cache.get(key)
+        if stats is None:
+            self.metrics.increment('recent_stats_cache_miss')
+            stats = self._compute_team_recent_stats(team_name, n_matches)
+            self._recent_stats_cache[key] = stats
+        else:
+            self.metrics.increment('recent_stats_cache_hit')
+
+        result = dict(stats)
+        result['_date_range'] = dict(stats['_date_range'])
+        return result
+
+    def _compute_team_recent_stats(self, team_name: str, n_matches: int) -> dict:
+        """Average every stat feature over the team's N latest matches in one pass"""
         # Validate if team exists
-        if team_matches.empty:
+        if team_name not in self._team_rows:
             raise ValueError(f"No matches found for team: {team_name}")
+        if self.df is None:
+            raise ValueError(f"Recent stats over {n_matches} matches are not stored in this artifact")
+        team_rows = self._team_rows[team_name]
         
         # Get n most recent matches
-        n_available = len(team_matches)
+        n_available = len(team_rows)
         if n_available < n_matches:
-            print(f"Warning: Only {n_available} matches found for {team_name} (requested {n_matches})")
+            logger.warning("Only %d matches found for %s (requested %d)", n_available, team_name, n_matches)
             n_matches = n_available
         
-        recent_matches = team_matches.sort_values('date', ascending=False).head(n_matches)
+        recent_matches = self.df.iloc[team_rows[:n_matches]]
         
         # Calculate stats
-        stats = {}
-        for feature in self.features:
-            if feature not in ['pick1_encoded', 'pick2_encoded', 'pick3_encoded', 
-                            'pick4_encoded', 'pick5_encoded']:
-                try:
-                    stats[feature] = recent_matches[feature].mean()
-                except KeyError:
-                    print(f"Warning: Feature '{feature}' not found in data")
-                    stats[feature] = 0
-                except Exception as e:
-                    print(f"Error calculating {feature}: {str(e)}")
-                    stats[feature] = 0
+        stats = recent_matches[self._recent_stat_features].mean().to_dict()
         
         # Optional: Add date range info for debugging
         stats['_date_range'] = {
@@ -134,8 +458,42 @@ class DraftBasedPredictor:
         
         return stats
     
+    def get_form_store(self, windows: tuple = (10,)) -> TeamFormStore:
+        """
+        Rolling team-form store over the match data (see team_form_store.py)
+
+        Built on first use with the requested windows and rebuilt when the
+        data changes or a window that was not precomputed is asked for.
+        
+        Args:
+            windows: Numbers of recent matches to precompute
+        """
+        if self.df is None:
+            raise ValueError("This predictor was loaded from an inference artifact and holds no match data")
+        store = getattr(self, '_form_store', None)
+        if store is None or not set(windows) <= set(store.windows):
+            known = store.windows if store is not None else ()
+            store = TeamFormStore(self.df, self._recent_stat_features, tuple(set(windows) | set(known)))
+            self._form_store = store
+        return store
+
+    def pre_match_features(self, n_matches: int = 10) -> pd.DataFrame:
+        """
+        Feature matrix with the team stats replaced by the team's form before each match
+
+        self.X describes each match with its own stats; here every row only
+        uses the `n_matches` matches the team played before it, which is what
+        predict_match feeds the model. Rows without earlier matches are NaN.
+        """
+        form = self.get_form_store((n_matches,)).pre_match_form(n_matches)
+        X = self.X.copy()
+        X[form.columns] = form.to_numpy(dtype=np.float32)
+        return X
+
     def _plot_learning_curves(self, model_name, train_sizes, train_scores, test_scores):
         """Helper method to plot learning curves"""
+        import matplotlib.pyplot as plt
+
         train_mean = np.mean(train_scores, axis=1)
         train_std = np.std(train_scores, axis=1)
         test_mean = np.mean(test_scores, axis=1)
@@ -157,8 +515,29 @@ class DraftBasedPredictor:
         plt.grid()
         plt.show()
     
+    def plot_search_trajectory(self):
+        """Plot best cross-validation accuracy so far against fitting time spent, per model"""
+        import matplotlib.pyplot as plt
+
+        trajectory = pd.DataFrame(self.search_results['trajectory'])
+        plt.figure(figsize=(10, 5))
+        for name, group in trajectory.groupby('model', sort=False):
+            # Only full-size rungs are comparable with the final CV accuracy
+            full = group[group['rung'] == group['rung'].max()]
+            plt.step(full['cumulative_fit_seconds'], full['mean_score'].cummax(), where='post', label=name)
+        plt.xlabel('Cumulative fit time (s)')
+        plt.ylabel('Best CV accuracy so far')
+        plt.title(f"Hyperparameter search ({self.search_results['mode']})")
+        plt.legend()
+        plt.grid()
+        plt.tight_layout()
+        plt.show()
+
     def plot_correlation_heatmap(self, group=None):
         """Plot correlation heatmap between features, optionally for a specific group of features"""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         # Define feature groups
         feature_groups = {
             'encoded_picks': ['pick1_encoded', 'pick2_encoded', 'pick3_encoded', 'pick4_encoded', 'pick5_encoded'],
@@ -202,13 +581,52 @@ class DraftBasedPredictor:
         plt.tight_layout()
         plt.show()
 
-    def train_model(self, test_size: float = 0.2):
+    def train_model(self, test_size: float = 0.2, search: str = 'grid',
+                    max_fits: int = None, max_seconds: float = None, n_jobs: int = -1,
+                    cv_cache: str = 'auto', profile: str = 'full', diagnostics: bool = False,
+                    shared_features: bool = True):
         """
         Train and evaluate multiple models, then fine-tune the best performing one
         
         Args:
             test_size: Proportion of data to use for testing
+            search: Hyperparameter search mode - 'grid' (full grid), 'random' or
+                'halving' (successive halving); see model_search.py
+            max_fits: Budget on the total number of CV fits across all models
+            max_seconds: Wall-clock budget for the search
+            n_jobs: Worker processes shared by the three model families
+            cv_cache: SQLite file caching CV fold results across runs (None disables it),
+                so reruns and interrupted searches only fit what is missing.
+                'auto' uses DEFAULT_CV_CACHE in the full profile and no cache when headless
+            profile: 'full' - reports, learning curves, plots and the train/test CSVs
+                as before; 'headless' - only the search, no output, plots or files
+            diagnostics: Compute learning curves, confusion matrices and classification
+                reports of the tuned models in a background thread; the Future is
+                stored in self.diagnostics and in the report
+            shared_features: Give the CV workers the feature matrices as float32
+                memory-mapped files (see shared_features.py) instead of a copy each
+
+        Returns:
+            The best tuned pipeline (also stored in self.model) in the full profile,
+            the training report (also stored in self.training_report) when headless
         """
+        if profile not in TRAINING_PROFILES:
+            raise ValueError(f"Unknown training profile '{profile}', expected one of {TRAINING_PROFILES}")
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import accuracy_score, classification_report
+        from sklearn.model_selection import learning_curve, train_test_split
+        from sklearn.neural_network import MLPClassifier
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        import xgboost as xgb
+
+        from cv_cache import CVResultCache
+        from model_search import search_models
+
+        headless = profile == 'headless'
+        if cv_cache == 'auto':
+            cv_cache = None if headless else DEFAULT_CV_CACHE
+
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             self.X, self.y, 
@@ -216,13 +634,22 @@ class DraftBasedPredictor:
             random_state=42, 
             stratify=self.y
         )
-        X_train.to_csv("../Data/training_set.csv")
-        X_test.to_csv("../Data/testing_set.csv")
-        
-        print(f"Training features shape: {self.X.shape}")  # In ra để kiểm tra
-        print("Features used in training:")
-        for f in self.features:
-            print(f"- {f}")
+        if not headless:
+            X_train.to_csv("../Data/training_set.csv")
+            X_test.to_csv("../Data/testing_set.csv")
+            
+            print(f"Training features shape: {self.X.shape}")  # In ra để kiểm tra
+            print("Features used in training:")
+            for f in self.features:
+                print(f"- {f}")
+
+        # Written once; the workers map these files instead of receiving copies
+        store = SharedFeatureStore() if shared_features else None
+        if store is not None:
+            X_search = store.put('X_train', X_train)
+            y_search = store.put('y_train', y_train, dtype=None)
+        else:
+            X_search, y_search = X_train, y_train
 
         # Define base models
         models = {
@@ -258,47 +685,53 @@ class DraftBasedPredictor:
         }
        
         
-        # Train and evaluate each model
-        print("=== Initial Model Evaluation ===")
+        # Train and evaluate each model (skipped when headless: the tuned
+        # models are what gets compared and kept)
         results = {}
-        for name, pipeline in pipelines.items():
-            print(f"\nTraining {name}...")
-            pipeline.fit(X_train, y_train)
+        if not headless:
+            if store is not None:
+                X_curve, y_curve = store.put('X', self.X), store.put('y', self.y, dtype=None)
+            else:
+                X_curve, y_curve = self.X, self.y
+            print("=== Initial Model Evaluation ===")
+            for name, pipeline in pipelines.items():
+                print(f"\nTraining {name}...")
+                pipeline.fit(X_train, y_train)
             
-            # Evaluate on training set
-            y_train_pred = pipeline.predict(X_train)
-            train_accuracy = accuracy_score(y_train, y_train_pred)
+                # Evaluate on training set
+                y_train_pred = pipeline.predict(X_train)
+                train_accuracy = accuracy_score(y_train, y_train_pred)
             
-            # Evaluate on test set
-            y_test_pred = pipeline.predict(X_test)
-            test_accuracy = accuracy_score(y_test, y_test_pred)
+                # Evaluate on test set
+                y_test_pred = pipeline.predict(X_test)
+                test_accuracy = accuracy_score(y_test, y_test_pred)
             
-            results[name] = {
-                'pipeline': pipeline,
-                'train_accuracy': train_accuracy,
-                'test_accuracy': test_accuracy
-            }
+                results[name] = {
+                    'pipeline': pipeline,
+                    'train_accuracy': train_accuracy,
+                    'test_accuracy': test_accuracy
+                }
             
-            print(f"\n{name} Results:")
-            print(f"Training Accuracy: {train_accuracy:.4f}")
-            print("\nTraining Classification Report:")
-            print(classification_report(y_train, y_train_pred))
+                print(f"\n{name} Results:")
+                print(f"Training Accuracy: {train_accuracy:.4f}")
+                print("\nTraining Classification Report:")
+                print(classification_report(y_train, y_train_pred))
             
-            print(f"\nTest Accuracy: {test_accuracy:.4f}")
-            print("\nTest Classification Report:")
-            print(classification_report(y_test, y_test_pred))
+                print(f"\nTest Accuracy: {test_accuracy:.4f}")
+                print("\nTest Classification Report:")
+                print(classification_report(y_test, y_test_pred))
             
-            # Learning curves
-            train_sizes, train_scores, test_scores = learning_curve(
-                pipeline, self.X, self.y, cv=5, scoring='accuracy',
-                n_jobs=-1, train_sizes=np.linspace(0.1, 1.0, 10))
-            # Plot learning curves
-            self._plot_learning_curves(name, train_sizes, train_scores, test_scores)
+                # Learning curves
+                train_sizes, train_scores, test_scores = learning_curve(
+                    pipeline, X_curve, y_curve, cv=5, scoring='accuracy',
+                    n_jobs=-1, train_sizes=np.linspace(0.1, 1.0, 10))
+                # Plot learning curves
+                self._plot_learning_curves(name, train_sizes, train_scores, test_scores)
                 
             
-        # Find best model
-        best_model_name = max(results.items(), key=lambda x: x[1]['test_accuracy'])[0]
-        print(f"\nBest performing model: {best_model_name}")
+            # Find best model
+            best_model_name = max(results.items(), key=lambda x: x[1]['test_accuracy'])[0]
+            print(f"\nBest performing model: {best_model_name}")
         
         
         
@@ -337,56 +770,138 @@ class DraftBasedPredictor:
         }
         
         # Fine-tune all models
-        print("\n=== Fine-tuning All Models ===")
-        tuned_models = {}
-        for name, pipeline in pipelines.items():
-            print(f"\nFine-tuning {name}...")
-            grid_search = GridSearchCV(
-                pipeline,
-                param_grids[name],
-                cv=5,
-                n_jobs=-1,
-                verbose=2,
-                scoring='accuracy'
+        if not headless:
+            print("\n=== Fine-tuning All Models ===")
+        cache = CVResultCache(cv_cache) if cv_cache else None
+        try:
+            search_result = search_models(
+                pipelines, param_grids, X_search, y_search,
+                mode=search, cv=5, max_fits=max_fits, max_seconds=max_seconds, n_jobs=n_jobs,
+                cache=cache, cache_context={'features': self.features}, verbose=not headless
             )
-            grid_search.fit(X_train, y_train)
-            tuned_models[name] = grid_search.best_estimator_
-            print(f"Best parameters for {name}: {grid_search.best_params_}")
-            print(f"Best cross-validation accuracy for {name}: {grid_search.best_score_:.4f}")
+        finally:
+            if cache is not None:
+                cache.close()
+        self.search_results = search_result
+        tuned_models = {}
+        for name, result in search_result['results'].items():
+            tuned_models[name] = result['best_pipeline']
+            if not headless:
+                print(f"Best parameters for {name}: {result['best_params']}")
+                print(f"Best cross-validation accuracy for {name}: {result['best_score']:.4f}")
+        if not headless:
+            print(f"Search used {search_result['n_fits']} fits, "
+                  f"{search_result['fit_seconds']:.1f}s of fitting in {search_result['elapsed_seconds']:.1f}s")
 
         # Evaluate all tuned models on the test set and compare with initial results
-        print("\n=== Evaluating All Tuned Models ===")
-        accuracies_before = {name: results[name]['test_accuracy'] for name in models.keys()}
+        if not headless:
+            print("\n=== Evaluating All Tuned Models ===")
         accuracies_after = {}
         for name, model in tuned_models.items():
-            y_pred = model.predict(X_test)
+            y_pred = model.predict(np.asarray(X_test))
             accuracy = accuracy_score(y_test, y_pred)
             accuracies_after[name] = accuracy
-            print(f"\n{name} Test Accuracy after Tuning: {accuracy:.4f}")
+            if not headless:
+                print(f"\n{name} Test Accuracy after Tuning: {accuracy:.4f}")
 
-        # Plot comparison of accuracies before and after tuning
-        plt.figure(figsize=(10, 5))
-        bar_width = 0.35
-        index = np.arange(len(models))
-        plt.bar(index, accuracies_before.values(), bar_width, label='Before Tuning')
-        plt.bar(index + bar_width, accuracies_after.values(), bar_width, label='After Tuning')
-        plt.xlabel('Models')
-        plt.ylabel('Accuracy')
-        plt.title('Model Accuracies Before and After Fine Tuning')
-        plt.xticks(index + bar_width / 2, models.keys())
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
+        if not headless:
+            # Plot comparison of accuracies before and after tuning
+            import matplotlib.pyplot as plt
+
+            accuracies_before = {name: results[name]['test_accuracy'] for name in models.keys()}
+            plt.figure(figsize=(10, 5))
+            bar_width = 0.35
+            index = np.arange(len(models))
+            plt.bar(index, accuracies_before.values(), bar_width, label='Before Tuning')
+            plt.bar(index + bar_width, [accuracies_after.get(name, 0) for name in models], bar_width, label='After Tuning')
+            plt.xlabel('Models')
+            plt.ylabel('Accuracy')
+            plt.title('Model Accuracies Before and After Fine Tuning')
+            plt.xticks(index + bar_width / 2, models.keys())
+            plt.legend()
+            plt.tight_layout()
+            plt.show()
         
         best_model_name = max(accuracies_after.items(), key=lambda x: x[1])[0]
-        best_model = tuned_models[best_model_name]
-        
-        
-        return self.model
+        self.model = tuned_models[best_model_name]
+
+        report = {
+            'profile': profile,
+            'search': search,
+            'n_train': len(y_train),
+            'n_test': len(y_test),
+            'best_model': best_model_name,
+            'test_accuracy': accuracies_after[best_model_name],
+            'models': {
+                name: {
+                    'best_params': result['best_params'],
+                    'cv_accuracy': result['best_score'],
+                    'test_accuracy': accuracies_after[name],
+                    'baseline_test_accuracy': results[name]['test_accuracy'] if name in results else None,
+                }
+                for name, result in search_result['results'].items()
+            },
+            'n_fits': search_result['n_fits'],
+            'fit_seconds': search_result['fit_seconds'],
+            'elapsed_seconds': search_result['elapsed_seconds'],
+            'cache_stats': search_result['cache_stats'],
+            'diagnostics': None,
+        }
+        if diagnostics:
+            # Runs in the background; call .result() on the Future when needed
+            executor = ThreadPoolExecutor(max_workers=1)
+            self.diagnostics = executor.submit(
+                self._training_diagnostics, tuned_models, search_result,
+                X_search, y_search, X_test, y_test, n_jobs)
+            executor.shutdown(wait=False)
+            if store is not None:
+                # The background learning curves still read the files
+                diagnostics_store, store = store, None
+                self.diagnostics.add_done_callback(lambda _: diagnostics_store.close())
+            report['diagnostics'] = self.diagnostics
+        if store is not None:
+            store.close()
+        self.training_report = report
+
+        return report if headless else self.model
+
+    def _training_diagnostics(self, tuned_models: dict, search_result: dict,
+                              X_train, y_train, X_test, y_test, n_jobs: int = -1) -> dict:
+        """
+        Learning curves, confusion matrices and classification reports of the tuned models
+
+        Learning curves come from the halving rungs when the search has them
+        (no extra fits), otherwise they are fitted on the training split.
+
+        Returns:
+            Model name -> {'learning_curve', 'confusion_matrix', 'classification_report'}
+        """
+        from sklearn.metrics import classification_report, confusion_matrix
+
+        from model_search import learning_curve_scores, rung_learning_curve
+
+        diagnostics = {}
+        for name, model in tuned_models.items():
+            curve = rung_learning_curve(search_result, name)
+            if curve is not None:
+                curve['source'] = 'search'
+            else:
+                curve = learning_curve_scores(model, X_train, y_train, n_jobs=n_jobs)
+                curve['source'] = 'learning_curve'
+            y_pred = model.predict(np.asarray(X_test))
+            diagnostics[name] = {
+                'learning_curve': curve,
+                'confusion_matrix': confusion_matrix(y_test, y_pred),
+                'classification_report': classification_report(y_test, y_pred, output_dict=True),
+            }
+        return diagnostics
 
 
     def _plot_feature_importance(self):
         """Visualize feature importance of the best model"""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         if hasattr(self.model.named_steps['classifier'], 'feature_importances_'):
             importance = pd.DataFrame({
                 'feature': self.features,
@@ -401,6 +916,94 @@ class DraftBasedPredictor:
             plt.tight_layout()
             plt.show()
 
+    def export_artifact(self, path: str, n_matches: int = 10, compress: int = 6):
+        """
+        Save only what inference needs, instead of pickling the whole predictor
+        
+        The artifact holds the fitted pipeline, the champion encoder classes, the
+        feature list, the champion aggregate index and every team's recent stats,
+        so its size does not grow with the number of training rows.
+        
+        Args:
+            path: Output file (e.g. '../Models/draft_predictor_inference.pkl.gz')
+            n_matches: Number of recent matches the stored team form is averaged over
+            compress: gzip compression level
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_model() first.")
+
+        payload = {
+            'format': ARTIFACT_FORMAT,
+            'version': ARTIFACT_VERSION,
+            'features': list(self.features),
+            'pipeline': self.model,
+            'champion_classes': {col: enc.classes_.tolist() for col, enc in self.champion_encoders.items()},
+            'champion_index': self._champion_index,
+            'recent_matches': n_matches,
+            'recent_stats': {team: self._get_team_recent_stats(team, n_matches) for team in self._team_rows},
+        }
+        # Plain pickle (not joblib) so loading uses the C unpickler
+        with gzip.open(path, 'wb', compresslevel=compress) as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load_artifact(cls, path: str) -> 'DraftBasedPredictor':
+        """
+        Load a predictor written by export_artifact
+        
+        The returned predictor supports predict_match, predict_matches,
+        get_champion_stats and what_if_grid. It holds no match data, so
+        training, plotting and recent stats over a different number of
+        matches are not available.
+        
+        Args:
+            path: Artifact file
+            
+        Returns:
+            Inference-only DraftBasedPredictor
+        """
+        with gzip.open(path, 'rb') as f:
+            payload = pickle.load(f)
+
+        # Schema check
+        if not isinstance(payload, dict) or payload.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"{path} is not a draft predictor artifact")
+        if payload['version'] != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported artifact version {payload['version']} (expected {ARTIFACT_VERSION})")
+        missing = ARTIFACT_KEYS - set(payload)
+        if missing:
+            raise ValueError(f"Artifact is missing fields: {sorted(missing)}")
+        n_features = getattr(payload['pipeline'], 'n_features_in_', len(payload['features']))
+        if n_features != len(payload['features']):
+            raise ValueError(f"Feature count mismatch: pipeline expects {n_features}, "
+                             f"artifact lists {len(payload['features'])}")
+        if set(payload['champion_classes']) != set(PICK_COLUMNS):
+            raise ValueError("Artifact must hold champion classes for pick1..pick5")
+
+        predictor = cls.__new__(cls)
+        predictor.df = None
+        predictor.X = None
+        predictor.y = None
+        predictor.features = payload['features']
+        predictor.model = payload['pipeline']
+        predictor.metrics = Metrics()
+        predictor.prediction_cache = PredictionCache()
+        predictor.champion_encoders = {}
+        from sklearn.preprocessing import LabelEncoder
+        for col, classes in payload['champion_classes'].items():
+            encoder = LabelEncoder()
+            encoder.classes_ = np.array(classes, dtype=object)
+            predictor.champion_encoders[col] = encoder
+        predictor._champion_index = payload['champion_index']
+        predictor._data_version = 0
+        predictor._invalidate_caches()
+        predictor._team_rows = dict.fromkeys(payload['recent_stats'])
+        predictor._recent_stat_features = [f for f in predictor.features if not f.endswith('_encoded')]
+        predictor._recent_stats_cache = {
+            (team, payload['recent_matches']): stats for team, stats in payload['recent_stats'].items()
+        }
+        return predictor
+
     def get_champion_stats(self, team_name: str, picks: list[str]) -> list[dict]:
         """
         Get detailed statistics for each champion pick
@@ -412,100 +1015,295 @@ class DraftBasedPredictor:
         Returns:
             List of dictionaries containing champion statistics
         """
+        with self.metrics.stage('champion_stats'):
+            return self._lookup_champion_stats(team_name, picks)
+
+    def _lookup_champion_stats(self, team_name: str, picks: list[str]) -> list[dict]:
+        index = self._champion_index
         stats = []
         for i, pick in enumerate(picks, 1):
-            # Get team-specific stats for specific pick order
-            team_pick_stats = self.df[
-                (self.df['teamname'] == team_name) & 
-                (self.df[f'pick{i}'] == pick)
-            ]
+            # Team-specific / overall stats for specific pick order
+            team_games, team_wins = index['team_slot'].get((team_name, pick, i), (0, 0))
+            overall_games, overall_wins = index['slot'].get((pick, i), (0, 0))
             
-            # Get overall stats for specific pick order
-            overall_stats = self.df[self.df[f'pick{i}'] == pick]
-            
-            # Get team stats for this champion regardless of pick order
-            team_all_pick_stats = self.df[
-                (self.df['teamname'] == team_name) & 
-                (self.df[['pick1', 'pick2', 'pick3', 'pick4', 'pick5']] == pick).any(axis=1)
-            ]
-            
-            # Get overall stats for this champion regardless of pick order
-            overall_all_pick_stats = self.df[
-                (self.df[['pick1', 'pick2', 'pick3', 'pick4', 'pick5']] == pick).any(axis=1)
-            ]
+            # Team-specific / overall stats for this champion regardless of pick order
+            team_all_games, team_all_wins = index['team'].get((team_name, pick), (0, 0))
+            overall_all_games, overall_all_wins = index['overall'].get(pick, (0, 0))
             
             stats.append({
                 'position': i,
                 'champion': pick,
                 # Stats for specific pick order
-                'team_games': len(team_pick_stats) if not team_pick_stats.empty else 0,
-                'team_winrate': team_pick_stats['result'].mean() if not team_pick_stats.empty else 0,
-                'overall_games': len(overall_stats) if not overall_stats.empty else 0,
-                'overall_winrate': overall_stats['result'].mean() if not overall_stats.empty else 0,
+                'team_games': team_games,
+                'team_winrate': team_wins / team_games if team_games else 0,
+                'overall_games': overall_games,
+                'overall_winrate': overall_wins / overall_games if overall_games else 0,
                 # Stats regardless of pick order
-                'team_all_pick_games': len(team_all_pick_stats) if not team_all_pick_stats.empty else 0,
-                'team_all_pick_winrate': team_all_pick_stats['result'].mean() if not team_all_pick_stats.empty else 0,
-                'overall_all_pick_games': len(overall_all_pick_stats) if not overall_all_pick_stats.empty else 0,
-                'overall_all_pick_winrate': overall_all_pick_stats['result'].mean() if not overall_all_pick_stats.empty else 0
+                'team_all_pick_games': team_all_games,
+                'team_all_pick_winrate': team_all_wins / team_all_games if team_all_games else 0,
+                'overall_all_pick_games': overall_all_games,
+                'overall_all_pick_winrate': overall_all_wins / overall_all_games if overall_all_games else 0
             })
         
         return stats
     
 
     def predict_match(self, team1_name: str, team1_picks: list[str],
-                    team2_name: str, team2_picks: list[str]) -> dict:
-        """Predict match outcome"""
+                    team2_name: str, team2_picks: list[str], as_of=None, explain: bool = False) -> dict:
+        """
+        Predict match outcome (with each team's form as of a date if `as_of` is
+        given, and each team's feature attributions if `explain`)
+        """
         if self.model is None:
             raise ValueError("Model not trained. Call train_model() first.")
 
-        print(f"\nPredicting match: {team1_name} vs {team2_name}")
-        print(f"Model expects {len(self.features)} features")
+        logger.debug("Predicting match: %s vs %s", team1_name, team2_name)
+        logger.debug("Model expects %d features", len(self.features))
 
         try:
-            # Get recent stats for both teams
-            team1_recent_stats = self._get_team_recent_stats(team1_name)
-            team2_recent_stats = self._get_team_recent_stats(team2_name)
-            
-            
-            # Process team drafts
-            team1_features = self._process_team_draft(team1_name, team1_picks)
-            team2_features = self._process_team_draft(team2_name, team2_picks)
-
-            # Verify dimensions
-            if len(team1_features) != len(self.features):
-                print("\nFeature mismatch details:")
-                print(f"Got {len(team1_features)} features:")
-                print(f"Expected {len(self.features)} features:")
-                raise ValueError(f"Feature count mismatch")
-
-            # Make predictions
-            team1_prob = self.model.predict_proba([team1_features])[0][1]
-            team2_prob = self.model.predict_proba([team2_features])[0][1]
-
-            # Normalize probabilities
-            total = team1_prob + team2_prob
-            team1_prob /= total
-            team2_prob /= total
-
-            return {
-                'team1': {
-                    'name': team1_name,
-                    'picks': team1_picks,
-                    'win_probability': team1_prob,
-                    'champion_stats': self.get_champion_stats(team1_name, team1_picks),
-                    'recent_stats': team1_recent_stats
-                },
-                'team2': {
-                    'name': team2_name,
-                    'picks': team2_picks,
-                    'win_probability': team2_prob,
-                    'champion_stats': self.get_champion_stats(team2_name, team2_picks),
-                    'recent_stats': team2_recent_stats
-                }
-            }
+            with self.metrics.stage('predict_match'):
+                return self.predict_matches(
+                    [(team1_name, team1_picks, team2_name, team2_picks)],
+                    include_details=True, as_of=as_of, explain=explain
+                )[0]
         except Exception as e:
             raise ValueError(f"Error making prediction: {str(e)}")
 
+    def predict_matches(self, matchups: list[tuple], include_details: bool = False,
+                        as_of=None, explain: bool = False) -> list[dict]:
+        """
+        Predict many matches with a single predict_proba call
+
+        Matchups found in self.prediction_cache (same teams, drafts, data
+        and model) are returned from it; only the others are scored.
+        
+        Args:
+            matchups: Sequence of (team1_name, team1_picks, team2_name, team2_picks)
+            include_details: Also attach champion_stats and recent_stats to each team
+            as_of: Use each team's form over the 10 matches before this date
+                (from the form store) instead of its 10 latest matches
+            explain: Also attach each team's feature attributions (see
+                attributions.py), computed for all scored rows at once
+            
+        Returns:
+            List of result dictionaries in the same format as predict_match
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_model() first.")
+        if len(matchups) == 0:
+            return []
+        cache = self.prediction_cache
+        if as_of is not None:
+            as_of = pd.Timestamp(as_of)
+        if cache is None:
+            return self._score_matches(matchups, include_details, as_of, explain)
+
+        versions = (include_details, as_of, explain, self._data_version, self._model_version)
+        keys = [(team1, tuple(picks1), team2, tuple(picks2)) + versions
+                for team1, picks1, team2, picks2 in matchups]
+        results = [cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if len(missing) < len(matchups):
+            self.metrics.increment('prediction_cache_hit', len(matchups) - len(missing))
+        if missing:
+            self.metrics.increment('prediction_cache_miss', len(missing))
+            scored = self._score_matches([matchups[i] for i in missing], include_details, as_of, explain)
+            for i, result in zip(missing, scored):
+                cache.put(keys[i], result)
+                results[i] = result
+        return results
+
+    def _score_matches(self, matchups: list[tuple], include_details: bool, as_of=None,
+                       explain: bool = False) -> list[dict]:
+        """predict_matches without the cache"""
+        # Rows 0..N-1 are the first teams, rows N..2N-1 the second teams
+        team_names = [m[0] for m in matchups] + [m[2] for m in matchups]
+        picks = [m[1] for m in matchups] + [m[3] for m in matchups]
+        form = None
+        if as_of is not None:
+            with self.metrics.stage('form_as_of'):
+                store = self.get_form_store()
+                form = {team: store.recent_stats(team, as_of) for team in dict.fromkeys(team_names)}
+        with self.metrics.stage('draft_features'):
+            features = self._build_draft_features(
+                team_names, picks, None if form is None else [form[team] for team in team_names])
+
+        with self.metrics.stage('predict_proba'):
+            probabilities = self._predict_proba(features)
+        n = len(matchups)
+        attributions = None
+        if explain:
+            with self.metrics.stage('attributions'):
+                attributions = self._explain(features)
+        team1_probs, team2_probs = probabilities[:n], probabilities[n:]
+
+        # Normalize probabilities
+        total = team1_probs + team2_probs
+        team1_probs = team1_probs / total
+        team2_probs = team2_probs / total
+
+        results = []
+        for (team1_name, team1_picks, team2_name, team2_picks), team1_prob, team2_prob in zip(
+                matchups, team1_probs, team2_probs):
+            result = {
+                'team1': {'name': team1_name, 'picks': team1_picks, 'win_probability': team1_prob},
+                'team2': {'name': team2_name, 'picks': team2_picks, 'win_probability': team2_prob}
+            }
+            if attributions is not None:
+                for team, row in [('team1', len(results)), ('team2', n + len(results))]:
+                    result[team]['attributions'] = attributions[row]
+            if include_details:
+                for team in ['team1', 'team2']:
+                    name, team_picks = result[team]['name'], result[team]['picks']
+                    result[team]['champion_stats'] = self.get_champion_stats(name, team_picks)
+                    if form is None:
+                        with self.metrics.stage('recent_stats'):
+                            result[team]['recent_stats'] = self._get_team_recent_stats(name)
+                    else:
+                        result[team]['recent_stats'] = {**form[name], '_date_range': dict(form[name]['_date_range'])}
+            results.append(result)
+        return results
+
+    def _predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Win probability of every feature row
+
+        Goes through the native evaluator of the model (native_inference.py)
+        unless native_inference is off or the model is not supported. It is
+        compiled and checked against the pipeline on the first call after a
+        model is assigned; refitting the same pipeline in place needs a new
+        assignment (as for the prediction cache).
+        """
+        native = self._get_native_model(features) if self.native_inference else None
+        if native is None:
+            return self.model.predict_proba(features)[:, 1]
+        return native.positive_proba(features)
+
+    def _get_native_model(self, features: np.ndarray):
+        """The compiled model, None if it has no native evaluator"""
+        if self._native_model is None:
+            # False marks a model without a native evaluator
+            self._native_model = compile_pipeline(self.model, X_check=features) or False
+        return self._native_model or None
+
+    def _explain(self, features: np.ndarray) -> list:
+        """
+        Attribution dictionary of every feature row, None for each row when
+        the model has no native evaluator
+
+        Each dictionary holds the row's 'output' (model probability before the
+        two teams are normalized), 'base_value', 'method' and per-feature
+        'contributions' and 'values'.
+        """
+        native = self._get_native_model(features)
+        if native is None:
+            logger.warning("No attributions for %s models", type(self.model).__name__)
+            return [None] * len(features)
+        explanation = explain_features(native, features)
+        contributions, base_values = explanation['contributions'], explanation['base_values']
+        outputs = base_values + contributions.sum(axis=1)
+        columns = self._draft_feature_columns
+        return [{
+            'output': float(outputs[i]),
+            'base_value': float(base_values[i]),
+            'method': explanation['method'],
+            'contributions': dict(zip(columns, contributions[i].tolist())),
+            'values': dict(zip(columns, np.asarray(features[i], dtype=float).tolist())),
+        } for i in range(len(features))]
+
+    @property
+    def _draft_feature_columns(self) -> list[str]:
+        """Feature names in the column order _build_draft_features writes them"""
+        draft_columns = [f'pick{i}_encoded' for i in range(1, 6)]
+        for i in range(1, 6):
+            draft_columns += [f'winrate_pick{i}', f'count_pick{i}']
+        return draft_columns + [f for f in self.features if f not in draft_columns]
+
+    def score_drafts(self, team_names: list[str], picks: list[list[str]]) -> np.ndarray:
+        """
+        Model probability of every (team, five picks) row, scored in one batch
+
+        A row only depends on its own team and picks, so these are the values
+        predict_matches normalizes pairwise: P(team 1 wins) = p1 / (p1 + p2).
+
+        Args:
+            team_names: Team name for each row
+            picks: Five champion picks (pick1..pick5 order) for each row
+
+        Returns:
+            Array of shape (len(team_names),)
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_model() first.")
+        with self.metrics.stage('draft_features'):
+            features = self._build_draft_features(team_names, picks)
+        with self.metrics.stage('predict_proba'):
+            return self._predict_proba(features)
+
+    def what_if_grid(self, team_name: str, team_picks: list[str],
+                     opponent_name: str, opponent_picks: list[str],
+                     champions: list[str] = None) -> pd.DataFrame:
+        """
+        Win probability change for every single-pick swap in a team's draft
+
+        Every candidate row (each slot x each champion) is built from the same
+        base feature row, so recent form is computed once and the whole grid is
+        scored with one predict_proba call.
+        
+        Args:
+            team_name: Name of the team whose picks are swapped
+            team_picks: Current picks of that team
+            opponent_name: Name of the opposing team
+            opponent_picks: Picks of the opposing team (kept fixed)
+            champions: Candidate champions, defaults to every champion seen in any slot
+            
+        Returns:
+            DataFrame indexed by pick slot ('pick1'..'pick5') with one column per
+            champion, holding the change in team_name's normalized win probability.
+            NaN marks swaps that are not possible (champion never seen in that
+            slot or already picked by either team).
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_model() first.")
+
+        if champions is None:
+            champions = sorted(set().union(*(self.champion_encoders[col].classes_ for col in PICK_COLUMNS)))
+
+        base_rows = self._build_draft_features([team_name, opponent_name], [team_picks, opponent_picks])
+        base_row, opponent_row = base_rows
+
+        draft = self._champion_index['draft']
+        taken = set(team_picks) | set(opponent_picks)
+        candidates = []
+        rows = [base_row, opponent_row]
+        for i, col in enumerate(PICK_COLUMNS):
+            known = set(self.champion_encoders[col].classes_)
+            slot_champions = [c for c in champions if c in known and c not in taken]
+            if not slot_champions:
+                continue
+            slot_rows = np.repeat(base_row[np.newaxis, :], len(slot_champions), axis=0)
+            slot_rows[:, i] = self.champion_encoders[col].transform(slot_champions)
+            slot_rows[:, 5 + 2 * i:7 + 2 * i] = [
+                draft.get((team_name, c, i + 1), (0, 0)) for c in slot_champions
+            ]
+            candidates.extend((col, c) for c in slot_champions)
+            rows.append(slot_rows)
+
+        probabilities = self._predict_proba(np.vstack(rows))
+        team_prob, opponent_prob = probabilities[0], probabilities[1]
+        baseline = team_prob / (team_prob + opponent_prob)
+        swapped = probabilities[2:]
+        deltas = swapped / (swapped + opponent_prob) - baseline
+
+        grid = pd.DataFrame(np.nan, index=PICK_COLUMNS, columns=champions)
+        for (col, champion), delta in zip(candidates, deltas):
+            grid.loc[col, champion] = delta
+        # Keeping the current pick is always a zero change
+        for col, pick in zip(PICK_COLUMNS, team_picks):
+            if pick in grid.columns:
+                grid.loc[col, pick] = 0.0
+        return grid
+
     def print_detailed_prediction(self, result: dict):
         """
         Print detailed prediction results including champion statistics
@@ -530,55 +1328,84 @@ class DraftBasedPredictor:
                 print(f"  Overall Stats (Pick {stat['position']}) : {stat['overall_winrate']:.1%} win rate ({stat['overall_games']} games)")
                 print(f"  Overall Stats (All Picks)   : {stat['overall_all_pick_winrate']:.1%} win rate ({stat['overall_all_pick_games']} games)")
         
-    def _process_team_draft(self, team_name: str, picks: list[str]) -> np.ndarray:
-        """Process draft picks into model features"""
-        features = []
+    def _process_team_draft(self, team_name: str, picks: list[str],
+                            recent_stats: dict = None) -> np.ndarray:
+        """
+        Process draft picks into model features
+
+        Args:
+            team_name: Name of the team
+            picks: List of champion picks
+            recent_stats: Output of _get_team_recent_stats, looked up if not given
+        """
+        logger.debug("Processing features for prediction: %s", team_name)
+
+        with self.metrics.stage('process_team_draft'):
+            return self._build_draft_features(
+                [team_name], [picks],
+                None if recent_stats is None else [recent_stats]
+            )[0]
+
+    def _build_draft_features(self, team_names: list[str], picks: list[list[str]],
+                              recent_stats: list[dict] = None) -> np.ndarray:
+        """
+        Build one model feature row per (team, draft) in a single vectorized pass
+
+        Column layout matches what _process_team_draft has always produced:
+        5 encoded picks, then winrate/count pairs for each pick, then the
+        team's recent stats for the remaining features.
         
-        print("\nProcessing features for prediction:")
+        Args:
+            team_names: Team name for each row
+            picks: Five champion picks for each row
+            recent_stats: Optional per-row recent stats; looked up per team if not given
+            
+        Returns:
+            Array of shape (len(team_names), len(self.features))
+        """
+        picks = np.asarray(picks, dtype=object).reshape(len(team_names), -1)
+        n_rows = len(team_names)
+
+        # Tạo set các đặc trưng đã thêm để tránh trùng lặp
+        columns = self._draft_feature_columns
+        added_features = set(columns[:15])
+        form_features = columns[15:]
+
+        # Kiểm tra số lượng đặc trưng
+        n_created = picks.shape[1] * 3 + len(form_features)
+        if n_created != len(self.features):
+            logger.error("Feature mismatch details:")
+            logger.error("Features in model: %d", len(self.features))
+            logger.error("Features created: %d", n_created)
+            logger.error("Features already added: %s", sorted(added_features))
+            logger.error("All features expected: %s", sorted(self.features))
+            raise ValueError(f"Feature count mismatch: got {n_created}, expected {len(self.features)}")
+
+        features = np.empty((n_rows, len(self.features)))
         
         # 1. Encode picks (5 features)
-        for i, pick in enumerate(picks, 1):
-            encoded_pick = self.champion_encoders[f'pick{i}'].transform([pick])[0]
-            features.append(encoded_pick)
-            # print(f"Added pick{i}_encoded: {encoded_pick}")
+        with self.metrics.stage('encode_picks'):
+            for i in range(5):
+                features[:, i] = self.champion_encoders[f'pick{i + 1}'].transform(picks[:, i])
         
         # 2. Get draft stats (10 features)
-        for i, pick in enumerate(picks, 1):
-            team_pick_stats = self.df[
-                (self.df['teamname'] == team_name) & 
-                (self.df[f'pick{i}'] == pick)
-            ]
-            winrate = team_pick_stats[f'winrate_pick{i}'].mean() if not team_pick_stats.empty else 0
-            count = team_pick_stats[f'count_pick{i}'].mean() if not team_pick_stats.empty else 0
-            features.extend([winrate, count])
-            # print(f"Added winrate_pick{i}: {winrate}, count_pick{i}: {count}")
+        with self.metrics.stage('draft_stats'):
+            draft = self._champion_index['draft']
+            for i in range(5):
+                features[:, 5 + 2 * i:7 + 2 * i] = [
+                    draft.get((team, pick, i + 1), (0, 0)) for team, pick in zip(team_names, picks[:, i])
+                ]
         
         # 3. Get recent team stats
-        recent_stats = self._get_team_recent_stats(team_name)
-        
-        # Tạo set các đặc trưng đã thêm để tránh trùng lặp
-        added_features = set([f'pick{i}_encoded' for i in range(1, 6)] +
-                            [f'winrate_pick{i}' for i in range(1, 6)] +
-                            [f'count_pick{i}' for i in range(1, 6)])
-        
-        # Chỉ thêm các đặc trưng còn lại từ self.features
-        for feature in self.features:
-            if feature not in added_features:
-                value = recent_stats.get(feature, 0)
-                features.append(value)
-                # print(f"Added {feature}: {value}")
-        
-        features = np.array(features)
-        # print(f"\nTotal features created: {len(features)}")
-        # print(f"Expected features: {len(self.features)}")
-        
-        # Kiểm tra số lượng đặc trưng
-        if len(features) != len(self.features):
-            print("\nFeature mismatch details:")
-            print("Features in model:", len(self.features))
-            print("Features created:", len(features))
-            print("\nFeatures already added:", sorted(added_features))
-            print("\nAll features expected:", sorted(self.features))
-            raise ValueError(f"Feature count mismatch: got {len(features)}, expected {len(self.features)}")
-        
-        return features
\ No newline at end of file
+        with self.metrics.stage('team_form'):
+            if recent_stats is None:
+                team_form = {
+                    team: [stats.get(f, 0) for f in form_features]
+                    for team in dict.fromkeys(team_names)
+                    for stats in [self._get_team_recent_stats(team)]
+                }
+                features[:, 15:] = [team_form[team] for team in team_names]
+            else:
+                features[:, 15:] = [[stats.get(f, 0) for f in form_features] for stats in recent_stats]
+
+        return features
@@ -0,0 +1,92 @@
+"""
+shared_features.py - Feature matrices shared zero-copy with the training workers
+
+search_models and learning_curve_scores hand X to joblib workers once per
+batch of fits. A plain array is hashed and dumped again for every batch
+(and a DataFrame is pickled into every worker), so each worker process ends
+up holding its own copy of the data. SharedFeatureStore writes each matrix
+once, as a contiguous float32 .npy file in shared memory (/dev/shm when
+available), and reopens it read-only with mmap_mode='r'. joblib pickles
+memory-mapped arrays (and views of them) as a file reference, so the
+workers map the same pages instead of receiving a copy.
+
+Example:
+    with SharedFeatureStore() as store:
+        X = store.put('X_train', X_train)           # float32, read-only memmap
+        y = store.put('y_train', y_train, dtype=None)
+        search_models(pipelines, param_grids, X, y, n_jobs=-1)
+"""
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+FEATURE_DTYPE = np.float32
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+def default_temp_folder() -> str:
+    """/dev/shm when it is writable (the files then never touch the disk), else the system temp folder"""
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+    return tempfile.gettempdir()
+
+
+class SharedFeatureStore:
+    """
+    Read-only memory-mapped copies of training arrays, removed on close()
+
+    Like tempfile.TemporaryDirectory, the folder is also removed when the
+    store is garbage collected or the interpreter exits, so a failed training
+    run does not leave files behind in /dev/shm.
+
+    Args:
+        temp_folder: Folder for the backing files, default_temp_folder() if None
+    """
+
+    def __init__(self, temp_folder: str = None):
+        self.folder = tempfile.mkdtemp(prefix='draft_features_', dir=temp_folder or default_temp_folder())
+        self.arrays = {}
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.folder, ignore_errors=True)
+
+    def put(self, name: str, array, dtype=FEATURE_DTYPE) -> np.ndarray:
+        """
+        Write array once as a C-contiguous .npy file and map it back read-only
+
+        Args:
+            name: File name of the array (unique within the store)
+            array: Array-like (DataFrame, Series, ndarray)
+            dtype: Stored dtype; None keeps the array's own dtype (e.g. for labels)
+
+        Returns:
+            np.memmap of the stored array
+        """
+        if self.folder is None:
+            raise ValueError("SharedFeatureStore is closed")
+        if name in self.arrays:
+            raise ValueError(f"Array '{name}' is already stored")
+        array = np.asarray(array, dtype=dtype)
+        path = os.path.join(self.folder, f'{name}.npy')
+        stored = np.lib.format.open_memmap(path, mode='w+', dtype=array.dtype, shape=array.shape)
+        stored[...] = array
+        stored.flush()
+        del stored
+        self.arrays[name] = np.load(path, mmap_mode='r')
+        return self.arrays[name]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def close(self):
+        """Delete the backing files; arrays already handed out stay readable in this process"""
+        self._finalizer()
+        self.folder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
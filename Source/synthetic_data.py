@@ -0,0 +1,277 @@
+"""
+synthetic_data.py - Synthetic match data with the schema of processed_for_prediction.csv
+
+Used by the benchmarks to grow the dataset beyond the real 1,940 rows. Every
+game gets two rows (participantid 100/200, results 1/0) with distinct teams
+and ten distinct champions; champion popularity is skewed like in real
+drafts. The numeric stats of each row are copied from a real row with the
+same result, so the stats stay consistent with each other and with the
+outcome, and winrate_pickN/count_pickN are recomputed from the generated
+picks the same way the notebook builds them.
+
+generate_raw_season produces a raw Oracle's Elixir style season (ten player
+rows and two team rows per game, several leagues, partial data, early
+endings, a few missing picks) for testing build_dataset.py, since the real
+season files are not kept in the repository.
+
+Usage (from the Source folder):
+    python synthetic_data.py --scale 10 --output ../Data/synthetic_10x.csv
+    python synthetic_data.py --raw-season 2024 --games 10000 --output ../Data/synthetic_2024_raw.csv
+"""
+import argparse
+import math
+
+import numpy as np
+import pandas as pd
+
+from team_champion_stats import add_team_champion_features
+
+TEMPLATE_PATH = "../Data/processed_for_prediction.csv"
+BASE_GAMES = 970
+BASE_TEAMS = 12
+BASE_CHAMPIONS = 142
+
+PICK_COLUMNS = [f'pick{i}' for i in range(1, 6)]
+BAN_COLUMNS = [f'ban{i}' for i in range(1, 6)]
+
+# Games drafted per chunk (keeps the champion sampling matrix small)
+CHUNK_GAMES = 10_000
+
+# Raw season layout
+RAW_LEAGUES = ["LCK", "LPL", "LEC", "LCS", "VCS", "PCS", "LLA", "CBLOL", "WLDs", "EWC", "MSI", "LFL", "LJL", "NACL"]
+INTERNATIONAL_LEAGUES = ["WLDs", "EWC", "MSI"]   # no split
+PARTIAL_LEAGUES = ["LPL"]                        # datacompleteness 'partial'
+PLAYER_POSITIONS = ["top", "jng", "mid", "bot", "sup"]
+# Team-level columns that are empty on player rows
+TEAM_ONLY_COLUMNS = ['dragons', 'opp_dragons', 'elementaldrakes', 'opp_elementaldrakes', 'infernals',
+                     'mountains', 'clouds', 'oceans', 'chemtechs', 'hextechs', 'elders', 'opp_elders',
+                     'firstherald', 'heralds', 'opp_heralds', 'barons', 'opp_barons', 'towers',
+                     'opp_towers', 'firsttothreetowers', 'opp_turretplates', 'inhibitors',
+                     'opp_inhibitors', 'void_grubs', 'opp_void_grubs', 'teamkills', 'teamdeaths']
+
+
+def scale_config(scale: float) -> dict:
+    """Games, teams and champions for a dataset `scale` times the real one"""
+    return {
+        'n_games': int(round(BASE_GAMES * scale)),
+        'n_teams': max(BASE_TEAMS, int(round(BASE_TEAMS * math.sqrt(scale)))),
+        'n_champions': max(BASE_CHAMPIONS, int(round(BASE_CHAMPIONS * scale ** 0.25))),
+    }
+
+
+def _draft_champions(rng: np.random.Generator, n_games: int, n_champions: int) -> np.ndarray:
+    """(n_games, 20) champion ids, distinct within a game, popular champions more often"""
+    # Zipf-like popularity; Gumbel top-k samples without replacement per game
+    log_weights = -0.8 * np.log(np.arange(1, n_champions + 1, dtype=np.float32))
+    drafts = np.empty((n_games, 20), dtype=np.int32)
+    for start in range(0, n_games, CHUNK_GAMES):
+        stop = min(start + CHUNK_GAMES, n_games)
+        keys = log_weights + rng.gumbel(size=(stop - start, n_champions)).astype(np.float32)
+        top = np.argpartition(-keys, 19, axis=1)[:, :20]
+        # Shuffle so pick/ban slots are not ordered by popularity
+        drafts[start:stop] = np.take_along_axis(top, rng.random(top.shape).argsort(axis=1), axis=1)
+    return drafts
+
+
+def generate_match_data(n_games: int = BASE_GAMES, n_teams: int = BASE_TEAMS,
+                        n_champions: int = BASE_CHAMPIONS, seed: int = 42,
+                        template_path: str = TEMPLATE_PATH) -> pd.DataFrame:
+    """
+    Generate synthetic matches with the columns of the template CSV
+
+    Args:
+        n_games: Number of games (two rows each)
+        n_teams: Number of distinct teams
+        n_champions: Number of distinct champions (at least 20)
+        seed: Random seed
+        template_path: Real processed CSV providing the column layout and the stats
+
+    Returns:
+        DataFrame with the template's columns (minus leftover 'Unnamed: ...' indexes)
+    """
+    if n_teams < 2 or n_champions < 20:
+        raise ValueError("Need at least 2 teams and 20 champions")
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(template_path)
+    template = template.loc[:, ~template.columns.str.startswith('Unnamed: ')]
+    n_rows = 2 * n_games
+
+    # Teams: two distinct teams per game
+    team_names = np.array([f"Team {i:03d}" for i in range(1, n_teams + 1)], dtype=object)
+    blue = rng.integers(0, n_teams, n_games)
+    red = (blue + rng.integers(1, n_teams, n_games)) % n_teams
+    teams = np.column_stack([blue, red]).ravel()
+
+    # Results: one winner per game
+    blue_wins = rng.random(n_games) < 0.5
+    results = np.column_stack([blue_wins, ~blue_wins]).ravel().astype(np.int64)
+
+    # Numeric stats copied from real rows with the same result
+    rows = np.empty(n_rows, dtype=np.int64)
+    for result in (0, 1):
+        pool = np.flatnonzero(template['result'].to_numpy() == result)
+        mask = results == result
+        rows[mask] = rng.choice(pool, mask.sum())
+    df = template.iloc[rows].reset_index(drop=True)
+
+    # Ids, dates and teams
+    game_numbers = np.repeat(np.arange(n_games), 2)
+    df['gameid'] = [f"SYNTH_{g:07d}" for g in game_numbers]
+    start = pd.Timestamp("2023-01-18 08:00")
+    minutes = np.sort(rng.integers(0, 60 * 24 * 365, n_games))
+    df['date'] = np.repeat((start + pd.to_timedelta(minutes, unit='min')).strftime('%Y-%m-%d %H:%M:%S'), 2)
+    df['participantid'] = np.tile([100, 200], n_games)
+    df['teamname'] = team_names[teams]
+    df['result'] = results
+
+    # Draft: 5 picks and 5 bans per team, all distinct within the game
+    champion_names = np.array([f"Champion {i:03d}" for i in range(1, n_champions + 1)], dtype=object)
+    drafts = champion_names[_draft_champions(rng, n_games, n_champions)]
+    per_team = drafts.reshape(n_rows, 10)
+    for i, col in enumerate(PICK_COLUMNS):
+        df[col] = per_team[:, i]
+    for i, col in enumerate(BAN_COLUMNS):
+        df[col] = per_team[:, 5 + i]
+
+    # Team-champion winrate/count over all pick slots
+    df = add_team_champion_features(df)
+    return df
+
+
+def generate_raw_season(n_games: int = 10_000, year: int = 2024, seed: int = 42,
+                        template_path: str = TEMPLATE_PATH) -> pd.DataFrame:
+    """
+    Generate a raw season CSV in the Oracle's Elixir layout
+
+    Args:
+        n_games: Number of games (twelve rows each)
+        year: Season year, also used in game ids
+        seed: Random seed
+        template_path: Processed CSV whose stats are resampled for the team rows
+
+    Returns:
+        DataFrame with player and team rows of every game
+    """
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(template_path)
+    stat_columns = [c for c in template.columns
+                    if not c.startswith(('Unnamed: ', 'winrate_', 'count_'))
+                    and c not in ('gameid', 'date', 'participantid', 'teamname', 'result')
+                    and c not in PICK_COLUMNS + BAN_COLUMNS]
+    time_columns = [c for c in stat_columns if any(f'at{t}' in c for t in (10, 15, 20, 25))]
+
+    leagues = rng.choice(RAW_LEAGUES, n_games)
+    complete = ~np.isin(leagues, PARTIAL_LEAGUES)
+    team_names = np.array([f"Team {i:03d}" for i in range(1, 121)], dtype=object)
+    champions = np.array([f"Champion {i:03d}" for i in range(1, 171)], dtype=object)
+    drafts = champions[_draft_champions(rng, n_games, len(champions))]
+
+    # One block per game: 5 blue players, 5 red players, blue team, red team
+    n_rows = 12 * n_games
+    game = np.repeat(np.arange(n_games), 12)
+    slot = np.tile(np.arange(12), n_games)
+    is_team = slot >= 10
+    red = np.where(is_team, slot == 11, slot >= 5)
+    blue_team = rng.integers(0, len(team_names), n_games)
+    red_team = (blue_team + rng.integers(1, len(team_names), n_games)) % len(team_names)
+    blue_wins = rng.random(n_games) < 0.5
+    result = np.where(red, ~blue_wins[game], blue_wins[game]).astype(int)
+
+    template_rows = np.empty(n_rows, dtype=np.int64)
+    for value in (0, 1):
+        pool = np.flatnonzero(template['result'].to_numpy() == value)
+        mask = result == value
+        template_rows[mask] = rng.choice(pool, mask.sum())
+    # copy() consolidates the blocks before columns are added
+    stats = template[stat_columns].iloc[template_rows].reset_index(drop=True).copy()
+    gamelength = rng.integers(25 * 60, 45 * 60, n_games)
+    # Some games end before the later snapshots (remakes, early surrenders, stomps)
+    short = rng.random(n_games) < 0.08
+    gamelength[short] = rng.integers(3 * 60, 24 * 60, short.sum())
+    stats['gamelength'] = gamelength[game]
+    stats['teamkills'] = stats['kills']
+    stats['teamdeaths'] = stats['deaths']
+
+    minutes = np.sort(rng.integers(0, 60 * 24 * 300, n_games))
+    dates = (pd.Timestamp(f"{year}-01-10") + pd.to_timedelta(minutes, unit='min')).strftime('%Y-%m-%d %H:%M:%S')
+    side_team = np.where(red, red_team[game], blue_team[game])
+    team_draft = np.where(red[:, np.newaxis], drafts[game, 10:], drafts[game, :10])
+
+    df = pd.DataFrame({
+        'gameid': [f"SYNTH{year}_{g:06d}" for g in game],
+        'datacompleteness': np.where(complete[game], 'complete', 'partial'),
+        'url': np.where(rng.random(n_games) < 0.05, 'https://example.invalid/match', None)[game],
+        'league': leagues[game],
+        'year': year,
+        'split': np.where(np.isin(leagues[game], INTERNATIONAL_LEAGUES), None,
+                          np.where(rng.random(n_games)[game] < 0.5, 'Spring', 'Summer')),
+        'playoffs': (rng.random(n_games) < 0.2).astype(int)[game],
+        'date': np.asarray(dates)[game],
+        'game': rng.integers(1, 6, n_games)[game],
+        'patch': np.round(14 + rng.integers(1, 24, n_games) / 100, 2)[game],
+        'participantid': np.where(is_team, np.where(red, 200, 100), slot + 1),
+        'side': np.where(red, 'Red', 'Blue'),
+        'position': np.where(is_team, 'team', np.array(PLAYER_POSITIONS * 2 + ['team', 'team'])[slot]),
+        'playername': np.where(is_team, None, [f"Player {g % 997}-{s}" for g, s in zip(game, slot)]),
+        'playerid': np.where(is_team, None, 'oe:player:synthetic'),
+        'teamname': team_names[side_team],
+        'teamid': [f"oe:team:{t:03d}" for t in side_team],
+        'champion': np.where(is_team, None, drafts[game, np.where(slot < 10, slot % 5 + (slot >= 5) * 10, 0)]),
+    })
+    for i, col in enumerate(BAN_COLUMNS):
+        df[col] = team_draft[:, 5 + i]
+    for i, col in enumerate(PICK_COLUMNS):
+        df[col] = np.where(is_team, team_draft[:, i], None)
+    df['firstbloodkill'] = np.where(is_team, np.nan, rng.integers(0, 2, n_rows))
+    df['doublekills'] = np.where(is_team, np.nan, rng.integers(0, 3, n_rows))
+    df['dragons (type unknown)'] = np.where(rng.random(n_rows) < 0.05, 1.0, np.nan)
+    df['monsterkillsownjungle'] = np.where(rng.random(n_rows) < 0.1, rng.integers(0, 100, n_rows), np.nan)
+    df['monsterkillsenemyjungle'] = np.where(rng.random(n_rows) < 0.1, rng.integers(0, 20, n_rows), np.nan)
+    stats['result'] = result
+    df = pd.concat([df, stats], axis=1)
+
+    # Team-only stats are empty on player rows
+    df.loc[~is_team, [c for c in TEAM_ONLY_COLUMNS if c in df.columns]] = np.nan
+    # Snapshots after the end of a game are missing; partial games miss all of them
+    length = df['gamelength'].to_numpy()
+    for col in time_columns:
+        minute = next(t for t in (10, 15, 20, 25) if f'at{t}' in col)
+        df.loc[(length < minute * 60) | (df['datacompleteness'] == 'partial').to_numpy(), col] = np.nan
+    # Some ban slots were skipped and a few picks were not recorded
+    team_idx = np.flatnonzero(is_team)
+    df.loc[team_idx[rng.random(len(team_idx)) < 0.01], 'ban5'] = None
+    missing_pick = team_idx[rng.random(len(team_idx)) < 0.002]
+    for row, col in zip(missing_pick, rng.choice(PICK_COLUMNS, len(missing_pick))):
+        df.loc[row, col] = None
+    return df
+
+
+def write_match_csv(path: str, scale: float = 1, seed: int = 42,
+                    template_path: str = TEMPLATE_PATH) -> dict:
+    """
+    Write a synthetic dataset `scale` times the real one to a CSV
+
+    Returns:
+        The scale_config used, with the number of rows written
+    """
+    config = scale_config(scale)
+    df = generate_match_data(seed=seed, template_path=template_path, **config)
+    df.to_csv(path, index=False)
+    return {**config, 'rows': len(df)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', type=float, default=1, help="Multiple of the real dataset size")
+    parser.add_argument('--raw-season', type=int, help="Write a raw Oracle's Elixir style season for this year instead")
+    parser.add_argument('--games', type=int, default=10_000, help="Games in the raw season")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default="../Data/synthetic_match_data.csv")
+    args = parser.parse_args()
+    if args.raw_season is not None:
+        raw = generate_raw_season(args.games, args.raw_season, args.seed)
+        raw.to_csv(args.output, index=False)
+        print(f"Wrote {len(raw)} raw rows ({args.games} games of {args.raw_season}) to {args.output}")
+    else:
+        info = write_match_csv(args.output, args.scale, args.seed)
+        print(f"Wrote {info['rows']} rows ({info['n_teams']} teams, {info['n_champions']} champions) to {args.output}")
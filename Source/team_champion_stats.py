@@ -0,0 +1,96 @@
+"""
+team_champion_stats.py - Team-champion winrate/count features (winrate_pickN, count_pickN)
+
+Vectorized version of the calculate_team_champion_stats cell of the DS102
+notebook: the five pick columns are melted into one (team, champion, result)
+table, grouped once, and the games/wins are joined back onto every pick slot.
+A champion's stats cover all pick slots, so 'Ahri' picked first or fifth
+counts towards the same (team, champion) total.
+
+Output is identical to processed_for_prediction.csv when run on
+LCK_Tournament2.csv. Stats can also be computed separately per league/split
+with `group_by`, e.g. when a dataset holds several leagues.
+
+Usage (from the Source folder):
+    python team_champion_stats.py ../Data/LCK_Tournament2.csv --output ../Data/processed_for_prediction.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PICK_COLUMNS = [f'pick{i}' for i in range(1, 6)]
+
+
+def calculate_team_champion_stats(data: pd.DataFrame, group_by: list[str] = None) -> pd.DataFrame:
+    """
+    Games and wins of every team with every champion, regardless of pick order
+
+    Args:
+        data: Matches with 'teamname', 'result' and pick1..pick5
+        group_by: Extra key columns (e.g. ['league', 'split']) to compute the
+            stats separately for each group
+
+    Returns:
+        DataFrame indexed by (*group_by, teamname, champion) with games, wins and winrate
+    """
+    keys = list(group_by or []) + ['teamname']
+    long = data[keys + ['result'] + PICK_COLUMNS].melt(
+        id_vars=keys + ['result'], value_vars=PICK_COLUMNS, value_name='champion')
+    stats = long.groupby(keys + ['champion'], sort=False)['result'].agg(games='count', wins='sum')
+    stats['winrate'] = stats['wins'] / stats['games']
+    return stats
+
+
+def add_team_champion_features(data: pd.DataFrame, group_by: list[str] = None,
+                               stats: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Add winrate_pickN/count_pickN for every pick slot
+
+    Picks without stats (missing pick, or a team/champion not in `stats`)
+    get winrate 0 and count 0, as in the notebook. Existing columns are
+    overwritten in place, so the function can be rerun on its own output.
+
+    Args:
+        data: Matches with 'teamname', 'result' and pick1..pick5
+        group_by: Extra key columns to compute the stats per group
+        stats: Precomputed calculate_team_champion_stats output (same group_by),
+            e.g. stats from the training split applied to the test split
+
+    Returns:
+        Copy of data with the ten feature columns
+    """
+    if stats is None:
+        stats = calculate_team_champion_stats(data, group_by)
+    keys = list(group_by or []) + ['teamname']
+    games = stats['games'].to_numpy()
+    winrate = stats['winrate'].to_numpy()
+
+    features = {}
+    for col in PICK_COLUMNS:
+        # Row position of each (keys, pick) in stats, -1 when not found
+        lookup = pd.MultiIndex.from_frame(data[keys + [col]].set_axis(keys + ['champion'], axis=1))
+        pos = stats.index.get_indexer(lookup)
+        found = pos >= 0
+        features[f'winrate_{col}'] = np.where(found, winrate[pos], 0.0)
+        features[f'count_{col}'] = np.where(found, games[pos], 0).astype(float)
+
+    result = data.copy()
+    new = [name for name in features if name not in result.columns]
+    for name in features:
+        if name in result.columns:
+            result[name] = features[name]
+    return pd.concat([result, pd.DataFrame({name: features[name] for name in new}, index=data.index)],
+                     axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add team-champion winrate/count features")
+    parser.add_argument('csv_path', help="Match CSV (e.g. ../Data/LCK_Tournament2.csv)")
+    parser.add_argument('--output', default="../Data/processed_for_prediction.csv")
+    parser.add_argument('--group-by', nargs='*', default=None,
+                        help="Compute the stats per group, e.g. --group-by league split")
+    args = parser.parse_args()
+    df = add_team_champion_features(pd.read_csv(args.csv_path), args.group_by)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} rows to {args.output}")
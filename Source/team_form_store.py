@@ -0,0 +1,160 @@
+"""
+team_form_store.py - As-of rolling team form (mean stats over the last N matches)
+
+DraftBasedPredictor._get_team_recent_stats averages a team's N latest
+matches in the whole file. TeamFormStore precomputes, in one vectorized pass,
+the N-match mean of every stat for every team after each of its matches, for
+several N at once, so "form as of a date" is a binary search in the team's
+sorted match dates plus a row lookup.
+
+Rolling means come from cumulative sums over the rows sorted by team and
+date (NaN stats are skipped, like DataFrame.mean). Matches at the same time
+are ordered like _build_team_match_index orders them, so the latest-form
+lookup uses the same matches as _get_team_recent_stats.
+
+Example:
+    store = TeamFormStore(predictor.df, features, windows=(5, 10))
+    store.recent_stats('T1', as_of='2024-06-01', window=10)   # matches before June 1st
+    store.pre_match_form(10)                                  # leakage-free rows for training
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOWS = (10,)
+
+
+class TeamFormStore:
+    """
+    Rolling N-match means of team stats at every match date
+
+    Args:
+        df: Matches with 'teamname', 'date' and the feature columns
+        features: Stat columns to average
+        windows: Numbers of matches N to precompute
+    """
+
+    def __init__(self, df: pd.DataFrame, features: list[str], windows: tuple = DEFAULT_WINDOWS):
+        self.features = list(features)
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError("Windows must be positive numbers of matches")
+
+        n = len(df)
+        teams = pd.Categorical(df['teamname'].to_numpy(dtype=object))
+        dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        rows = np.arange(n)
+        # Team, then oldest first; at equal times the earlier row counts as the newer match
+        order = np.lexsort((-rows, dates, teams.codes))
+        team_codes = teams.codes[order]
+
+        values = df[self.features].to_numpy(dtype=np.float64)[order]
+        valid = ~np.isnan(values)
+        sums = np.zeros((n + 1, len(self.features)))
+        counts = np.zeros((n + 1, len(self.features)))
+        np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+        np.cumsum(valid, axis=0, out=counts[1:])
+
+        starts = np.flatnonzero(np.r_[True, team_codes[1:] != team_codes[:-1]]) if n else np.empty(0, int)
+        sizes = np.diff(np.r_[starts, n])
+        group_start = np.repeat(starts, sizes)
+        end = rows + 1
+
+        self._means = {}
+        self._counts = {}
+        for window in self.windows:
+            lo = np.maximum(end - window, group_start)
+            total = sums[end] - sums[lo]
+            count = counts[end] - counts[lo]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self._means[window] = total / count
+            self._counts[window] = end - lo
+
+        self._order = order
+        self._dates = dates[order]
+        self._team_slices = {teams.categories[team_codes[start]]: (start, start + size)
+                             for start, size in zip(starts, sizes)}
+
+    @property
+    def teams(self) -> list[str]:
+        return list(self._team_slices)
+
+    def _check_window(self, window: int) -> int:
+        if window not in self._means:
+            raise ValueError(f"Window {window} not precomputed (available: {list(self.windows)})")
+        return window
+
+    def _position(self, team_name: str, as_of=None, inclusive: bool = False) -> int:
+        """Row (in store order) of the team's last match before as_of, -1 if none"""
+        if team_name not in self._team_slices:
+            raise ValueError(f"No matches found for team: {team_name}")
+        start, stop = self._team_slices[team_name]
+        if as_of is None:
+            return stop - 1
+        as_of = pd.Timestamp(as_of).as_unit('ns').value
+        side = 'right' if inclusive else 'left'
+        return start + int(np.searchsorted(self._dates[start:stop], as_of, side=side)) - 1
+
+    def form(self, team_name: str, as_of=None, window: int = 10, inclusive: bool = False) -> np.ndarray:
+        """
+        Mean of each feature over the team's last `window` matches before `as_of`
+
+        Args:
+            team_name: Name of the team
+            as_of: Date/time (anything pd.Timestamp accepts); None means after the latest match
+            window: Number of matches (one of self.windows)
+            inclusive: Also count matches played exactly at as_of
+
+        Returns:
+            Array aligned with self.features, None if the team has no match before as_of
+        """
+        window = self._check_window(window)
+        position = self._position(team_name, as_of, inclusive)
+        if position < self._team_slices[team_name][0]:
+            return None
+        return self._means[window][position]
+
+    def recent_stats(self, team_name: str, as_of=None, window: int = 10, inclusive: bool = False) -> dict:
+        """
+        as-of version of DraftBasedPredictor._get_team_recent_stats (same dictionary layout)
+
+        Raises:
+            ValueError: Unknown team or no match before as_of
+        """
+        window = self._check_window(window)
+        position = self._position(team_name, as_of, inclusive)
+        start = self._team_slices[team_name][0]
+        if position < start:
+            raise ValueError(f"No matches found for team {team_name} before {as_of}")
+        used = int(self._counts[window][position])
+        stats = dict(zip(self.features, self._means[window][position].tolist()))
+        stats['_date_range'] = {
+            'newest_match': pd.Timestamp(self._dates[position]).strftime('%Y-%m-%d'),
+            'oldest_match': pd.Timestamp(self._dates[position - used + 1]).strftime('%Y-%m-%d'),
+            'matches_used': used,
+        }
+        return stats
+
+    def pre_match_form(self, window: int = 10) -> pd.DataFrame:
+        """
+        Each stored row's team form from its previous `window` matches only
+
+        The match itself (and later ones) never contribute, so the result can
+        replace the match's own stats as leakage-free training features. Rows
+        of a team's first match are NaN.
+
+        Returns:
+            DataFrame in the original row order (index 0..n-1) with one column per feature
+        """
+        window = self._check_window(window)
+        n = len(self._order)
+        means = np.full((n, len(self.features)), np.nan)
+        for start, stop in self._team_slices.values():
+            # Form before match i is the form after match i - 1, unless played at the same time
+            dates = self._dates[start:stop]
+            previous = start + np.searchsorted(dates, dates, side='left') - 1
+            has_history = previous >= start
+            block = means[start:stop]
+            block[has_history] = self._means[window][previous[has_history]]
+        result = np.empty_like(means)
+        result[self._order] = means
+        return pd.DataFrame(result, columns=self.features)
@@ -0,0 +1,395 @@
+"""
+tournament_simulator.py - Monte Carlo odds for series, round robins and playoff brackets
+
+predict_match gives the probability of one game. TournamentSimulator turns
+that into placement odds for a whole split:
+
+1. Every team brings a pool of drafts. The win probability of each pair of
+   teams is the mean over all draft pairs, scored with one predict_matches
+   call for the whole field.
+2. The stages (round robin, single-elimination bracket, or a round robin
+   whose top teams advance to a bracket) are simulated with NumPy, one
+   array operation per round of series over a whole chunk of simulations.
+   Each series is one uniform draw against the cumulative probabilities
+   of its final scores (2-0, 2-1, 1-2, 0-2 for a Bo3).
+3. Chunks run in a joblib process pool. Every chunk gets its own seed from
+   np.random.SeedSequence(seed).spawn, so results depend on the seed and
+   the chunk size only, not on the number of workers.
+
+Round-robin standings are series wins, then game differential, then a coin
+flip (the official head-to-head and tiebreaker matches are not modelled).
+Brackets use standard seeding (1 v 8, 4 v 5, ...) with byes for the top
+seeds when the field is not a power of two.
+
+Usage (from the Source folder):
+    python tournament_simulator.py --teams "Gen.G" "T1" "Hanwha Life Esports" ... --preset lck_split
+    python tournament_simulator.py --teams A B C D --stages '[{"format": "single_elimination", "best_of": 5}]'
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+
+ARTIFACT_PATH = '../Models/draft_predictor_inference.pkl.gz'
+DATA_PATH = "../Data/processed_for_prediction.csv"
+PICK_COLUMNS = [f'pick{i}' for i in range(1, 6)]
+
+STAGE_FORMATS = ('round_robin', 'single_elimination')
+DEFAULT_SIMULATIONS = 1_000_000
+# Simulations per chunk (and per seed); fixed so results do not depend on n_jobs
+CHUNK_SIZE = 50_000
+
+PRESETS = {
+    # Double round robin of Bo3, top 6 to a Bo5 bracket where seeds 1-2 get byes
+    'lck_split': [
+        {'format': 'round_robin', 'best_of': 3, 'rounds': 2, 'advance': 6},
+        {'format': 'single_elimination', 'best_of': 5},
+    ],
+    'round_robin_bo1': [{'format': 'round_robin', 'best_of': 1, 'rounds': 1}],
+    'bracket_bo5': [{'format': 'single_elimination', 'best_of': 5}],
+}
+
+
+def recent_draft_pools(df: pd.DataFrame, teams: list[str], n_drafts: int = 5) -> dict:
+    """
+    Each team's drafts from its n_drafts most recent games
+
+    Args:
+        df: Matches with 'teamname', 'date' and pick1..pick5
+        teams: Team names
+        n_drafts: Drafts per team
+
+    Returns:
+        Team name -> list of 5-champion drafts, in the order of `teams`
+    """
+    pools = {}
+    for team in teams:
+        games = df[df['teamname'] == team]
+        if games.empty:
+            raise ValueError(f"No matches found for team: {team}")
+        latest = games.sort_values('date').tail(n_drafts)
+        pools[team] = latest[PICK_COLUMNS].values.tolist()
+    return pools
+
+
+def win_probability_matrix(predictor, draft_pools: dict) -> np.ndarray:
+    """
+    P[i, j] = probability that team i beats team j in one game
+
+    All draft pairs of all team pairs are scored in a single batched
+    predict_matches call; a pair's probability is the mean over its drafts.
+
+    Args:
+        predictor: Trained (or artifact-loaded) DraftBasedPredictor
+        draft_pools: Team name -> list of drafts
+
+    Returns:
+        (n_teams, n_teams) array in the order of draft_pools, 0.5 on the diagonal
+    """
+    teams = list(draft_pools)
+    matchups, pairs = [], []
+    for i, team1 in enumerate(teams):
+        for j in range(i + 1, len(teams)):
+            team2 = teams[j]
+            for picks1 in draft_pools[team1]:
+                for picks2 in draft_pools[team2]:
+                    matchups.append((team1, list(picks1), team2, list(picks2)))
+                    pairs.append((i, j))
+    results = predictor.predict_matches(matchups)
+
+    sums = np.zeros((len(teams), len(teams)))
+    counts = np.zeros((len(teams), len(teams)))
+    for (i, j), result in zip(pairs, results):
+        sums[i, j] += result['team1']['win_probability']
+        counts[i, j] += 1
+    probabilities = np.full((len(teams), len(teams)), 0.5)
+    upper = np.triu(counts > 0, k=1)
+    probabilities[upper] = sums[upper] / counts[upper]
+    probabilities.T[upper] = 1.0 - probabilities[upper]
+    return probabilities
+
+
+def series_scores(best_of: int) -> list[tuple[int, int]]:
+    """Every final score (games of side A, games of side B) of a best_of series, A's wins first"""
+    need = best_of // 2 + 1
+    return [(need, lost) for lost in range(need)] + [(lost, need) for lost in range(need)]
+
+
+def series_table(P: np.ndarray, best_of: int) -> dict:
+    """
+    Probability of every final score of a best_of series, for every pair of teams
+
+    A series is sampled with a single uniform number against the cumulative
+    score probabilities instead of game by game; the winner and the games
+    won follow the same distribution.
+
+    Returns:
+        {'cumulative': (n_teams * n_teams, n_scores - 1) cumulative probabilities
+         (row = team_a * n_teams + team_b), 'games_a', 'games_b': games of each score}
+    """
+    scores = series_scores(best_of)
+    probabilities = np.stack([math.comb(a + b - 1, min(a, b)) * P ** a * (1 - P) ** b for a, b in scores], axis=-1)
+    cumulative = np.cumsum(probabilities, axis=-1)[..., :-1].reshape(len(P) * len(P), -1)
+    return {
+        'n_teams': len(P),
+        # One contiguous column per threshold for the gathers in play_series; float32
+        # halves the memory traffic and is far finer than the Monte Carlo error
+        'cumulative': np.asfortranarray(cumulative, dtype=np.float32),
+        'games_a': np.array([a for a, _ in scores]),
+        'games_b': np.array([b for _, b in scores]),
+    }
+
+
+def play_series(table: dict, team_a: np.ndarray, team_b: np.ndarray,
+                rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Simulate one series per element of team_a/team_b
+
+    Args:
+        table: series_table of the probability matrix and format
+        team_a: Team indices of side A
+        team_b: Team indices of side B
+        rng: Random generator
+
+    Returns:
+        (A won the series, games won by A, games won by B)
+    """
+    pair = team_a * table['n_teams'] + team_b
+    draw = rng.random(len(pair), dtype=np.float32)
+    score = np.zeros(len(pair), dtype=np.intp)
+    for threshold in table['cumulative'].T:
+        score += draw >= threshold[pair]
+    games_a, games_b = table['games_a'][score], table['games_b'][score]
+    return games_a > games_b, games_a, games_b
+
+
+def series_win_probability(p: float, best_of: int) -> float:
+    """Probability of winning a best_of series with game win probability p"""
+    return sum(math.comb(a + b - 1, b) * p ** a * (1 - p) ** b
+               for a, b in series_scores(best_of) if a > b)
+
+
+def bracket_order(size: int) -> list[int]:
+    """Standard seeding of a bracket with `size` slots (a power of two), 0-based seeds"""
+    order = [0]
+    while len(order) < size:
+        order = [seed for s in order for seed in (s, 2 * len(order) - 1 - s)]
+    return order
+
+
+def _round_robin(table: dict, field: np.ndarray, stage: dict, rng: np.random.Generator) -> np.ndarray:
+    """
+    Standings of a round robin in every simulation
+
+    Args:
+        table: series_table for the stage's best_of
+        field: (n_sims, n_teams) indices of the teams taking part
+    Returns:
+        (n_sims, n_teams) team indices, first place first
+    """
+    n_sims, n_teams = field.shape
+    best_of, rounds = stage['best_of'], stage.get('rounds', 1)
+    # Every pairing at once; incidence matrices add the results up per team
+    side_a, side_b = np.triu_indices(n_teams, k=1)
+    incidence_a = np.eye(n_teams, dtype=np.float32)[side_a]
+    incidence_b = np.eye(n_teams, dtype=np.float32)[side_b]
+    team_a, team_b = field[:, side_a].ravel(), field[:, side_b].ravel()
+    series_wins = np.zeros(field.shape)
+    game_diff = np.zeros(field.shape)
+    for _ in range(rounds):
+        a_won, games_a, games_b = play_series(table, team_a, team_b, rng)
+        # Small whole numbers, so float32 matrix products (BLAS) are exact
+        won = a_won.reshape(n_sims, -1).astype(np.float32)
+        series_wins += won @ incidence_a + (1 - won) @ incidence_b
+        game_diff += (games_a - games_b).reshape(n_sims, -1).astype(np.float32) @ (incidence_a - incidence_b)
+    # Series wins, then game differential, then a random tiebreak
+    diff_range = 2 * (best_of // 2 + 1) * (n_teams - 1) * rounds + 2
+    key = series_wins * diff_range + game_diff + rng.random(field.shape)
+    order = np.argsort(-key, axis=1)
+    return np.take_along_axis(field, order, axis=1)
+
+
+def _single_elimination(table: dict, seeds: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Play a seeded bracket in every simulation
+
+    Args:
+        table: series_table for the stage's best_of
+        seeds: (n_sims, n_teams) team indices, best seed first
+    Returns:
+        (n_sims, n_teams) final places aligned with seeds; the losers of a
+        round share the place after the teams still in
+    """
+    n_sims, n_teams = seeds.shape
+    size = 1 << (n_teams - 1).bit_length()
+    # Slots hold seed numbers (columns of `seeds`), -1 for a bye
+    slots = np.array([seed if seed < n_teams else -1 for seed in bracket_order(size)])
+    slots = np.broadcast_to(slots, (n_sims, size))
+    rows = np.broadcast_to(np.arange(n_sims)[:, np.newaxis], (n_sims, size // 2))
+    places = np.ones(seeds.shape, dtype=np.int64)
+    remaining = n_teams
+    while slots.shape[1] > 1:
+        a, b = slots[:, 0::2], slots[:, 1::2]
+        rows = rows[:, :a.shape[1]]
+        # Byes sit in the same slots in every simulation
+        playing = (a >= 0) & (b >= 0)
+        a_won = b < 0
+        if playing.any():
+            r = rows[playing]
+            won, _, _ = play_series(table, seeds[r, a[playing]], seeds[r, b[playing]], rng)
+            a_won[playing] = won
+        remaining -= int(playing[0].sum())
+        losers = np.where(a_won, b, a)
+        places[rows[playing], losers[playing]] = remaining + 1
+        slots = np.where(a_won, a, b)
+    return places
+
+
+def _check_stages(stages: list[dict], n_teams: int):
+    """Raise ValueError for stage lists the simulator cannot play"""
+    if not stages:
+        raise ValueError("At least one stage is needed")
+    field = n_teams
+    for i, stage in enumerate(stages):
+        if stage.get('format') not in STAGE_FORMATS:
+            raise ValueError(f"Unknown stage format {stage.get('format')!r}, expected one of {STAGE_FORMATS}")
+        if stage.get('best_of', 0) < 1 or stage['best_of'] % 2 == 0:
+            raise ValueError("best_of must be an odd number of games")
+        if field < 2:
+            raise ValueError(f"Stage {i + 1} needs at least 2 teams")
+        if stage['format'] == 'single_elimination' and i != len(stages) - 1:
+            raise ValueError("A single-elimination bracket must be the last stage")
+        if stage['format'] == 'round_robin':
+            advance = stage.get('advance', field)
+            if not 1 <= advance <= field:
+                raise ValueError(f"Stage {i + 1} cannot advance {advance} of {field} teams")
+            field = advance
+
+
+def simulate_chunk(P: np.ndarray, stages: list[dict], n_sims: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Play n_sims tournaments and count the final places
+
+    Returns:
+        (n_teams, n_teams) counts: row = team index, column = place - 1
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = len(P)
+    sims = np.arange(n_sims)[:, np.newaxis]
+    places = np.zeros((n_sims, n_teams), dtype=np.int64)
+    field = np.broadcast_to(np.arange(n_teams), (n_sims, n_teams))
+    for stage in stages:
+        table = series_table(P, stage['best_of'])
+        if stage['format'] == 'round_robin':
+            standings = _round_robin(table, field, stage, rng)
+            advance = stage.get('advance', standings.shape[1])
+            # Teams that do not advance keep their round-robin place
+            places[sims, standings[:, advance:]] = np.arange(advance + 1, standings.shape[1] + 1)
+            field = standings[:, :advance]
+        else:
+            places[sims, field] = _single_elimination(table, field, rng)
+            field = field[:, :0]
+    # The teams still in after a final round robin finished at their standing
+    places[sims, field] = np.arange(1, field.shape[1] + 1)
+    index = np.arange(n_teams) * n_teams + places - 1
+    return np.bincount(index.ravel(), minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+
+
+class TournamentSimulator:
+    """
+    Placement odds of a field of teams over one or more tournament stages
+
+    Args:
+        predictor: Trained (or artifact-loaded) DraftBasedPredictor
+        draft_pools: Team name -> list of 5-champion drafts; the dict order
+            is the seeding when the first stage is a bracket
+    """
+
+    def __init__(self, predictor, draft_pools: dict):
+        if len(draft_pools) < 2:
+            raise ValueError("At least two teams are needed")
+        self.teams = list(draft_pools)
+        start = time.perf_counter()
+        self.probabilities = win_probability_matrix(predictor, draft_pools)
+        self.matrix_seconds = time.perf_counter() - start
+
+    def game_probabilities(self) -> pd.DataFrame:
+        """Single-game win probability of the row team against the column team"""
+        return pd.DataFrame(self.probabilities, index=self.teams, columns=self.teams)
+
+    def series_probabilities(self, best_of: int) -> pd.DataFrame:
+        """Series win probabilities (exact, no sampling) of the row team against the column team"""
+        series = np.vectorize(series_win_probability)(self.probabilities, best_of)
+        np.fill_diagonal(series, np.nan)
+        return pd.DataFrame(series, index=self.teams, columns=self.teams)
+
+    def simulate(self, stages: list[dict], n_simulations: int = DEFAULT_SIMULATIONS,
+                 n_jobs: int = -1, seed: int = 42, chunk_size: int = CHUNK_SIZE) -> dict:
+        """
+        Monte Carlo placement distribution
+
+        Args:
+            stages: Stage dicts, e.g. {'format': 'round_robin', 'best_of': 3,
+                'rounds': 2, 'advance': 6} then {'format': 'single_elimination', 'best_of': 5}
+            n_simulations: Tournaments to play
+            n_jobs: Worker processes (joblib)
+            seed: Root seed; each chunk gets a child of SeedSequence(seed)
+            chunk_size: Simulations per chunk
+
+        Returns:
+            {'placements': DataFrame of place probabilities (team x place 1..n),
+             'n_simulations', 'seconds', 'simulations_per_s', 'n_jobs'}
+        """
+        _check_stages(stages, len(self.teams))
+        sizes = [min(chunk_size, n_simulations - start) for start in range(0, n_simulations, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        start = time.perf_counter()
+        counts = Parallel(n_jobs=n_jobs)(
+            delayed(simulate_chunk)(self.probabilities, stages, size, chunk_seed)
+            for size, chunk_seed in zip(sizes, seeds)
+        )
+        seconds = time.perf_counter() - start
+        placements = pd.DataFrame(np.sum(counts, axis=0) / n_simulations, index=self.teams,
+                                  columns=range(1, len(self.teams) + 1))
+        placements.columns.name = 'place'
+        return {
+            'placements': placements,
+            'n_simulations': n_simulations,
+            'seconds': seconds,
+            'simulations_per_s': n_simulations / seconds,
+            'n_jobs': effective_n_jobs(n_jobs),
+        }
+
+
+if __name__ == "__main__":
+    from predictor_new import DraftBasedPredictor
+
+    parser = argparse.ArgumentParser(description="Monte Carlo tournament placement odds")
+    parser.add_argument('--teams', nargs='+', required=True, help="Team names, in seeding order")
+    parser.add_argument('--artifact', default=ARTIFACT_PATH, help="Inference artifact (export_artifact)")
+    parser.add_argument('--data', default=DATA_PATH, help="Match CSV the draft pools are taken from")
+    parser.add_argument('--drafts', type=int, default=5, help="Recent drafts per team")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='lck_split')
+    parser.add_argument('--stages', default=None, help="Stages as JSON (overrides --preset)")
+    parser.add_argument('--simulations', type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Also write the placement table as CSV")
+    args = parser.parse_args()
+
+    stages = json.loads(args.stages) if args.stages else PRESETS[args.preset]
+    predictor = DraftBasedPredictor.load_artifact(args.artifact)
+    matches = pd.read_csv(args.data, usecols=['teamname', 'date'] + PICK_COLUMNS)
+    simulator = TournamentSimulator(predictor, recent_draft_pools(matches, args.teams, args.drafts))
+    print(f"Win probability matrix: {len(simulator.teams)} teams in {simulator.matrix_seconds:.2f}s")
+    result = simulator.simulate(stages, args.simulations, args.n_jobs, args.seed)
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200):
+        print(result['placements'].sort_values(1, ascending=False))
+    print(f"{result['n_simulations']} simulations in {result['seconds']:.2f}s "
+          f"({result['simulations_per_s']:,.0f}/s, {result['n_jobs']} workers)")
+    if args.output:
+        result['placements'].to_csv(args.output)